@@ -1,3 +1,32 @@
+from .cache import EmbeddingCache, get_embedding_cache
 from .multilingual import MultilingualEmbedder
+from .query_cache import QueryEmbeddingCache, get_query_cache
+from .storage import STORAGE_MODES, VectorStorage
+from .registry import (
+    INDEX_MODEL,
+    EmbeddingModelMismatchError,
+    check_collection_model,
+    get_collection,
+    get_embedder,
+    get_model,
+    index_metadata,
+    indexed_model
+)
 
-__all__ = ['MultilingualEmbedder'] 
\ No newline at end of file
+__all__ = [
+    'EmbeddingCache',
+    'get_embedding_cache',
+    'MultilingualEmbedder',
+    'QueryEmbeddingCache',
+    'get_query_cache',
+    'STORAGE_MODES',
+    'VectorStorage',
+    'INDEX_MODEL',
+    'EmbeddingModelMismatchError',
+    'check_collection_model',
+    'get_collection',
+    'get_embedder',
+    'get_model',
+    'index_metadata',
+    'indexed_model'
+]
@@ -0,0 +1,308 @@
+"""
+Caché persistente de embeddings.
+
+Los vectores se guardan en segmentos binarios float32 que se leen con
+memoria mapeada, y un índice SQLite asocia cada clave (hash del texto
+normalizado, modelo, dimensión) con su segmento y fila. Cuando el tamaño
+total supera el límite se eliminan los segmentos usados hace más tiempo.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Settings.EMBEDDING_CACHE_DIR
+DEFAULT_MAX_BYTES = Settings.EMBEDDING_CACHE_MAX_MB << 20
+# Filas por segmento; la expulsión se hace por segmentos completos
+SEGMENT_ROWS = 16384
+INDEX_FILENAME = "index.sqlite"
+SEGMENT_SUFFIX = ".f32"
+DTYPE = np.float32
+# Máximo de parámetros por consulta SQLite
+QUERY_CHUNK = 500
+
+_caches: Dict[str, "EmbeddingCache"] = {}
+_caches_lock = threading.Lock()
+
+def text_key(text: str) -> str:
+    """
+    Clave de caché de un texto: hash del texto con los espacios normalizados.
+
+    Args:
+        text: Texto a embeber
+
+    Returns:
+        str: Hash SHA-1 en hexadecimal
+    """
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+def model_key(model_name: str) -> str:
+    """Nombre canónico del modelo ("sentence-transformers/x" y "x" son el mismo)."""
+    prefix = "sentence-transformers/"
+    return model_name[len(prefix):] if model_name.startswith(prefix) else model_name
+
+def get_embedding_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> "EmbeddingCache":
+    """
+    Obtiene la caché de embeddings de un directorio (una instancia por proceso).
+
+    Args:
+        cache_dir: Directorio de la caché
+
+    Returns:
+        EmbeddingCache compartida
+    """
+    path = os.path.abspath(cache_dir)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = EmbeddingCache(path)
+        return cache
+
+class EmbeddingCache:
+    """Caché en disco de embeddings por (texto, modelo, dimensión)."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, segment_rows: int = SEGMENT_ROWS):
+        """
+        Inicializa la caché, creando el directorio y el índice si no existen.
+
+        Args:
+            cache_dir: Directorio de la caché
+            max_bytes: Tamaño máximo de los segmentos antes de expulsar
+            segment_rows: Número de vectores por segmento
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.segment_rows = segment_rows
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.memmap] = {}
+        self._current: Dict[tuple, str] = {}
+        self._db = sqlite3.connect(
+            os.path.join(cache_dir, INDEX_FILENAME), timeout=30, check_same_thread=False
+        )
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT, model TEXT, dim INTEGER, segment TEXT, row INTEGER, "
+                "PRIMARY KEY (key, model, dim))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_segment ON entries (segment)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "name TEXT PRIMARY KEY, model TEXT, dim INTEGER, rows INTEGER, last_used REAL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER)")
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name + SEGMENT_SUFFIX)
+
+    def _segment_view(self, name: str, dim: int, min_rows: int) -> Optional[np.memmap]:
+        """Devuelve el segmento mapeado en memoria con al menos min_rows filas."""
+        view = self._maps.get(name)
+        if view is None or view.shape[0] < min_rows:
+            path = self._segment_path(name)
+            if not os.path.exists(path):
+                return None
+            rows = os.path.getsize(path) // (dim * DTYPE().itemsize)
+            if rows < min_rows:
+                return None
+            view = self._maps[name] = np.memmap(path, dtype=DTYPE, mode='r', shape=(rows, dim))
+        return view
+
+    def model_dim(self, model_name: str) -> Optional[int]:
+        """
+        Dimensión registrada para un modelo.
+
+        Args:
+            model_name: Nombre del modelo
+
+        Returns:
+            Dimensión de sus vectores o None si aún no hay ninguno en caché
+        """
+        with self._lock:
+            row = self._db.execute("SELECT dim FROM models WHERE model = ?", (model_key(model_name),)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys: Sequence[str], model_name: str, dim: int) -> List[Optional[np.ndarray]]:
+        """
+        Busca varios vectores en la caché.
+
+        Args:
+            keys: Claves de texto (text_key)
+            model_name: Nombre del modelo
+            dim: Dimensión de los vectores
+
+        Returns:
+            Lista con el vector de cada clave o None si no está en caché
+        """
+        model = model_key(model_name)
+        positions: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(key, []).append(i)
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+        unique = list(positions)
+
+        with self._lock:
+            used = set()
+            for start in range(0, len(unique), QUERY_CHUNK):
+                chunk = unique[start:start + QUERY_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT key, segment, row FROM entries WHERE model = ? AND dim = ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})",
+                    (model, dim, *chunk)
+                ).fetchall()
+                for key, segment, row in rows:
+                    view = self._segment_view(segment, dim, row + 1)
+                    if view is None:
+                        continue
+                    vector = np.array(view[row])
+                    for i in positions[key]:
+                        found[i] = vector
+                    used.add(segment)
+            if used:
+                now = time.time()
+                with self._db:
+                    self._db.executemany(
+                        "UPDATE segments SET last_used = ? WHERE name = ?", [(now, name) for name in used]
+                    )
+        return found
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray, model_name: str) -> None:
+        """
+        Guarda varios vectores en la caché.
+
+        Args:
+            keys: Claves de texto (text_key), sin repetir
+            vectors: Matriz (len(keys), dim) de vectores
+            model_name: Nombre del modelo
+        """
+        if not len(keys):
+            return
+        model = model_key(model_name)
+        vectors = np.ascontiguousarray(vectors, dtype=DTYPE)
+        dim = vectors.shape[1]
+
+        with self._lock:
+            now = time.time()
+            entries = []
+            written = 0
+            while written < len(keys):
+                name = self._current.get((model, dim))
+                rows = 0
+                if name is not None:
+                    row = self._db.execute("SELECT rows FROM segments WHERE name = ?", (name,)).fetchone()
+                    rows = row[0] if row else self.segment_rows
+                if name is None or rows >= self.segment_rows:
+                    # Cada proceso escribe en sus propios segmentos
+                    name = self._current[(model, dim)] = uuid.uuid4().hex
+                    rows = 0
+                    with self._db:
+                        self._db.execute(
+                            "INSERT INTO segments (name, model, dim, rows, last_used) VALUES (?, ?, ?, 0, ?)",
+                            (name, model, dim, now)
+                        )
+                count = min(self.segment_rows - rows, len(keys) - written)
+                with open(self._segment_path(name), 'ab') as f:
+                    f.write(vectors[written:written + count].tobytes())
+                entries.extend(
+                    (keys[written + i], model, dim, name, rows + i) for i in range(count)
+                )
+                with self._db:
+                    self._db.execute(
+                        "UPDATE segments SET rows = ?, last_used = ? WHERE name = ?", (rows + count, now, name)
+                    )
+                written += count
+
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, model, dim, segment, row) VALUES (?, ?, ?, ?, ?)",
+                    entries
+                )
+                self._db.execute("INSERT OR REPLACE INTO models (model, dim) VALUES (?, ?)", (model, dim))
+            self._evict()
+
+    def _evict(self) -> None:
+        """Elimina los segmentos menos usados mientras se supere max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(rows * dim), 0) FROM segments").fetchone()[0]
+        total *= DTYPE().itemsize
+        if total <= self.max_bytes:
+            return
+        current = set(self._current.values())
+        for name, rows, dim in self._db.execute(
+            "SELECT name, rows, dim FROM segments ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if name in current:
+                continue
+            with self._db:
+                self._db.execute("DELETE FROM entries WHERE segment = ?", (name,))
+                self._db.execute("DELETE FROM segments WHERE name = ?", (name,))
+            self._maps.pop(name, None)
+            try:
+                os.remove(self._segment_path(name))
+            except FileNotFoundError:
+                pass
+            total -= rows * dim * DTYPE().itemsize
+            logger.info(f"Caché de embeddings: expulsado segmento {name} ({rows} vectores)")
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        model_name: str,
+        encode: Callable[[List[str]], Sequence]
+    ) -> np.ndarray:
+        """
+        Devuelve los embeddings de varios textos, calculando solo los que faltan.
+
+        El modelo solo se invoca para los textos que no están en caché (una vez
+        por texto distinto), y los nuevos vectores se guardan.
+
+        Args:
+            texts: Textos a embeber
+            model_name: Nombre del modelo
+            encode: Función que calcula los embeddings de una lista de textos
+
+        Returns:
+            np.ndarray: Matriz (len(texts), dim) en el orden de texts
+        """
+        keys = [text_key(text) for text in texts]
+        dim = self.model_dim(model_name)
+        cached = self.get_many(keys, model_name, dim) if dim else [None] * len(keys)
+
+        missing: Dict[str, int] = {}
+        for i, vector in enumerate(cached):
+            if vector is None and keys[i] not in missing:
+                missing[keys[i]] = i
+        with self._lock:
+            self.hits += sum(1 for vector in cached if vector is not None)
+            self.misses += len(missing)
+
+        if missing:
+            fresh = np.asarray(encode([texts[i] for i in missing.values()]), dtype=DTYPE)
+            self.put_many(list(missing), fresh, model_name)
+            by_key = dict(zip(missing, fresh))
+            cached = [vector if vector is not None else by_key[key] for key, vector in zip(keys, cached)]
+
+        if not cached:
+            return np.empty((0, dim or 0), dtype=DTYPE)
+        return np.vstack(cached)
+
+    def close(self) -> None:
+        """Cierra el índice y libera los segmentos mapeados."""
+        with self._lock:
+            self._maps.clear()
+            self._db.close()
@@ -1,11 +1,83 @@
-from sentence_transformers import SentenceTransformer
+from typing import List, Optional
+
+import numpy as np
 from chromadb.api.types import Documents, EmbeddingFunction
 
+from .cache import EmbeddingCache, get_embedding_cache
+from .query_cache import QueryEmbeddingCache, get_query_cache
+from .storage import VectorStorage
+
 class MultilingualEmbedder(EmbeddingFunction):
-    def __init__(self, model_name="paraphrase-multilingual-MiniLM-L12-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name="paraphrase-multilingual-MiniLM-L12-v2",
+        cache: Optional[EmbeddingCache] = None,
+        backend: Optional[str] = None,
+        storage: Optional[VectorStorage] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None
+    ):
+        from .registry import DEFAULT_BACKEND
+        self.model_name = model_name
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.backend = backend or DEFAULT_BACKEND
+        # Los vectores int8 no son idénticos a los de torch: se cachean aparte
+        self.cache_model_name = model_name if self.backend == "torch" else f"{model_name}@{self.backend}-int8"
+        # Formato en el que se devuelven los vectores (float32, float16 o PCA)
+        self.storage = storage
+        # Caché LRU en memoria de consultas, compartida por todas las instancias
+        self.query_cache = query_cache if query_cache is not None else get_query_cache()
+    
+    @property
+    def model(self):
+        # Modelo compartido por el proceso; solo se carga si algún texto no está en la caché
+        from .registry import get_model
+        return get_model(self.model_name, self.backend)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Calcula los embeddings como una matriz de NumPy en el formato almacenado."""
+        vectors = self.cache.embed(list(texts), self.cache_model_name, lambda batch: self.model.encode(batch))
+        return self.storage.apply(vectors) if self.storage is not None else vectors
+    
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Como embed, pero las consultas repetidas salen de la caché en memoria sin pasar por el modelo.
+
+        Las que no están se calculan con el modelo sin tocar la caché en disco:
+        es la del corpus, y las consultas sueltas solo añadirían escrituras y
+        bloqueos a cada petición.
+        """
+        vectors = self.query_cache.embed(list(texts), self.cache_model_name, lambda batch: self.model.encode(batch))
+        return self.storage.apply(vectors) if self.storage is not None else vectors
+    
+    def model_distances(self, query_vector: np.ndarray, documents: List[str]) -> np.ndarray:
+        """
+        Distancias L2 al cuadrado (como ChromaDB) en el espacio float32 del modelo.
+
+        Sirve para comparar resultados de colecciones con proyecciones PCA
+        distintas. Los vectores de los documentos salen de la caché en disco
+        que llenó la ingesta; el modelo solo calcula los que falten.
+
+        Args:
+            query_vector: Embedding float32 de la consulta, sin proyectar
+            documents: Textos de los documentos tal como se indexaron
+
+        Returns:
+            np.ndarray: Una distancia por documento
+        """
+        if not documents:
+            return np.empty(0, dtype=np.float32)
+        vectors = self.cache.embed(list(documents), self.cache_model_name, lambda batch: self.model.encode(batch))
+        differences = np.asarray(vectors, dtype=np.float32) - np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        return np.einsum('ij,ij->i', differences, differences)
+    
+    def embed_query(self, input: Documents) -> list:
+        # ChromaDB la usa para query_texts
+        if isinstance(input, str):
+            input = [input]
+        return list(self.embed_queries(input))
     
     def __call__(self, input: Documents) -> list:
         if isinstance(input, str):
             input = [input]
-        return self.model.encode(input).tolist() 
\ No newline at end of file
+        # Una fila de NumPy por documento, sin convertir a listas de floats
+        return list(self.embed(input))
@@ -0,0 +1,201 @@
+"""
+Backend de inferencia ONNX cuantizado (int8) para CPU.
+
+Exporta el transformer de un modelo de SentenceTransformer a ONNX, lo
+cuantiza con cuantización dinámica int8 y lo ejecuta con onnxruntime. El
+pooling (media o CLS) y la normalización se replican en NumPy para que los
+vectores sean equivalentes a los de model.encode.
+
+Requiere onnxruntime, y onnx y torch para la exportación, que solo se hace
+una vez (ambos paquetes ONNX están en requirements.txt).
+"""
+import inspect
+import json
+import logging
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_DIR = Settings.EMBEDDING_ONNX_DIR
+# Hilos intra-op de onnxruntime (0 = los que elija onnxruntime)
+DEFAULT_INTRA_OP_THREADS = Settings.EMBEDDING_ONNX_THREADS
+MODEL_FILENAME = "model.int8.onnx"
+CONFIG_FILENAME = "pooling.json"
+OPSET_VERSION = 14
+
+def _hidden_states_module(model):
+    """Envuelve el transformer para exportar solo last_hidden_state."""
+    import torch
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            # Argumentos por nombre: el orden posicional cambia entre versiones
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    return HiddenStates(model)
+
+def _pooling_mode(pooling) -> str:
+    """Modo de pooling del modelo ("mean" o "cls")."""
+    config = pooling.get_config_dict()
+    # Versiones recientes usan pooling_mode; las anteriores, banderas booleanas
+    mode = config.get("pooling_mode")
+    if mode is None:
+        mode = "cls" if config.get("pooling_mode_cls_token") else "mean" if config.get("pooling_mode_mean_tokens") else None
+    if mode not in ("mean", "cls"):
+        raise ValueError(f"Modo de pooling no soportado por el backend ONNX: {mode}")
+    return mode
+
+def export_quantized_model(model_name: str, output_dir: str) -> str:
+    """
+    Exporta un modelo de SentenceTransformer a ONNX cuantizado en int8.
+
+    Args:
+        model_name: Nombre del modelo de SentenceTransformer
+        output_dir: Directorio donde guardar el modelo, el tokenizador y la configuración
+
+    Returns:
+        str: Ruta al modelo ONNX cuantizado
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    transformer.auto_model.eval()
+
+    # Exportar el transformer con ejes dinámicos de lote y secuencia
+    fp32_path = os.path.join(output_dir, "model.fp32.onnx")
+    sample = transformer.tokenizer(["texto de ejemplo"], return_tensors="pt")
+    export_args = dict(
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"}
+        },
+        opset_version=OPSET_VERSION
+    )
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Exportador TorchScript (torch >= 2.5 usa dynamo por defecto)
+        export_args["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            _hidden_states_module(transformer.auto_model),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            **export_args
+        )
+
+    # Cuantizar los pesos a int8
+    model_path = os.path.join(output_dir, MODEL_FILENAME)
+    quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    transformer.tokenizer.save_pretrained(output_dir)
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "pooling": _pooling_mode(model[1]),
+        "normalize": any(type(module).__name__ == "Normalize" for module in model)
+    }
+    with open(os.path.join(output_dir, CONFIG_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    logger.info(f"Modelo {model_name} exportado a ONNX int8 en {output_dir}")
+    return model_path
+
+class OnnxEncoder:
+    """Codificador con la misma interfaz encode que SentenceTransformer."""
+
+    def __init__(self, model_name: str, onnx_dir: str = DEFAULT_ONNX_DIR, intra_op_threads: Optional[int] = None):
+        """
+        Carga (exportando si hace falta) el modelo ONNX cuantizado.
+
+        Args:
+            model_name: Nombre del modelo de SentenceTransformer
+            onnx_dir: Directorio base de los modelos exportados
+            intra_op_threads: Hilos intra-op de onnxruntime (0 = automático)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.model_dir = os.path.join(onnx_dir, model_name.replace("/", "__"))
+        model_path = os.path.join(self.model_dir, MODEL_FILENAME)
+        if not os.path.exists(model_path):
+            model_path = export_quantized_model(model_name, self.model_dir)
+
+        with open(os.path.join(self.model_dir, CONFIG_FILENAME), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = DEFAULT_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Codifica un lote de textos."""
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.config["max_seq_length"],
+            return_tensors="np"
+        )
+        attention_mask = tokens["attention_mask"].astype(np.int64)
+        hidden = self.session.run(
+            ["last_hidden_state"],
+            {"input_ids": tokens["input_ids"].astype(np.int64), "attention_mask": attention_mask}
+        )[0]
+
+        if self.config["pooling"] == "cls":
+            embeddings = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(hidden.dtype)
+            embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["normalize"]:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Calcula los embeddings de varios textos.
+
+        Los textos se agrupan por longitud para minimizar el relleno.
+
+        Args:
+            texts: Textos a codificar
+            batch_size: Textos por ejecución de la sesión
+
+        Returns:
+            np.ndarray: Matriz (len(texts), dim) en el orden de texts
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [
+            self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(order), batch_size)
+        ]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        sorted_embeddings = np.vstack(batches)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings
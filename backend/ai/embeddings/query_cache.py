@@ -0,0 +1,174 @@
+"""
+Caché en memoria de embeddings de consultas.
+
+Las consultas del chat y de búsqueda se repiten mucho ("¿Qué visitar en San
+Juan?"); esta caché LRU con caducidad evita el modelo para las repetidas.
+Las que no están van directamente al modelo, sin pasar por la caché en disco
+del corpus, para no escribir en ella en cada petición. La clave es el modelo y el texto normalizado
+(NFKC, espacios colapsados y sin distinguir mayúsculas), y los vectores se
+guardan tal como los devuelve el modelo, antes del modo de almacenamiento de
+cada colección, así que la comparten todas las colecciones de un modelo.
+"""
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import Settings
+
+DEFAULT_MAX_ENTRIES = Settings.QUERY_CACHE_SIZE
+# Segundos de vida de cada entrada (0 para no caducar)
+DEFAULT_TTL_SECONDS = Settings.QUERY_CACHE_TTL
+
+_query_cache: Optional["QueryEmbeddingCache"] = None
+_query_cache_lock = threading.Lock()
+
+def normalize_query(text: str) -> str:
+    """
+    Forma normalizada de una consulta para la clave de caché.
+
+    Args:
+        text: Texto de la consulta
+
+    Returns:
+        str: Texto en NFKC, con los espacios colapsados y en minúsculas
+    """
+    return ' '.join(unicodedata.normalize('NFKC', text).split()).casefold()
+
+def get_query_cache() -> "QueryEmbeddingCache":
+    """Caché de consultas compartida por el proceso."""
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache()
+        return _query_cache
+
+class QueryEmbeddingCache:
+    """Caché LRU con caducidad de embeddings de consultas, segura entre hilos."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            max_entries: Número máximo de consultas en caché
+            ttl_seconds: Segundos de vida de cada entrada (0 para no caducar)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """
+        Vector en caché de una consulta.
+
+        Args:
+            model_name: Nombre del modelo
+            text: Texto de la consulta (se normaliza)
+
+        Returns:
+            Vector de solo lectura o None si no está o ha caducado
+        """
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> None:
+        """
+        Guarda el vector de una consulta, expulsando las menos usadas.
+
+        Args:
+            model_name: Nombre del modelo
+            text: Texto de la consulta (se normaliza)
+            vector: Embedding de la consulta
+        """
+        if self.max_entries <= 0:
+            return
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float('inf')
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            self._entries[key] = (expires, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        model_name: str,
+        encode: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Embeddings de varias consultas, calculando solo las que no están.
+
+        Args:
+            texts: Consultas
+            model_name: Nombre del modelo
+            encode: Función que calcula los embeddings de una lista de textos
+
+        Returns:
+            np.ndarray: Matriz (len(texts), dim) float32 en el orden de texts
+        """
+        vectors: List[Optional[np.ndarray]] = [self.get(model_name, text) for text in texts]
+        missing: Dict[str, int] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(normalize_query(texts[i]), i)
+        if missing:
+            fresh = np.asarray(encode([texts[i] for i in missing.values()]), dtype=np.float32)
+            by_key = {}
+            for (key, i), vector in zip(missing.items(), fresh):
+                self.put(model_name, texts[i], vector)
+                by_key[key] = vector
+            vectors = [
+                vector if vector is not None else by_key[normalize_query(text)]
+                for text, vector in zip(texts, vectors)
+            ]
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores de la caché.
+
+        Returns:
+            Dict con entries, hits, misses, expired, evicted y hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        """Vacía la caché (los contadores se conservan)."""
+        with self._lock:
+            self._entries.clear()
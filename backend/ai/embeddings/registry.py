@@ -0,0 +1,202 @@
+"""
+Registro de modelos de embeddings compartidos por todo el proceso.
+
+Cada modelo se carga una sola vez por proceso y todas las funciones de
+embeddings que lo usan comparten la misma instancia. Las colecciones guardan
+en sus metadatos el modelo con el que se indexaron, de modo que una consulta
+con un modelo distinto falla de inmediato en lugar de devolver resultados
+sin sentido.
+"""
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sentence_transformers import SentenceTransformer
+
+from config.settings import Settings
+from .cache import DEFAULT_CACHE_DIR, get_embedding_cache, model_key
+from .multilingual import MultilingualEmbedder
+from .storage import VectorStorage
+
+logger = logging.getLogger(__name__)
+
+# Modelo con el que se indexan landmarks, municipios y noticias
+INDEX_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+# Clave de los metadatos de la colección con el modelo de indexación
+INDEX_MODEL_METADATA_KEY = "embedding_model"
+# Backend de inferencia: "torch" (SentenceTransformer) u "onnx" (int8 en CPU)
+BACKENDS = ("torch", "onnx")
+DEFAULT_BACKEND = Settings.EMBEDDING_BACKEND
+
+_models: Dict[Tuple[str, str], Any] = {}
+_embedders: Dict[Tuple[str, str, str], MultilingualEmbedder] = {}
+_lock = threading.Lock()
+
+class EmbeddingModelMismatchError(ValueError):
+    """La colección se indexó con un modelo distinto al de la consulta."""
+
+def _check_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de embeddings desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+def _load_onnx_model(model_name: str) -> Any:
+    """Carga el modelo ONNX cuantizado con un error claro si falta onnxruntime u onnx."""
+    try:
+        from .onnx_backend import OnnxEncoder
+        return OnnxEncoder(model_name)
+    except ImportError as e:
+        raise ImportError(
+            f"El backend de embeddings \"onnx\" requiere el paquete {e.name or e}; "
+            f"instálalo con: pip install onnxruntime onnx"
+        ) from e
+
+def get_model(model_name: str, backend: str = DEFAULT_BACKEND) -> Any:
+    """
+    Obtiene un modelo de embeddings, cargándolo una vez por proceso.
+
+    Args:
+        model_name: Nombre del modelo
+        backend: "torch" para SentenceTransformer u "onnx" para el modelo
+            ONNX cuantizado
+
+    Returns:
+        Modelo compartido con método encode
+
+    Raises:
+        ImportError: Si el backend "onnx" no tiene instalados onnxruntime u onnx
+    """
+    _check_backend(backend)
+    key = (model_key(model_name), backend)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            logger.info(f"Cargando modelo de embeddings {key[0]} ({backend})")
+            if backend == "onnx":
+                model = _load_onnx_model(model_name)
+            else:
+                model = SentenceTransformer(model_name)
+            _models[key] = model
+        return model
+
+def get_embedder(
+    model_name: str = INDEX_MODEL,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    backend: str = DEFAULT_BACKEND,
+    storage: Optional[VectorStorage] = None
+) -> MultilingualEmbedder:
+    """
+    Obtiene la función de embeddings compartida de un modelo.
+
+    Args:
+        model_name: Nombre del modelo
+        cache_dir: Directorio de la caché de embeddings
+        backend: Backend de inferencia ("torch" u "onnx")
+        storage: Formato de los vectores devueltos. Con un formato distinto de
+            float32 se devuelve una función nueva que comparte modelo y caché
+
+    Returns:
+        MultilingualEmbedder compartido
+    """
+    _check_backend(backend)
+    if storage is not None and storage.mode != "float32":
+        return MultilingualEmbedder(
+            model_name=model_name, cache=get_embedding_cache(cache_dir), backend=backend, storage=storage
+        )
+    key = (model_key(model_name), os.path.abspath(cache_dir), backend)
+    with _lock:
+        embedder = _embedders.get(key)
+        if embedder is None:
+            embedder = _embedders[key] = MultilingualEmbedder(
+                model_name=model_name, cache=get_embedding_cache(cache_dir), backend=backend
+            )
+        return embedder
+
+def index_metadata(model_name: str = INDEX_MODEL) -> Dict[str, str]:
+    """
+    Metadatos con los que se crea una colección indexada con model_name.
+
+    Args:
+        model_name: Modelo de indexación
+
+    Returns:
+        Diccionario de metadatos de la colección
+    """
+    return {INDEX_MODEL_METADATA_KEY: model_key(model_name)}
+
+def indexed_model(collection) -> Optional[str]:
+    """
+    Modelo con el que se indexó una colección.
+
+    Args:
+        collection: Colección de ChromaDB
+
+    Returns:
+        Nombre del modelo o None si la colección no lo registra
+    """
+    return (collection.metadata or {}).get(INDEX_MODEL_METADATA_KEY)
+
+def check_collection_model(collection, model_name: str) -> None:
+    """
+    Verifica que una colección se indexó con model_name.
+
+    Args:
+        collection: Colección de ChromaDB
+        model_name: Modelo con el que se va a consultar o escribir
+
+    Raises:
+        EmbeddingModelMismatchError: Si la colección registra otro modelo
+    """
+    indexed = indexed_model(collection)
+    if indexed is None:
+        logger.warning(
+            f"La colección {collection.name} no registra su modelo de embeddings; "
+            f"se asume {model_key(model_name)}"
+        )
+    elif indexed != model_key(model_name):
+        raise EmbeddingModelMismatchError(
+            f"La colección {collection.name} se indexó con {indexed}, "
+            f"pero se está usando {model_key(model_name)}"
+        )
+
+def get_collection(
+    client,
+    name: str,
+    model_name: Optional[str] = None,
+    default_model: str = INDEX_MODEL,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    persist_directory: str = "chroma_db"
+):
+    """
+    Abre una colección con la función de embeddings de su modelo de indexación.
+
+    La función de embeddings aplica también el modo de almacenamiento de la
+    colección (float16 o proyección PCA) a las consultas.
+
+    Args:
+        client: Cliente de ChromaDB
+        name: Nombre de la colección
+        model_name: Modelo exigido; si es None se usa el registrado en la colección
+        default_model: Modelo para colecciones que no registran el suyo
+        cache_dir: Directorio de la caché de embeddings
+        persist_directory: Directorio de ChromaDB (donde están las proyecciones PCA)
+
+    Returns:
+        Colección de ChromaDB
+
+    Raises:
+        EmbeddingModelMismatchError: Si model_name no coincide con el de la colección
+    """
+    requested = model_name or default_model
+    collection = client.get_collection(name=name, embedding_function=get_embedder(requested, cache_dir))
+    indexed = indexed_model(collection)
+    if model_name is None:
+        model_name = indexed or default_model
+    check_collection_model(collection, model_name)
+
+    storage = VectorStorage.from_metadata(collection.metadata, persist_directory, name)
+    if model_key(model_name) != model_key(requested) or storage.mode != "float32":
+        collection = client.get_collection(
+            name=name, embedding_function=get_embedder(model_name, cache_dir, storage=storage)
+        )
+    return collection
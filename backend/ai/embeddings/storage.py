@@ -0,0 +1,172 @@
+"""
+Modos de almacenamiento compacto de vectores.
+
+- float32: los vectores del modelo sin cambios.
+- float16: media precisión. Es un formato de transferencia y de caché:
+  ChromaDB guarda todos los vectores en float32, así que el índice ocupa lo
+  mismo; solo se reducen los lotes que se envían a la base de datos y el
+  catálogo columnar exportado.
+- pca: proyección PCA a menos dimensiones, ajustada sobre los documentos de
+  la colección y guardada junto a la base de datos para aplicar la misma
+  proyección a las consultas. Es el modo que reduce la memoria del índice.
+
+La colección registra el modo en sus metadatos.
+"""
+import logging
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+STORAGE_MODES = ("float32", "float16", "pca")
+DEFAULT_STORAGE = Settings.EMBEDDING_STORAGE
+DEFAULT_PCA_DIM = Settings.EMBEDDING_PCA_DIM
+# Clave de los metadatos de la colección con el modo de almacenamiento
+STORAGE_METADATA_KEY = "embedding_storage"
+PROJECTION_DIRNAME = "projections"
+
+class VectorStorage:
+    """Transforma los vectores del modelo al formato almacenado."""
+
+    def __init__(
+        self,
+        mode: str = DEFAULT_STORAGE,
+        pca_dim: int = DEFAULT_PCA_DIM,
+        path: Optional[str] = None
+    ):
+        """
+        Inicializa el modo de almacenamiento, cargando la proyección PCA si existe.
+
+        Args:
+            mode: "float32", "float16" o "pca"
+            pca_dim: Dimensiones de la proyección PCA
+            path: Archivo .npz de la proyección PCA
+        """
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"Modo de almacenamiento desconocido: {mode} (opciones: {', '.join(STORAGE_MODES)})")
+        self.mode = mode
+        self.pca_dim = pca_dim
+        self.path = path
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        if mode == "pca" and path and os.path.exists(path):
+            data = np.load(path)
+            self.mean, self.components = data["mean"], data["components"]
+            self.pca_dim = self.components.shape[0]
+
+    @classmethod
+    def for_collection(
+        cls,
+        persist_directory: str,
+        collection_name: str,
+        mode: str = DEFAULT_STORAGE,
+        pca_dim: int = DEFAULT_PCA_DIM
+    ) -> "VectorStorage":
+        """
+        Obtiene el almacenamiento de una colección.
+
+        Args:
+            persist_directory: Directorio de persistencia de ChromaDB
+            collection_name: Nombre de la colección
+            mode: Modo de almacenamiento
+            pca_dim: Dimensiones de la proyección PCA
+
+        Returns:
+            VectorStorage de la colección
+        """
+        path = os.path.join(persist_directory, PROJECTION_DIRNAME, f"{collection_name}.npz")
+        return cls(mode, pca_dim, path)
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict], persist_directory: str, collection_name: str) -> "VectorStorage":
+        """
+        Reconstruye el almacenamiento registrado en los metadatos de una colección.
+
+        Args:
+            metadata: Metadatos de la colección
+            persist_directory: Directorio de persistencia de ChromaDB
+            collection_name: Nombre de la colección
+
+        Returns:
+            VectorStorage de la colección (float32 si no registra ninguno)
+        """
+        name = (metadata or {}).get(STORAGE_METADATA_KEY, "float32")
+        mode = "pca" if name.startswith("pca") else name
+        storage = cls.for_collection(persist_directory, collection_name, mode)
+        if mode == "pca" and not storage.fitted:
+            raise FileNotFoundError(f"No se encontró la proyección PCA de {collection_name} en {storage.path}")
+        return storage
+
+    @property
+    def name(self) -> str:
+        """Nombre del modo, con las dimensiones en el caso de PCA (p. ej. "pca256")."""
+        return f"pca{self.pca_dim}" if self.mode == "pca" else self.mode
+
+    @property
+    def fitted(self) -> bool:
+        """Indica si el modo está listo para transformar vectores."""
+        return self.mode != "pca" or self.components is not None
+
+    def metadata(self) -> Dict[str, str]:
+        """Metadatos con los que se registra el modo en la colección."""
+        return {STORAGE_METADATA_KEY: self.name}
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """
+        Ajusta la proyección PCA y la guarda en disco.
+
+        Args:
+            vectors: Matriz (n, dim) de vectores de muestra
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = min(self.pca_dim, vectors.shape[0], vectors.shape[1])
+        if dim < self.pca_dim:
+            logger.warning(f"Solo hay datos para {dim} componentes PCA (se pidieron {self.pca_dim})")
+        self.mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:dim])
+        self.pca_dim = dim
+
+        explained = self.explained_variance(vectors)
+        logger.info(f"Proyección PCA a {dim} dimensiones ({explained:.1%} de la varianza)")
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez(tmp_path, mean=self.mean, components=self.components)
+            os.replace(tmp_path, self.path)
+
+    def explained_variance(self, vectors: np.ndarray) -> float:
+        """Fracción de la varianza de vectors que conserva la proyección."""
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        total = float((centered ** 2).sum())
+        kept = float(((centered @ self.components.T) ** 2).sum())
+        return kept / total if total else 1.0
+
+    def reset(self) -> None:
+        """Descarta la proyección PCA (reconstrucción completa)."""
+        self.mean = None
+        self.components = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Convierte vectores del modelo al formato almacenado.
+
+        Args:
+            vectors: Matriz (n, dim) de vectores del modelo
+
+        Returns:
+            np.ndarray: Matriz (n, dim) en float16, o (n, pca_dim) para PCA
+        """
+        if self.mode == "float16":
+            return np.asarray(vectors, dtype=np.float16)
+        if self.mode == "pca":
+            if self.components is None:
+                raise RuntimeError("La proyección PCA no está ajustada")
+            return ((np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T).astype(np.float32)
+        return np.asarray(vectors, dtype=np.float32)
@@ -1,5 +1,5 @@
 from .chain import RAGChain
-from .retriever import RAGRetriever
+from .retriever import MultiCollectionRetriever, RAGRetriever, RetrievalSource
 from .llm_interface import LLMInterface
 
-__all__ = ['RAGChain', 'RAGRetriever', 'LLMInterface']
+__all__ = ['RAGChain', 'RAGRetriever', 'MultiCollectionRetriever', 'RetrievalSource', 'LLMInterface']
@@ -1,7 +1,8 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Sequence
 import logging
-from backend.ai.rag.retriever import RAGRetriever
+from backend.ai.rag.retriever import DEFAULT_SOURCES, MultiCollectionRetriever, RAGRetriever, RetrievalSource
 from backend.ai.rag.llm_interface import LLMInterface
+from backend.ai.rag.semantic_cache import SemanticResponseCache
 from backend.ai.rag.prompt_templates import TravelQueryTemplate, HistoricalQueryTemplate, CulturalQueryTemplate, PromptTemplate
 
 # Configurar logging
@@ -16,24 +17,38 @@ class RAGChain:
     
     def __init__(
         self,
-        collection_name: str = "travel_documents",
+        collection_name: Optional[str] = None,
         model_name: str = "gpt-3.5-turbo-0125",
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        sources: Sequence[RetrievalSource] = DEFAULT_SOURCES,
+        semantic_cache: bool = True
     ):
         """
         Inicializa la cadena RAG.
         
         Args:
-            collection_name (str): Nombre de la colección en ChromaDB
+            collection_name (Optional[str]): Colección única de ChromaDB. Si es
+                None se consultan en paralelo las colecciones de sources
             model_name (str): Nombre del modelo de lenguaje a utilizar
             temperature (float): Temperatura para la generación de texto
             max_tokens (int): Número máximo de tokens en la respuesta
+            sources (Sequence[RetrievalSource]): Colecciones, pesos y cuotas
+                del retriever multicolección
+            semantic_cache (bool): Reutilizar la respuesta de preguntas casi
+                idénticas con el mismo contexto recuperado
         """
-        self.retriever = RAGRetriever(collection_name=collection_name)
+        if collection_name is not None:
+            self.retriever = RAGRetriever(collection_name=collection_name)
+        else:
+            self.retriever = MultiCollectionRetriever(sources)
         self.llm = LLMInterface(model_name=model_name)
         self.temperature = temperature
         self.max_tokens = max_tokens
+        # Se invalida cuando la ingesta cambia los índices
+        self.response_cache = (
+            SemanticResponseCache(self.retriever.persist_directory) if semantic_cache else None
+        )
         
         # Inicializar plantillas
         self.templates = {
@@ -42,7 +57,8 @@ class RAGChain:
             'cultural': CulturalQueryTemplate()
         }
         
-        logger.info(f"RAGChain inicializada con colección '{collection_name}' y modelo '{model_name}'")
+        collections = collection_name or ", ".join(source.name for source in self.retriever.sources)
+        logger.info(f"RAGChain inicializada con colecciones '{collections}' y modelo '{model_name}'")
     
     def _get_template(self, query_type: str) -> PromptTemplate:
         """
@@ -112,10 +128,19 @@ class RAGChain:
             
             # Formatear el contexto
             context = "\n\n".join([
-                f"Documento {i+1}:\n{doc['document']}\nFuente: {doc['metadata'].get('source', 'Desconocida')}"
+                f"Documento {i+1}:\n{doc['document']}\nFuente: {doc['metadata'].get('source', doc.get('collection', 'Desconocida'))}"
                 for i, doc in enumerate(documents)
             ])
             
+            # Reutilizar la respuesta de una pregunta equivalente con el mismo contexto
+            if self.response_cache is not None:
+                # El embedding de la consulta ya está en la caché de consultas del retriever
+                query_embedding = self.retriever.embedder.embed_queries([query])[0]
+                doc_ids = [doc['id'] for doc in documents]
+                cached = self.response_cache.lookup(query_embedding, query_type, doc_ids)
+                if cached is not None:
+                    return cached
+            
             # Obtener la respuesta del LLM
             response = await self.llm.generate_response(
                 prompt=query,
@@ -125,6 +150,9 @@ class RAGChain:
                 max_tokens=self.max_tokens
             )
             
+            if self.response_cache is not None:
+                self.response_cache.store(query, query_embedding, query_type, doc_ids, response)
+            
             logger.info(f"Consulta procesada exitosamente. Tipo: {query_type}")
             return response
             
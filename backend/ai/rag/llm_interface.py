@@ -57,7 +57,7 @@ class LLMInterface:
         try:
             # Formatear el contexto
             formatted_context = "\n\n".join([
-                f"Documento {i+1}:\n{doc['document']}\nFuente: {doc['metadata'].get('source', 'Desconocida')}"
+                f"Documento {i+1}:\n{doc['document']}\nFuente: {doc['metadata'].get('source', doc.get('collection', 'Desconocida'))}"
                 for i, doc in enumerate(context)
             ])
             
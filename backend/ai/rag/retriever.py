@@ -1,27 +1,63 @@
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence
 import logging
-from ..embeddings import MultilingualEmbedder
-from ...database.chromadb_setup import get_vector_client
+
+import numpy as np
+
+from config.settings import Settings
+from ..embeddings import INDEX_MODEL, VectorStorage, get_collection, get_embedder, indexed_model
+from ...database.bm25 import HybridSearcher
+from ...database.chromadb_setup import DEFAULT_PERSIST_DIRECTORY, get_vector_client
+from ...database.news_shards import NEWS_COLLECTION, NewsShardRouter
+
+# Modelo de las colecciones que no registran el suyo (RAG_EMBEDDING_MODEL o el histórico)
+DEFAULT_RAG_MODEL = Settings.EMBEDDING_MODEL or "paraphrase-multilingual-MiniLM-L12-v2"
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RetrievalSource(NamedTuple):
+    """Colección consultada por MultiCollectionRetriever."""
+    # Nombre de la colección (news_articles incluye sus particiones por década)
+    name: str
+    # Multiplica la relevancia 1 / (1 + distancia) de sus documentos
+    weight: float = 1.0
+    # Documentos de la colección garantizados en el resultado (si los hay)
+    quota: int = 0
+
+# Colecciones que crean los procesadores de data_processing
+DEFAULT_SOURCES = (
+    RetrievalSource("landmarks", weight=1.0, quota=1),
+    RetrievalSource("municipalities", weight=0.8),
+    RetrievalSource(NEWS_COLLECTION, weight=1.0, quota=1)
+)
+
 class RAGRetriever:
-    def __init__(self, collection_name: str = "travel_documents"):
+    def __init__(self, collection_name: str = "travel_documents", model_name: Optional[str] = None, hybrid: bool = True):
         """
         Inicializa el retriever con el cliente de ChromaDB y el modelo de embeddings.
         
         Args:
             collection_name (str): Nombre de la colección en ChromaDB
+            model_name (Optional[str]): Modelo de embeddings exigido. Si es None
+                se usa el modelo con el que se indexó la colección
+            hybrid (bool): Combinar la búsqueda por embeddings con un índice
+                BM25 en memoria de los mismos documentos
         """
-        self.embedder = MultilingualEmbedder()
-        self.client = get_vector_client()
+        self.persist_directory = DEFAULT_PERSIST_DIRECTORY
+        self.client = get_vector_client(self.persist_directory)
         self.collection_name = collection_name
         
         try:
-            self.collection = self.client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedder
+            self.collection = get_collection(
+                self.client, collection_name, model_name, default_model=DEFAULT_RAG_MODEL
+            )
+            self.embedder = get_embedder(model_name or indexed_model(self.collection) or DEFAULT_RAG_MODEL)
+            self.hybrid = (
+                HybridSearcher.from_collection(
+                    self.collection, name_field="name", persist_directory=self.persist_directory
+                )
+                if hybrid else None
             )
             logger.info(f"Conectado exitosamente a la colección {collection_name}")
         except Exception as e:
@@ -40,19 +76,25 @@ class RAGRetriever:
             List[Dict[str, Any]]: Lista de documentos relevantes con sus metadatos
         """
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
+            if self.hybrid is not None:
+                # Embeddings y BM25 en paralelo, fusionados con RRF
+                results = self.hybrid.search(query, n_results=n_results)
+            else:
+                results = self.collection.query(
+                    query_texts=[query],
+                    n_results=n_results,
+                    include=["documents", "metadatas", "distances"]
+                )
             
             # Formatear los resultados para facilitar su uso
             formatted_results = []
             for i in range(len(results['ids'][0])):
                 formatted_results.append({
+                    'id': results['ids'][0][i],
                     'document': results['documents'][0][i],
                     'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i]
+                    'distance': results['distances'][0][i],
+                    'score': results['scores'][0][i] if 'scores' in results else None
                 })
             
             logger.info(f"Recuperados {len(formatted_results)} documentos para la consulta: {query[:50]}...")
@@ -77,3 +119,149 @@ class RAGRetriever:
         except Exception as e:
             logger.error(f"Error al obtener estadísticas de la colección: {str(e)}")
             raise
+
+
+class MultiCollectionRetriever:
+    """
+    Recupera documentos de varias colecciones a la vez.
+    
+    El embedding de la consulta se calcula una sola vez y cada colección
+    recibe su proyección (según su modo de almacenamiento); las colecciones
+    se consultan en paralelo, así que añadir una no suma latencia en serie.
+    La distancia de cada documento se convierte en una relevancia fija,
+    1 / (1 + distancia), que se multiplica por el peso de la colección; los
+    resultados se combinan respetando las cuotas de cada una. Las colecciones
+    float32 y float16 comparten el espacio del modelo; las de PCA proyectan
+    cada una a su manera, así que sus candidatos se recalculan en ese
+    espacio antes de puntuarlos.
+    """
+    
+    def __init__(
+        self,
+        sources: Sequence[RetrievalSource] = DEFAULT_SOURCES,
+        persist_directory: str = "chroma_db",
+        model_name: str = INDEX_MODEL
+    ):
+        """
+        Abre las colecciones configuradas que existen.
+        
+        Args:
+            sources (Sequence[RetrievalSource]): Colecciones con su peso y cuota
+            persist_directory (str): Directorio de ChromaDB
+            model_name (str): Modelo de embeddings con el que se indexaron
+        """
+        self.persist_directory = persist_directory
+        self.client = get_vector_client(persist_directory)
+        self.embedder = get_embedder(model_name)
+        self.sources: List[RetrievalSource] = []
+        self.collections: Dict[str, Any] = {}
+        self.storages: Dict[str, VectorStorage] = {}
+        self.news: Optional[NewsShardRouter] = None
+        
+        for source in sources:
+            try:
+                if source.name == NEWS_COLLECTION:
+                    self.news = NewsShardRouter(self.client, persist_directory, model_name)
+                    if not self.news.shards:
+                        continue
+                else:
+                    collection = get_collection(self.client, source.name, model_name, persist_directory=persist_directory)
+                    self.collections[source.name] = collection
+                    self.storages[source.name] = VectorStorage.from_metadata(
+                        collection.metadata, persist_directory, source.name
+                    )
+                self.sources.append(source)
+            except Exception as e:
+                logger.warning(f"No se pudo abrir la colección {source.name}: {str(e)}")
+        if not self.sources:
+            raise ValueError(f"Ninguna de las colecciones existe: {', '.join(source.name for source in sources)}")
+        
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix="rag-source")
+        logger.info(f"Retriever conectado a {', '.join(source.name for source in self.sources)}")
+    
+    def _query_source(self, source: RetrievalSource, query: str, vector: np.ndarray, n_results: int) -> Dict:
+        """Consulta una colección con el embedding compartido (distancias en el espacio del modelo)."""
+        if source.name == NEWS_COLLECTION:
+            return self.news.search(query, n_results=n_results, query_embedding=vector)
+        results = self.collections[source.name].query(
+            query_embeddings=self.storages[source.name].apply(vector),
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+        if self.storages[source.name].mode == "pca":
+            results['distances'] = [self.embedder.model_distances(vector, results['documents'][0]).tolist()]
+        return results
+    
+    def retrieve(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """
+        Recupera los documentos más relevantes de todas las colecciones.
+        
+        Args:
+            query (str): La consulta del usuario
+            n_results (int): Número de resultados a retornar
+            
+        Returns:
+            List[Dict[str, Any]]: Documentos ordenados por relevancia con su
+            colección, id, metadatos, distancia y score
+        """
+        try:
+            vector = self.embedder.embed_queries([query])
+            futures = [
+                self._executor.submit(self._query_source, source, query, vector, n_results)
+                for source in self.sources
+            ]
+            
+            # Relevancia fija en el espacio del modelo, ponderada por el peso de la colección
+            ranked = []
+            for source, future in zip(self.sources, futures):
+                results = future.result()
+                hits = [
+                    {
+                        'collection': source.name,
+                        'id': doc_id,
+                        'document': document,
+                        'metadata': metadata,
+                        'distance': distance,
+                        'score': source.weight / (1.0 + float(distance))
+                    }
+                    for doc_id, document, metadata, distance in zip(
+                        results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+                    )
+                ]
+                hits.sort(key=lambda hit: hit['score'], reverse=True)
+                ranked.append(hits)
+            
+            # Primero las cuotas de cada colección, después los mejores del resto
+            selected = [hit for source, hits in zip(self.sources, ranked) for hit in hits[:source.quota]][:n_results]
+            rest = sorted(
+                (hit for source, hits in zip(self.sources, ranked) for hit in hits[source.quota:]),
+                key=lambda hit: hit['score'],
+                reverse=True
+            )
+            selected.extend(rest[:n_results - len(selected)])
+            selected.sort(key=lambda hit: hit['score'], reverse=True)
+            
+            logger.info(f"Recuperados {len(selected)} documentos para la consulta: {query[:50]}...")
+            return selected
+            
+        except Exception as e:
+            logger.error(f"Error al recuperar documentos para la consulta {query}: {str(e)}")
+            raise
+    
+    def get_collection_stats(self) -> Dict[str, int]:
+        """
+        Obtiene estadísticas básicas de las colecciones.
+        
+        Returns:
+            Dict[str, int]: Documentos por colección y total
+        """
+        try:
+            stats = {name: collection.count() for name, collection in self.collections.items()}
+            if self.news is not None:
+                for collection in self.news.shards.values():
+                    stats[collection.name] = collection.count()
+            stats["total_documents"] = sum(stats.values())
+            return stats
+        except Exception as e:
+            logger.error(f"Error al obtener estadísticas de la colección: {str(e)}")
+            raise
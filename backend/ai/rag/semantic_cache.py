@@ -0,0 +1,179 @@
+"""
+Caché semántica de respuestas del RAG.
+
+Muchas preguntas son paráfrasis de otras ya respondidas. Cada entrada guarda
+el embedding normalizado de la consulta, su tipo, los ids de los documentos
+recuperados y la respuesta del LLM; una consulta nueva reutiliza la
+respuesta si es del mismo tipo, su similitud coseno con la consulta guardada
+supera el umbral y recuperó exactamente los mismos documentos (así la
+respuesta se generó con el mismo contexto).
+
+Los embeddings ocupan una matriz preasignada y la búsqueda es un único
+producto matriz-vector. Las entradas caducan por edad, se expulsa la menos
+usada cuando la caché está llena y todo se invalida cuando la ingesta cambia
+la versión de los índices (backend.database.index_version).
+"""
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+from config.settings import Settings
+from ...database.index_version import IndexVersion
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = Settings.RAG_CACHE_THRESHOLD
+DEFAULT_MAX_ENTRIES = Settings.RAG_CACHE_SIZE
+# Segundos de vida de una respuesta (0 para no caducar)
+DEFAULT_TTL_SECONDS = Settings.RAG_CACHE_TTL
+
+class SemanticResponseCache:
+    """Respuestas del RAG indexadas por el embedding de la consulta."""
+
+    def __init__(
+        self,
+        persist_directory: str = "chroma_db",
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Args:
+            persist_directory: Directorio de ChromaDB (para su versión de índices)
+            threshold: Similitud coseno mínima con la consulta guardada
+            max_entries: Número máximo de respuestas
+            ttl_seconds: Segundos de vida de cada respuesta (0 para no caducar)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_version = IndexVersion(persist_directory)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._lock = threading.Lock()
+        self._version = self.index_version.current()
+        self._vectors: Optional[np.ndarray] = None
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._query_types: List[Optional[str]] = [None] * max_entries
+        self._doc_ids: List[Optional[FrozenSet[str]]] = [None] * max_entries
+        self._responses: List[Optional[str]] = [None] * max_entries
+        self._queries: List[Optional[str]] = [None] * max_entries
+
+    def __len__(self) -> int:
+        return int(self._valid.sum())
+
+    def _check_version(self) -> None:
+        """Vacía la caché si los índices han cambiado desde que se llenó."""
+        version = self.index_version.current()
+        if version != self._version:
+            if self._valid.any():
+                logger.info("Índices actualizados: se invalida la caché de respuestas")
+                self.invalidations += 1
+            self._valid[:] = False
+            self._version = version
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        """Vector float32 de norma 1."""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, vector: np.ndarray, query_type: str, doc_ids: Iterable[str]) -> Optional[str]:
+        """
+        Respuesta guardada para una consulta equivalente.
+
+        Args:
+            vector: Embedding de la consulta
+            query_type: Tipo de consulta
+            doc_ids: Ids de los documentos recuperados para la consulta
+
+        Returns:
+            La respuesta o None si no hay ninguna aplicable
+        """
+        doc_ids = frozenset(doc_ids)
+        with self._lock:
+            self._check_version()
+            now = time.time()
+            if self.ttl_seconds:
+                self._valid &= self._created > now - self.ttl_seconds
+            if self._vectors is None or not self._valid.any():
+                self.misses += 1
+                return None
+            vector = self._normalize(vector)
+            if vector.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+
+            similarities = np.where(self._valid, self._vectors @ vector, -np.inf)
+            for slot in np.argsort(-similarities).tolist():
+                if similarities[slot] < self.threshold:
+                    break
+                if self._query_types[slot] == query_type and self._doc_ids[slot] == doc_ids:
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    logger.info(
+                        f"Respuesta en caché (similitud {similarities[slot]:.3f} con: {self._queries[slot][:50]})"
+                    )
+                    return self._responses[slot]
+            self.misses += 1
+            return None
+
+    def store(self, query: str, vector: np.ndarray, query_type: str, doc_ids: Iterable[str], response: str) -> None:
+        """
+        Guarda una respuesta, expulsando la menos usada si la caché está llena.
+
+        Args:
+            query: Texto de la consulta
+            vector: Embedding de la consulta
+            query_type: Tipo de consulta
+            doc_ids: Ids de los documentos del contexto
+            response: Respuesta del LLM
+        """
+        if self.max_entries <= 0:
+            return
+        vector = self._normalize(vector)
+        with self._lock:
+            self._check_version()
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._valid[:] = False
+            free = np.flatnonzero(~self._valid)
+            slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+            now = time.time()
+            self._vectors[slot] = vector
+            self._created[slot] = self._last_used[slot] = now
+            self._valid[slot] = True
+            self._query_types[slot] = query_type
+            self._doc_ids[slot] = frozenset(doc_ids)
+            self._responses[slot] = response
+            self._queries[slot] = query
+
+    def clear(self) -> None:
+        """Vacía la caché (los contadores se conservan)."""
+        with self._lock:
+            self._valid[:] = False
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores de la caché.
+
+        Returns:
+            Dict con entries, hits, misses, invalidations y hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._valid.sum()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
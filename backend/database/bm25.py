@@ -0,0 +1,456 @@
+"""
+Índice léxico BM25 en memoria y búsqueda híbrida con fusión de rankings.
+
+La búsqueda densa de ChromaDB no encuentra bien los nombres exactos
+("Castillo San Felipe del Morro") ni los topónimos poco frecuentes (los
+nombres taínos apenas tienen contexto en el modelo de embeddings). BM25Index
+indexa los mismos documentos que una colección y se construye al cargarla:
+las listas de apariciones se guardan en formato CSR con la fila del
+documento (int32) y su peso BM25 ya calculado (float32), así que una consulta
+es una suma vectorizada de esos pesos.
+
+La ingesta guarda esas listas junto a cada colección de lugares (save), con
+la versión de la colección a la que corresponden, y el API las abre con
+memoria mapeada (open) en lugar de leer toda la colección de ChromaDB.
+
+HybridSearcher lanza la búsqueda léxica en un hilo mientras ChromaDB resuelve
+la densa y combina ambas listas con reciprocal rank fusion (RRF). Cuando la
+ingesta cambia la versión de los índices (backend.database.index_version),
+el índice BM25 se vuelve a abrir (o, si no hay uno guardado al día, se
+reconstruye) antes de la siguiente búsqueda.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_processing.utils.normalization import fold_case
+
+from .index_version import IndexVersion
+
+logger = logging.getLogger(__name__)
+
+# Parámetros habituales de BM25
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+# Constante de RRF (Cormack et al., 2009)
+RRF_K = 60
+# Candidatos que aporta cada búsqueda por resultado pedido (y mínimo)
+CANDIDATE_FACTOR = 4
+MIN_CANDIDATES = 20
+PAGE_SIZE = 1000
+LEXICAL_DIRNAME = "bm25"
+HEADER_FILENAME = "bm25.json"
+LEXICAL_FORMAT_VERSION = 1
+
+# Letras y dígitos; "_" separa palabras en los nombres de archivo
+TOKEN = re.compile(r'[^\W_]+')
+# Palabras vacías que ocupan muchas apariciones sin ayudar al ranking
+STOPWORDS = frozenset(
+    "a al and are as at by con de del el en es for from in is la las lo los "
+    "of on or para por que se the to un una with y".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Palabras de un texto en minúsculas y sin acentos.
+
+    Args:
+        text: Texto a dividir
+
+    Returns:
+        Lista de términos (sin palabras vacías)
+    """
+    return [token for token in TOKEN.findall(fold_case(text)) if token not in STOPWORDS]
+
+def lexical_index_path(persist_directory: str, collection_name: str) -> str:
+    """
+    Directorio del índice BM25 guardado de una colección.
+
+    Args:
+        persist_directory: Directorio de persistencia de ChromaDB
+        collection_name: Nombre de la colección
+
+    Returns:
+        str: Ruta al directorio del índice
+    """
+    return os.path.join(persist_directory, LEXICAL_DIRNAME, collection_name)
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = RRF_K,
+    weights: Optional[Sequence[float]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Combina varios rankings con reciprocal rank fusion.
+
+    Cada documento suma weight / (k + posición) por cada ranking en el que
+    aparece (posiciones desde 1).
+
+    Args:
+        rankings: Listas de ids ordenadas de mejor a peor
+        k: Constante de RRF
+        weights: Peso de cada ranking (1.0 si se omite)
+
+    Returns:
+        Lista de (id, puntuación) ordenada por puntuación; los empates
+        conservan el orden de aparición
+    """
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights or [1.0] * len(rankings)):
+        for position, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def _fixed_width(values: Sequence[str]) -> np.ndarray:
+    """Codifica cadenas como bytes UTF-8 de ancho fijo."""
+    encoded = [value.encode('utf-8') for value in values]
+    width = max((len(value) for value in encoded), default=1) or 1
+    return np.array(encoded, dtype=f"S{width}")
+
+class BM25Index:
+    """Índice BM25 con listas de apariciones compactas."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B
+    ):
+        """
+        Indexa los textos.
+
+        Args:
+            ids: Id de cada documento
+            texts: Texto de cada documento
+            k1: Saturación de la frecuencia de los términos
+            b: Normalización por longitud del documento
+        """
+        start = time.perf_counter()
+        self.ids: List[str] = list(ids)
+        self.vocabulary: Dict[str, int] = {}
+        terms: List[int] = []
+        rows: List[int] = []
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            lengths[row] = len(tokens)
+            terms.extend(self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens)
+            rows.extend([row] * len(tokens))
+
+        # Pares (término, documento) únicos con su frecuencia, ordenados por término
+        count = max(len(self.ids), 1)
+        pairs, frequencies = np.unique(
+            np.asarray(terms, dtype=np.int64) * count + np.asarray(rows, dtype=np.int64), return_counts=True
+        )
+        term_ids = pairs // count
+        self.rows = (pairs % count).astype(np.int32)
+        document_frequency = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+
+        # Peso BM25 de cada aparición
+        idf = np.log1p((len(self.ids) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths[self.rows] / average_length)
+        self.weights = (idf[term_ids] * frequencies * (k1 + 1) / (frequencies + norm)).astype(np.float32)
+
+        logger.info(
+            f"Índice BM25: {len(self.ids)} documentos, {len(self.vocabulary)} términos, "
+            f"{len(self.rows)} apariciones ({time.perf_counter() - start:.2f}s)"
+        )
+
+    @classmethod
+    def from_collection(cls, collection, name_field: Optional[str] = None, **kwargs) -> "BM25Index":
+        """
+        Indexa los documentos de una colección de ChromaDB.
+
+        Args:
+            collection: Colección de ChromaDB
+            name_field: Metadato con el nombre del documento, que se indexa
+                junto al texto (p. ej. "name")
+            **kwargs: k1 y b
+
+        Returns:
+            BM25Index con los documentos de la colección
+        """
+        ids, texts = [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=PAGE_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                name = (metadata or {}).get(name_field) if name_field else None
+                ids.append(doc_id)
+                texts.append(f"{name}\n{document or ''}" if name else document or "")
+            offset += len(page["ids"])
+        return cls(ids, texts, **kwargs)
+
+    def save(self, path: str, extra: Optional[Dict] = None) -> None:
+        """
+        Guarda las listas de apariciones para abrirlas con open.
+
+        Args:
+            path: Directorio del índice (se sustituye de forma atómica)
+            extra: Información adicional para la cabecera (colección,
+                name_field, versión de la colección...)
+        """
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        columns = {
+            "ids": _fixed_width(self.ids),
+            "terms": _fixed_width(terms),
+            "rows": self.rows,
+            "offsets": self.offsets,
+            "weights": self.weights
+        }
+        header = {"version": LEXICAL_FORMAT_VERSION, "count": len(self.ids), "terms": len(terms), **(extra or {})}
+
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(values))
+        with open(os.path.join(tmp_path, HEADER_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False)
+        old_path = f"{path}.old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @staticmethod
+    def is_current(path: str, **expected) -> bool:
+        """
+        Indica si hay un índice guardado con los valores de cabecera esperados.
+
+        Args:
+            path: Directorio del índice
+            **expected: Valores que debe tener la cabecera
+
+        Returns:
+            bool: True si existe, usa este formato y coincide
+        """
+        try:
+            with open(os.path.join(path, HEADER_FILENAME), 'r', encoding='utf-8') as f:
+                header = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        return header.get("version") == LEXICAL_FORMAT_VERSION and all(
+            header.get(key) == value for key, value in expected.items()
+        )
+
+    @classmethod
+    def open(cls, path: str, **expected) -> Optional["BM25Index"]:
+        """
+        Abre un índice guardado con save, con las listas en memoria mapeada.
+
+        Args:
+            path: Directorio del índice
+            **expected: Valores que debe tener la cabecera (p. ej.
+                name_field o collection_version); si alguno no coincide el
+                índice se considera desactualizado
+
+        Returns:
+            BM25Index o None si no existe, usa otro formato o no coincide
+        """
+        if not cls.is_current(path, **expected):
+            return None
+
+        start = time.perf_counter()
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        index = cls.__new__(cls)
+        index.ids = [value.decode('utf-8') for value in load("ids")]
+        index.vocabulary = {term.decode('utf-8'): i for i, term in enumerate(load("terms"))}
+        index.rows = load("rows")
+        index.offsets = load("offsets")
+        index.weights = load("weights")
+        logger.info(
+            f"Índice BM25 abierto de {path}: {len(index.ids)} documentos, "
+            f"{len(index.vocabulary)} términos ({time.perf_counter() - start:.2f}s)"
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, n_results: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Documentos con mayor puntuación BM25 para una consulta.
+
+        Args:
+            query: Texto de la consulta
+            n_results: Número de documentos
+
+        Returns:
+            Tupla de (filas en ids, puntuaciones), de mayor a menor puntuación;
+            solo documentos que contienen algún término de la consulta
+        """
+        term_ids = np.array(
+            sorted({self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}),
+            dtype=np.int64
+        )
+        if not len(term_ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Concatenar las listas de apariciones de los términos sin bucle de Python
+        starts, ends = self.offsets[term_ids], self.offsets[term_ids + 1]
+        lengths = ends - starts
+        shifts = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        positions = np.arange(int(lengths.sum())) + shifts
+        scores = np.bincount(self.rows[positions], weights=self.weights[positions], minlength=len(self.ids))
+
+        candidates = np.flatnonzero(scores)
+        if n_results < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], n_results)[:n_results]]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order], scores[candidates[order]].astype(np.float32)
+
+    def search_ids(self, query: str, n_results: int = 10) -> List[str]:
+        """Ids de los documentos de search, en el mismo orden."""
+        rows, _ = self.search(query, n_results)
+        return [self.ids[row] for row in rows.tolist()]
+
+class HybridSearcher:
+    """Búsqueda densa (ChromaDB) y léxica (BM25) combinadas con RRF."""
+
+    def __init__(
+        self,
+        collection,
+        lexical: Optional[BM25Index],
+        rrf_k: int = RRF_K,
+        name_field: Optional[str] = None,
+        persist_directory: Optional[str] = None
+    ):
+        """
+        Args:
+            collection: Colección de ChromaDB (con su función de embeddings)
+            lexical: Índice BM25 de los mismos documentos (None para abrir el
+                guardado por la ingesta o construirlo)
+            rrf_k: Constante de RRF
+            name_field: Metadato con el nombre del documento, para reconstruir
+                el índice BM25
+            persist_directory: Directorio de ChromaDB; si se indica, el índice
+                BM25 se recarga cuando cambia la versión de los índices
+        """
+        self.collection = collection
+        self.rrf_k = rrf_k
+        self.name_field = name_field
+        self.persist_directory = persist_directory
+        self.index_version = IndexVersion(persist_directory) if persist_directory else None
+        self._version = self.index_version.current() if self.index_version else None
+        self.lexical = lexical if lexical is not None else self._load_lexical()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+
+    @classmethod
+    def from_collection(
+        cls,
+        collection,
+        name_field: Optional[str] = None,
+        persist_directory: Optional[str] = None,
+        **kwargs
+    ) -> "HybridSearcher":
+        """
+        Abre el índice BM25 de una colección y crea el buscador híbrido.
+
+        Con persist_directory se usa el índice que guardó la ingesta si
+        corresponde a la versión actual de la colección; si no, se construye
+        leyendo la colección de ChromaDB.
+
+        Args:
+            collection: Colección de ChromaDB
+            name_field: Metadato con el nombre del documento (opcional)
+            persist_directory: Directorio de ChromaDB, para abrir el índice
+                guardado y seguir su versión de los índices (opcional)
+            **kwargs: rrf_k
+
+        Returns:
+            HybridSearcher de la colección
+        """
+        return cls(collection, None, name_field=name_field, persist_directory=persist_directory, **kwargs)
+
+    def _load_lexical(self) -> BM25Index:
+        """Índice BM25 guardado al día con la colección o, si no hay, construido de ChromaDB."""
+        if self.persist_directory:
+            lexical = BM25Index.open(
+                lexical_index_path(self.persist_directory, self.collection.name),
+                name_field=self.name_field,
+                collection_version=self.index_version.collection(self.collection.name)
+            )
+            if lexical is not None:
+                return lexical
+            logger.info(f"No hay índice BM25 guardado al día de {self.collection.name}; se construye")
+        return BM25Index.from_collection(self.collection, self.name_field)
+
+    def _refresh(self) -> BM25Index:
+        """Índice BM25 al día con la versión de los índices."""
+        if self.index_version is None:
+            return self.lexical
+        with self._lock:
+            version = self.index_version.current()
+            if version != self._version:
+                logger.info(f"Índices actualizados: se recarga el índice BM25 de {self.collection.name}")
+                self._version = version
+                self.lexical = self._load_lexical()
+            return self.lexical
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        include: Iterable[str] = ("documents", "metadatas", "distances")
+    ) -> Dict[str, List[List]]:
+        """
+        Busca con ambos métodos a la vez y fusiona los rankings.
+
+        Cada búsqueda aporta CANDIDATE_FACTOR candidatos por resultado pedido.
+        Los documentos que solo encuentra BM25 se leen de ChromaDB con una
+        búsqueda densa restringida a sus ids (query con ids, desde chromadb
+        1.0.8), así que también tienen su distancia real.
+
+        Args:
+            query: Texto de la consulta
+            n_results: Número de resultados
+            include: Campos de ChromaDB a devolver
+
+        Returns:
+            Resultado con el formato de collection.query (una sola consulta)
+            más "scores" con la puntuación RRF de cada documento
+        """
+        include = list(include)
+        lexical_index = self._refresh()
+        candidates = max(n_results * CANDIDATE_FACTOR, MIN_CANDIDATES)
+        lexical = self._executor.submit(lexical_index.search_ids, query, candidates)
+        dense = self.collection.query(
+            query_texts=[query],
+            n_results=min(candidates, max(len(lexical_index), 1)),
+            include=include
+        )
+        fused = reciprocal_rank_fusion([dense['ids'][0], lexical.result()], k=self.rrf_k)[:n_results]
+
+        # Campos de los candidatos densos y, para los que solo vio BM25, de ChromaDB
+        fields = {
+            doc_id: {field: dense[field][0][i] for field in include}
+            for i, doc_id in enumerate(dense['ids'][0])
+        }
+        missing = [doc_id for doc_id, _ in fused if doc_id not in fields]
+        if missing:
+            stored = self.collection.query(
+                query_texts=[query], ids=missing, n_results=len(missing), include=include
+            )
+            for i, doc_id in enumerate(stored['ids'][0]):
+                fields[doc_id] = {field: stored[field][0][i] for field in include}
+
+        fused = [(doc_id, score) for doc_id, score in fused if doc_id in fields]
+        results = {'ids': [[doc_id for doc_id, _ in fused]], 'scores': [[score for _, score in fused]]}
+        for field in include:
+            results[field] = [[fields[doc_id][field] for doc_id, _ in fused]]
+        return results
@@ -0,0 +1,264 @@
+"""
+Catálogo columnar de lugares (landmarks y municipios).
+
+La ingesta exporta, junto a cada colección de ChromaDB, un directorio con
+columnas NumPy (.npy) que el API abre con memoria mapeada en milisegundos,
+sin consultar ChromaDB:
+
+- ids.npy, names.npy: cadenas UTF-8 de ancho fijo
+- latitude.npy, longitude.npy: float64 (NaN si no hay coordenadas)
+- category_offsets.npy, category_ids.npy: categorías internadas en formato
+  CSR (las del lugar i son category_ids[offsets[i]:offsets[i + 1]])
+- embedding_rows.npy, embeddings.npy: fila de cada lugar en la matriz de
+  embeddings y la matriz misma
+- catalog.json: cabecera con el número de lugares, la lista de categorías y
+  la información del índice
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.ai.embeddings.storage import STORAGE_METADATA_KEY
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIRNAME = "catalog"
+HEADER_FILENAME = "catalog.json"
+CATALOG_VERSION = 1
+# Los títulos de Wikipedia no pueden contener "|"; las categorías sí contienen comas
+CATEGORY_SEPARATOR = "|"
+PAGE_SIZE = 1000
+
+def catalog_path(persist_directory: str, collection_name: str) -> str:
+    """
+    Directorio del catálogo de una colección.
+
+    Args:
+        persist_directory: Directorio de persistencia de ChromaDB
+        collection_name: Nombre de la colección
+
+    Returns:
+        str: Ruta al directorio del catálogo
+    """
+    return os.path.join(persist_directory, CATALOG_DIRNAME, collection_name)
+
+def catalog_exists(persist_directory: str, collection_name: str) -> bool:
+    """Indica si una colección tiene catálogo exportado."""
+    return os.path.exists(os.path.join(catalog_path(persist_directory, collection_name), HEADER_FILENAME))
+
+def _parse_coordinate(value) -> float:
+    """Convierte una coordenada de los metadatos ("" si no hay) a float."""
+    if value is None or value == "":
+        return math.nan
+    return float(value)
+
+def split_categories(value: Optional[str]) -> List[str]:
+    """
+    Categorías guardadas en los metadatos de ChromaDB.
+
+    Args:
+        value: Valor de metadata["categories"]
+
+    Returns:
+        Lista de categorías (vacía si no hay)
+    """
+    return value.split(CATEGORY_SEPARATOR) if value else []
+
+def intern_categories(values: List[Optional[str]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Interna las categorías de varios lugares en formato CSR.
+
+    Args:
+        values: metadata["categories"] de cada lugar
+
+    Returns:
+        Tupla de (nombres de las categorías, offsets int64, ids int32)
+    """
+    category_index: Dict[str, int] = {}
+    category_ids: List[int] = []
+    category_offsets = [0]
+    for value in values:
+        for category in split_categories(value):
+            category_ids.append(category_index.setdefault(category, len(category_index)))
+        category_offsets.append(len(category_ids))
+    return (
+        list(category_index),
+        np.array(category_offsets, dtype=np.int64),
+        np.array(category_ids, dtype=np.int32)
+    )
+
+def _fixed_width(values: List[str]) -> np.ndarray:
+    """Codifica cadenas como bytes UTF-8 de ancho fijo."""
+    encoded = [value.encode('utf-8') for value in values]
+    width = max((len(value) for value in encoded), default=1) or 1
+    return np.array(encoded, dtype=f"S{width}")
+
+def build_catalog(collection, path: str, extra: Optional[Dict] = None) -> int:
+    """
+    Exporta el catálogo de una colección de lugares.
+
+    Args:
+        collection: Colección de ChromaDB con metadatos name, categories,
+            latitude y longitude
+        path: Directorio del catálogo
+        extra: Información adicional para la cabecera
+
+    Returns:
+        int: Número de lugares exportados
+    """
+    start = time.perf_counter()
+    ids, metadatas, embeddings = [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas", "embeddings"], limit=PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        metadatas.extend(page["metadatas"])
+        embeddings.append(np.asarray(page["embeddings"]))
+        offset += len(page["ids"])
+
+    # Orden determinista por id
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    ids = [ids[i] for i in order]
+    metadatas = [metadatas[i] for i in order]
+    # ChromaDB devuelve float64; se guarda con la precisión del modo de almacenamiento
+    dtype = np.float16 if (collection.metadata or {}).get(STORAGE_METADATA_KEY) == "float16" else np.float32
+    matrix = np.vstack(embeddings)[order].astype(dtype) if embeddings else np.empty((0, 0), dtype=dtype)
+
+    # Internar las categorías
+    category_names, category_offsets, category_ids = intern_categories(
+        [metadata.get("categories") for metadata in metadatas]
+    )
+
+    columns = {
+        "ids": _fixed_width(ids),
+        "names": _fixed_width([metadata.get("name", "") for metadata in metadatas]),
+        "latitude": np.array([_parse_coordinate(m.get("latitude")) for m in metadatas], dtype=np.float64),
+        "longitude": np.array([_parse_coordinate(m.get("longitude")) for m in metadatas], dtype=np.float64),
+        "category_offsets": category_offsets,
+        "category_ids": category_ids,
+        "embedding_rows": np.arange(len(ids), dtype=np.int64),
+        "embeddings": np.ascontiguousarray(matrix)
+    }
+    header = {
+        "version": CATALOG_VERSION,
+        "collection": collection.name,
+        "count": len(ids),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "categories": category_names,
+        "collection_metadata": collection.metadata or {},
+        "built_at": time.time(),
+        **(extra or {})
+    }
+
+    # Escribir en un directorio temporal y sustituir el anterior
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+    with open(os.path.join(tmp_path, HEADER_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False)
+    old_path = f"{path}.old"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    logger.info(
+        f"Catálogo de {collection.name}: {len(ids)} lugares, {len(category_names)} categorías "
+        f"({time.perf_counter() - start:.2f}s)"
+    )
+    return len(ids)
+
+class PlaceCatalog:
+    """Catálogo de lugares abierto con memoria mapeada."""
+
+    def __init__(self, path: str):
+        """
+        Abre un catálogo exportado por build_catalog.
+
+        Args:
+            path: Directorio del catálogo
+        """
+        self.path = path
+        with open(os.path.join(path, HEADER_FILENAME), 'r', encoding='utf-8') as f:
+            self.header = json.load(f)
+        if self.header.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Versión de catálogo no soportada en {path}: {self.header.get('version')}")
+        self.category_names: List[str] = self.header["categories"]
+
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        self.ids = load("ids")
+        self.names = load("names")
+        self.latitude = load("latitude")
+        self.longitude = load("longitude")
+        self.category_offsets = load("category_offsets")
+        self.category_ids = load("category_ids")
+        self.embedding_rows = load("embedding_rows")
+        self.embeddings = load("embeddings")
+        self._rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def open(cls, persist_directory: str, collection_name: str) -> Optional["PlaceCatalog"]:
+        """
+        Abre el catálogo de una colección si existe.
+
+        Args:
+            persist_directory: Directorio de persistencia de ChromaDB
+            collection_name: Nombre de la colección
+
+        Returns:
+            PlaceCatalog o None si la colección no tiene catálogo
+        """
+        if not catalog_exists(persist_directory, collection_name):
+            return None
+        return cls(catalog_path(persist_directory, collection_name))
+
+    def __len__(self) -> int:
+        return int(self.header["count"])
+
+    def row(self, place_id: str) -> Optional[int]:
+        """
+        Fila de un lugar por su id de ChromaDB.
+
+        Args:
+            place_id: Id del documento
+
+        Returns:
+            Índice de la fila o None si no está en el catálogo
+        """
+        if self._rows is None:
+            self._rows = {value.decode('utf-8'): i for i, value in enumerate(self.ids)}
+        return self._rows.get(place_id)
+
+    def name(self, row: int) -> str:
+        """Nombre del lugar de una fila."""
+        return self.names[row].decode('utf-8')
+
+    def coordinates(self, row: int) -> Tuple[Optional[float], Optional[float]]:
+        """Latitud y longitud de una fila (None si no tiene coordenadas)."""
+        latitude, longitude = float(self.latitude[row]), float(self.longitude[row])
+        return (
+            None if math.isnan(latitude) else latitude,
+            None if math.isnan(longitude) else longitude
+        )
+
+    def category_ids_of(self, row: int) -> np.ndarray:
+        """Ids internados de las categorías de una fila."""
+        return self.category_ids[self.category_offsets[row]:self.category_offsets[row + 1]]
+
+    def categories(self, row: int) -> List[str]:
+        """Nombres de las categorías de una fila."""
+        return [self.category_names[i] for i in self.category_ids_of(row)]
+
+    def embedding(self, row: int) -> np.ndarray:
+        """Vector almacenado de una fila."""
+        return self.embeddings[self.embedding_rows[row]]
@@ -0,0 +1,233 @@
+"""
+Índice invertido de categorías de lugares.
+
+Para cada categoría se guarda la lista ordenada de filas de los lugares que
+la tienen (formato CSR: las filas de la categoría c son
+postings[offsets[c]:offsets[c + 1]]). Las recomendaciones por varias
+categorías se resuelven en memoria con operaciones vectorizadas sobre esas
+listas (conteos con bincount, intersección o unión y puntuación ponderada),
+sin consultar ChromaDB.
+
+Un término de búsqueda se resuelve a la categoría con ese nombre exacto
+(sin distinguir mayúsculas ni acentos) o, si no la hay, a todas las
+categorías que contienen palabras que empiezan por cada palabra del término
+("museum" -> "Museums in San Juan, Puerto Rico", "Science museums in Puerto
+Rico"). Las categorías son las de la Wikipedia en inglés y los términos
+también deben estarlo: "museos" no encuentra nada.
+"""
+import bisect
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.database.catalog import intern_categories
+from data_processing.utils.normalization import fold_case
+
+logger = logging.getLogger(__name__)
+
+MATCH_MODES = ("any", "all")
+# Términos resueltos que se recuerdan
+MATCH_CACHE_SIZE = 1024
+WORD = re.compile(r'\w+')
+
+def _concat_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatena los rangos [start, end) sin bucle de Python."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(total) + shifts
+
+class CategoryIndex:
+    """Índice invertido de categorías a filas de lugares."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        category_names: Sequence[str],
+        category_offsets: np.ndarray,
+        category_ids: np.ndarray
+    ):
+        """
+        Construye el índice a partir de las categorías de cada lugar en CSR.
+
+        Args:
+            ids: Id de cada lugar
+            category_names: Nombre de cada categoría internada
+            category_offsets: Las categorías del lugar i son
+                category_ids[category_offsets[i]:category_offsets[i + 1]]
+            category_ids: Ids internados de las categorías
+        """
+        self.ids: List[str] = list(ids)
+        self.category_names: List[str] = list(category_names)
+        self.category_offsets = np.asarray(category_offsets, dtype=np.int64)
+        self.category_ids = np.asarray(category_ids, dtype=np.int64)
+        count = max(len(self.ids), 1)
+
+        # Pares (categoría, fila) únicos, ordenados por categoría y fila
+        rows = np.repeat(np.arange(len(self.ids), dtype=np.int64), np.diff(self.category_offsets))
+        pairs = np.unique(self.category_ids * count + rows)
+        self.postings = (pairs % count).astype(np.int32)
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(pairs // count, minlength=len(self.category_names)))]
+        ).astype(np.int64)
+
+        # Nombres normalizados y palabras de cada categoría
+        self._exact: Dict[str, List[int]] = {}
+        words: Dict[str, List[int]] = {}
+        for category, name in enumerate(self.category_names):
+            folded = fold_case(name)
+            self._exact.setdefault(folded, []).append(category)
+            for word in set(WORD.findall(folded)):
+                words.setdefault(word, []).append(category)
+        self._vocabulary = sorted(words)
+        self._word_categories = [np.array(words[word], dtype=np.int64) for word in self._vocabulary]
+        self.match = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+
+        logger.info(
+            f"Índice de categorías: {len(self.ids)} lugares, {len(self.category_names)} categorías, "
+            f"{len(self.postings)} entradas"
+        )
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "CategoryIndex":
+        """
+        Construye el índice con las categorías de un catálogo de lugares.
+
+        Args:
+            catalog: PlaceCatalog de la colección
+
+        Returns:
+            CategoryIndex con las filas del catálogo
+        """
+        ids = [value.decode('utf-8') for value in catalog.ids]
+        return cls(ids, catalog.category_names, catalog.category_offsets, catalog.category_ids)
+
+    @classmethod
+    def from_collection(cls, collection) -> "CategoryIndex":
+        """
+        Construye el índice con las categorías de los metadatos de ChromaDB.
+
+        Args:
+            collection: Colección con metadatos categories
+
+        Returns:
+            CategoryIndex con los lugares de la colección
+        """
+        results = collection.get(include=['metadatas'])
+        names, offsets, category_ids = intern_categories(
+            [metadata.get('categories') for metadata in results['metadatas']]
+        )
+        return cls(results['ids'], names, offsets, category_ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _match(self, term: str) -> np.ndarray:
+        """Ids de las categorías que corresponden a un término."""
+        folded = fold_case(term).strip()
+        if folded in self._exact:
+            return np.array(self._exact[folded], dtype=np.int64)
+        matched: Optional[np.ndarray] = None
+        for word in WORD.findall(folded):
+            # Las palabras del vocabulario que empiezan por word son contiguas
+            start = bisect.bisect_left(self._vocabulary, word)
+            end = bisect.bisect_left(self._vocabulary, word + '\uffff')
+            categories = (
+                np.unique(np.concatenate(self._word_categories[start:end]))
+                if end > start else np.empty(0, dtype=np.int64)
+            )
+            matched = categories if matched is None else np.intersect1d(matched, categories, assume_unique=True)
+        return matched if matched is not None else np.empty(0, dtype=np.int64)
+
+    def rows_of(self, categories: np.ndarray) -> np.ndarray:
+        """
+        Filas de los lugares que tienen alguna de las categorías.
+
+        Args:
+            categories: Ids de las categorías
+
+        Returns:
+            np.ndarray: Filas, con repeticiones si un lugar tiene varias
+        """
+        categories = np.asarray(categories, dtype=np.int64)
+        return self.postings[_concat_ranges(self.offsets[categories], self.offsets[categories + 1])]
+
+    def categories_of(self, row: int) -> List[str]:
+        """Nombres de las categorías de una fila."""
+        start, end = self.category_offsets[row], self.category_offsets[row + 1]
+        return [self.category_names[i] for i in self.category_ids[start:end]]
+
+    def matching_categories(self, row: int, categories: np.ndarray) -> List[str]:
+        """
+        Categorías de una fila que están entre las dadas.
+
+        Args:
+            row: Fila del lugar
+            categories: Ids de las categorías buscadas
+
+        Returns:
+            Nombres de las categorías coincidentes
+        """
+        start, end = self.category_offsets[row], self.category_offsets[row + 1]
+        own = self.category_ids[start:end]
+        return [self.category_names[i] for i in own[np.isin(own, categories)]]
+
+    def recommend(
+        self,
+        terms: Sequence[str],
+        n_results: int = 5,
+        mode: str = "any",
+        weights: Optional[Sequence[float]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+        """
+        Lugares que mejor cubren unas categorías.
+
+        Cada lugar suma el peso de cada término que tiene (una vez por
+        término); los empates se deshacen por el número de categorías
+        coincidentes y después por fila.
+
+        Args:
+            terms: Categorías o términos de interés
+            n_results: Número de lugares
+            mode: "any" (alguno de los términos) o "all" (todos)
+            weights: Peso de cada término (1.0 si se omite)
+
+        Returns:
+            Tupla de (filas, puntuaciones, ids de categorías de cada término)
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Modo no soportado: {mode} (use {' o '.join(MATCH_MODES)})")
+        if weights is None:
+            weights = [1.0] * len(terms)
+        elif len(weights) != len(terms):
+            raise ValueError("Se necesita un peso por categoría")
+        matched = [self.match(term) for term in terms]
+        empty = np.empty(0, dtype=np.int64)
+        if not terms or (mode == "all" and any(not len(categories) for categories in matched)):
+            return empty, np.empty(0), matched
+
+        scores = np.zeros(len(self.ids))
+        hits = np.zeros(len(self.ids), dtype=np.int64)
+        covered = np.zeros(len(self.ids), dtype=np.int64)
+        for categories, weight in zip(matched, weights):
+            counts = np.bincount(self.rows_of(categories), minlength=len(self.ids))
+            present = counts > 0
+            scores += weight * present
+            covered += present
+            hits += counts
+        candidates = np.flatnonzero(covered == len(terms) if mode == "all" else covered > 0)
+        if not len(candidates):
+            return empty, np.empty(0), matched
+
+        # Seleccionar los n mejores antes de ordenar
+        if n_results < len(candidates):
+            threshold = np.partition(scores[candidates], len(candidates) - n_results)[len(candidates) - n_results]
+            candidates = candidates[scores[candidates] >= threshold]
+        order = np.lexsort((candidates, -hits[candidates], -scores[candidates]))[:n_results]
+        rows = candidates[order]
+        return rows, scores[rows], matched
@@ -1,7 +1,9 @@
 import chromadb
 from chromadb.config import Settings
 
-def get_vector_client():
+DEFAULT_PERSIST_DIRECTORY = "./chroma_db"
+
+def get_vector_client(path: str = DEFAULT_PERSIST_DIRECTORY):
     return chromadb.PersistentClient(
-        path="./chroma_db"
+        path=path
     ) 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Versión de los índices de ChromaDB.
+
+La ingesta cambia la versión cada vez que escribe, borra o reconstruye una
+colección; las cachés que dependen del contenido indexado (como la caché de
+respuestas del RAG) comparan la versión para saber cuándo invalidarse. El
+archivo se sustituye de forma atómica y los lectores solo lo vuelven a leer
+cuando cambia su mtime.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_FILENAME = "index_version.json"
+
+def index_version_path(persist_directory: str) -> str:
+    """Ruta del archivo de versión de un directorio de ChromaDB."""
+    return os.path.join(persist_directory, INDEX_VERSION_FILENAME)
+
+def new_index_version() -> str:
+    """Identificador de una versión nueva de los índices."""
+    return uuid.uuid4().hex
+
+def bump_index_version(persist_directory: str, collection_name: str, version: Optional[str] = None) -> str:
+    """
+    Registra que una colección ha cambiado.
+
+    Args:
+        persist_directory: Directorio de ChromaDB
+        collection_name: Colección modificada
+        version: Versión a publicar (nueva si se omite), para guardar antes
+            los índices derivados que deben corresponder a ella
+
+    Returns:
+        str: Nueva versión de los índices
+    """
+    path = index_version_path(persist_directory)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {}
+    version = version or new_index_version()
+    state["version"] = version
+    state["updated_at"] = time.time()
+    state.setdefault("collections", {})[collection_name] = {"version": version, "updated_at": state["updated_at"]}
+
+    os.makedirs(persist_directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    logger.debug(f"Versión de los índices {version} ({collection_name})")
+    return version
+
+class IndexVersion:
+    """Lector de la versión de los índices que solo relee el archivo si cambia."""
+
+    def __init__(self, persist_directory: str):
+        """
+        Args:
+            persist_directory: Directorio de ChromaDB
+        """
+        self.path = index_version_path(persist_directory)
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._version: Optional[str] = None
+        self._collections: Dict[str, Dict] = {}
+
+    def current(self) -> Optional[str]:
+        """
+        Versión actual de los índices.
+
+        Returns:
+            str o None si la ingesta aún no ha registrado ninguna
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stat = self._version = None
+            self._collections = {}
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._stat:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self._version = state.get("version")
+                self._collections = state.get("collections", {})
+                self._stat = key
+            except (FileNotFoundError, ValueError):
+                return self._version
+        return self._version
+
+    def collection(self, collection_name: str) -> Optional[str]:
+        """
+        Versión de la última escritura en una colección.
+
+        Args:
+            collection_name: Nombre de la colección
+
+        Returns:
+            str o None si la ingesta no ha registrado cambios en ella
+        """
+        self.current()
+        return self._collections.get(collection_name, {}).get("version")
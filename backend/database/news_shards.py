@@ -0,0 +1,289 @@
+"""
+Colecciones de noticias particionadas por década.
+
+NewsProcessor escribe las noticias de cada década en su propia colección
+(news_articles_1920s, news_articles_1930s, ...), así cada índice se mantiene
+pequeño aunque se añadan décadas. Las consultas que mencionan un año, una
+década o una época conocida se dirigen solo a las colecciones de esas
+décadas; el resto se envía a todas en paralelo y los resultados se combinan
+por distancia.
+"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.ai.embeddings import INDEX_MODEL, VectorStorage, get_collection, get_embedder
+from data_processing.utils.normalization import fold_case
+
+logger = logging.getLogger(__name__)
+
+NEWS_COLLECTION = "news_articles"
+SHARD_PATTERN = re.compile(rf'^{NEWS_COLLECTION}_(\d{{3}}0s)$')
+# Como mucho una consulta en vuelo por colección
+MAX_FANOUT_WORKERS = 8
+
+# Menciones de fechas en la consulta (ya en minúsculas y sin acentos)
+# Sustantivos que convierten un número de cuatro cifras en una cantidad
+# ("un pueblo de 2000 habitantes", "in 1500 acres")
+COUNT_NOUNS = (
+    r'(?!\s+(?:habitantes|personas|familias|casas|viviendas|soldados|votos|muertos|heridos|victimas'
+    r'|estudiantes|trabajadores|empleados|dolares|pesos|metros|kilometros|millas|pies|cuerdas|acres'
+    r'|toneladas|visitantes|people|residents|inhabitants|families|houses|homes|soldiers|votes|deaths'
+    r'|students|workers|employees|dollars|meters|kilometers|miles|feet|tons|visitors)\b)'
+)
+YEAR_RANGE = re.compile(
+    r'\b(?:(?:entre|between)\s+(1[6-9]\d\d|20\d\d)\s+(?:y|and)\s+(1[6-9]\d\d|20\d\d)'
+    r'|(1[6-9]\d\d|20\d\d)\s*(?:-|–|a|al|hasta|to)\s*(1[6-9]\d\d|20\d\d))\b' + COUNT_NOUNS
+)
+# Un número suelto solo es un año tras una preposición o palabra clave
+# ("en 1947", "de 1928", "in the year 1950", "desde el año 1930")
+YEAR = re.compile(
+    r'\b(?:en|in|de|del|desde|hasta|durante|since|from|until|during|year|ano)'
+    r'\s+(?:(?:el|la|the|ano|year)\s+){0,2}(1[6-9]\d\d|20\d\d)\b' + COUNT_NOUNS
+)
+FULL_DECADE = re.compile(r'\b(1[6-9]\d0|20\d0)\'?s\b')
+# Década abreviada con contexto: "años 40", "década de los 40", "'40s", "40s"
+# ("the 10 best beaches" no es una década)
+SHORT_DECADE = re.compile(
+    r'\b(?:anos|decada de(?: los)?|decada del)\s*\'?(\d0)\'?s?\b'
+    r'|(?<!\w)\'(\d0)s?\b'
+    r'|\b(\d0)\'?s\b'
+)
+DECADE_WORDS = {
+    "veinte": 20, "treinta": 30, "cuarenta": 40, "cincuenta": 50,
+    "sesenta": 60, "setenta": 70, "ochenta": 80, "noventa": 90,
+    "twenties": 20, "thirties": 30, "forties": 40, "fifties": 50,
+    "sixties": 60, "seventies": 70, "eighties": 80, "nineties": 90
+}
+WORD_DECADE = re.compile(
+    r'\b(?:anos|decada de los|the)\s+(' + '|'.join(DECADE_WORDS) + r')\b'
+)
+# Épocas históricas con su intervalo de años
+ERAS: Dict[str, Tuple[int, int]] = {
+    r'primera guerra mundial|gran guerra|world war i|wwi|first world war': (1914, 1918),
+    r'segunda guerra mundial|world war ii|wwii|second world war': (1939, 1945),
+    r'gran depresion|great depression': (1929, 1939),
+    r'nuevo trato|new deal': (1933, 1939),
+    r'ley jones|jones act': (1917, 1917),
+    r'huracan san felipe': (1928, 1928),
+    r'huracan san ciprian': (1932, 1932),
+    r'masacre de ponce|ponce massacre': (1937, 1937),
+    r'operacion manos a la obra|manos a la obra|operation bootstrap': (1947, 1965),
+    r'grito de jayuya|insurreccion nacionalista|revolucion nacionalista': (1950, 1950),
+    r'guerra de corea|korean war': (1950, 1953),
+    r'guerra de vietnam|vietnam war': (1955, 1975)
+}
+ERA_PATTERNS = [(re.compile(rf'\b(?:{pattern})\b'), years) for pattern, years in ERAS.items()]
+
+def shard_name(decade: str) -> str:
+    """
+    Nombre de la colección de una década.
+
+    Args:
+        decade: Década en formato "1940s"
+
+    Returns:
+        str: Nombre de la colección (p. ej. news_articles_1940s)
+    """
+    return f"{NEWS_COLLECTION}_{decade}"
+
+def shard_decade(name: str) -> Optional[str]:
+    """Década de una colección de noticias, o None si no es una partición."""
+    match = SHARD_PATTERN.match(name)
+    return match.group(1) if match else None
+
+def list_shards(client) -> Dict[str, str]:
+    """
+    Particiones de noticias existentes.
+
+    Args:
+        client: Cliente de ChromaDB
+
+    Returns:
+        Dict de década a nombre de colección, ordenado por década
+    """
+    # Según la versión, list_collections devuelve nombres u objetos Collection
+    names = [getattr(collection, "name", collection) for collection in client.list_collections()]
+    shards = {shard_decade(name): name for name in names if shard_decade(name)}
+    return dict(sorted(shards.items()))
+
+def decade_of(year: int) -> str:
+    """Década de un año (1947 -> "1940s")."""
+    return f"{year // 10 * 10}s"
+
+def decades_between(start: int, end: int) -> List[str]:
+    """
+    Décadas que cubre un intervalo de años.
+
+    Args:
+        start: Primer año
+        end: Último año
+
+    Returns:
+        Lista de décadas ordenada
+    """
+    start, end = min(start, end), max(start, end)
+    return [decade_of(year) for year in range(start // 10 * 10, end + 1, 10)]
+
+def query_decades(query: str) -> List[str]:
+    """
+    Décadas que menciona una consulta.
+
+    Reconoce años ("en 1947", "de 1928"), intervalos ("entre 1930 y 1950"),
+    décadas ("1940s", "los años 40", "the '20s", "años cuarenta", "the
+    forties") y épocas conocidas ("Segunda Guerra Mundial", "Gran
+    Depresión"). Un número suelto solo cuenta como año tras una preposición
+    o palabra clave y si no le sigue una cantidad ("2000 habitantes"); uno
+    de dos cifras solo cuenta como década con contexto ("años", "década",
+    apóstrofo o "s" final). Las décadas abreviadas se interpretan como del
+    siglo XX.
+
+    Args:
+        query: Texto de la consulta
+
+    Returns:
+        Lista ordenada de décadas (vacía si no menciona ninguna)
+    """
+    text = fold_case(query)
+    decades = set()
+    for match in YEAR_RANGE.finditer(text):
+        start, end = [int(year) for year in match.groups() if year]
+        decades.update(decades_between(start, end))
+    text = YEAR_RANGE.sub(' ', text)
+    decades.update(decade_of(int(year)) for year in YEAR.findall(text))
+    decades.update(f"{decade}s" for decade in FULL_DECADE.findall(text))
+    decades.update(f"19{''.join(groups)}s" for groups in SHORT_DECADE.findall(text))
+    decades.update(f"19{DECADE_WORDS[word]}s" for word in WORD_DECADE.findall(text))
+    for pattern, (start, end) in ERA_PATTERNS:
+        if pattern.search(text):
+            decades.update(decades_between(start, end))
+    return sorted(decades)
+
+class NewsShardRouter:
+    """Consulta las particiones de noticias que corresponden a cada consulta."""
+
+    def __init__(self, client, persist_directory: str = "chroma_db", model_name: str = INDEX_MODEL):
+        """
+        Abre las particiones de noticias existentes.
+
+        Si no hay particiones pero existe la colección news_articles sin
+        particionar, se consulta esa.
+
+        Args:
+            client: Cliente de ChromaDB
+            persist_directory: Directorio de ChromaDB
+            model_name: Modelo de embeddings de las colecciones
+        """
+        self.embedder = get_embedder(model_name)
+        self.shards: Dict[Optional[str], object] = {}
+        self.storages: Dict[Optional[str], VectorStorage] = {}
+        names = list_shards(client)
+        if not names:
+            try:
+                client.get_collection(name=NEWS_COLLECTION)
+                names = {None: NEWS_COLLECTION}
+                logger.warning(f"No hay particiones por década; se usa la colección {NEWS_COLLECTION}")
+            except Exception:
+                logger.warning("No hay colecciones de noticias")
+        for decade, name in names.items():
+            collection = get_collection(client, name, model_name, persist_directory=persist_directory)
+            self.shards[decade] = collection
+            self.storages[decade] = VectorStorage.from_metadata(collection.metadata, persist_directory, name)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=min(len(self.shards), MAX_FANOUT_WORKERS), thread_name_prefix="news-shard")
+            if len(self.shards) > 1 else None
+        )
+
+    @property
+    def decades(self) -> List[str]:
+        """Décadas con partición."""
+        return [decade for decade in self.shards if decade is not None]
+
+    def route(self, query: str, decades: Optional[Iterable[str]] = None) -> List[Optional[str]]:
+        """
+        Particiones a consultar.
+
+        Args:
+            query: Texto de la consulta
+            decades: Décadas pedidas explícitamente (si no, se deducen de la consulta)
+
+        Returns:
+            Claves de las particiones; todas si la consulta no menciona
+            ninguna década indexada
+        """
+        wanted = list(decades) if decades is not None else query_decades(query)
+        selected = [decade for decade in wanted if decade in self.shards]
+        if wanted and not selected:
+            logger.info(f"No hay noticias de {', '.join(wanted)}; se consultan todas las décadas")
+        return selected or list(self.shards)
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        decades: Optional[Iterable[str]] = None,
+        where: Optional[Dict] = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> Dict[str, List[List]]:
+        """
+        Busca noticias en las particiones que corresponden a la consulta.
+
+        El embedding de la consulta se calcula una sola vez; cada partición
+        recibe su proyección (según su modo de almacenamiento) y aporta sus
+        n_results mejores resultados, que se combinan por distancia. Si
+        alguna partición usa PCA, las distancias de los candidatos se
+        recalculan en el espacio float32 del modelo antes de combinarlos.
+
+        Args:
+            query: Texto de la consulta
+            n_results: Número de resultados
+            decades: Limitar la búsqueda a estas décadas
+            where: Filtro de metadatos de ChromaDB
+            query_embedding: Embedding float32 de la consulta ya calculado con
+                el modelo de las colecciones (se calcula si se omite)
+
+        Returns:
+            Resultado con el formato de collection.query (una sola consulta);
+            las distancias son L2 al cuadrado en el espacio del modelo
+        """
+        merged = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        selected = self.route(query, decades)
+        if not selected:
+            return merged
+        vector = self.embedder.embed_queries([query]) if query_embedding is None else query_embedding
+
+        def query_shard(decade: Optional[str]) -> Dict:
+            return self.shards[decade].query(
+                query_embeddings=self.storages[decade].apply(vector),
+                n_results=n_results,
+                where=where,
+                include=['documents', 'metadatas', 'distances']
+            )
+
+        if self._executor is None or len(selected) == 1:
+            results = [query_shard(decade) for decade in selected]
+        else:
+            results = list(self._executor.map(query_shard, selected))
+
+        hits = [
+            (distance, doc_id, document, metadata)
+            for result in results
+            for doc_id, document, metadata, distance in zip(
+                result['ids'][0], result['documents'][0], result['metadatas'][0], result['distances'][0]
+            )
+        ]
+        if any(self.storages[decade].mode == "pca" for decade in selected):
+            # Cada partición ajusta su propia proyección PCA: sus distancias no
+            # son comparables, así que se recalculan en el espacio del modelo
+            distances = self.embedder.model_distances(vector, [hit[2] for hit in hits]).tolist()
+            hits = [(distance,) + hit[1:] for distance, hit in zip(distances, hits)]
+        hits = sorted(hits, key=lambda hit: hit[0])[:n_results]
+        for distance, doc_id, document, metadata in hits:
+            merged['ids'][0].append(doc_id)
+            merged['documents'][0].append(document)
+            merged['metadatas'][0].append(metadata)
+            merged['distances'][0].append(distance)
+        return merged
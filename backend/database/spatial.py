@@ -0,0 +1,183 @@
+"""
+Índice espacial de lugares por celdas de latitud/longitud.
+
+Los puntos se agrupan en celdas de cell_km de lado y se ordenan por celda
+(formato CSR: los puntos de la celda i son order[offsets[i]:offsets[i + 1]]).
+Una búsqueda por radio solo calcula distancias para los puntos de las celdas
+que cubren el círculo, con el kernel de Haversine vectorizado de
+data_processing.utils.geo_utils; k vecinos amplía el radio hasta reunir k puntos.
+"""
+import logging
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_processing.utils.geo_utils import EARTH_RADIUS_KM, haversine
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+DEFAULT_CELL_KM = 2.0
+# Media circunferencia: ningún punto está más lejos
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+class SpatialIndex:
+    """Índice de celdas para búsquedas por radio y de vecinos más cercanos."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        cell_km: float = DEFAULT_CELL_KM
+    ):
+        """
+        Construye el índice (los puntos sin coordenadas se ignoran).
+
+        Args:
+            ids: Id de cada punto
+            latitudes: Latitudes en grados (NaN si no hay)
+            longitudes: Longitudes en grados (NaN si no hay)
+            cell_km: Lado de las celdas en kilómetros
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self.ids: List[str] = [place_id for place_id, keep in zip(ids, valid) if keep]
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cell_km = cell_km
+
+        # Celda de cada punto y orden de los puntos por celda
+        cell_lat = np.floor(latitudes[valid] / self.cell_deg).astype(np.int64)
+        cell_lon = np.floor(longitudes[valid] / self.cell_deg).astype(np.int64)
+        order = np.lexsort((cell_lon, cell_lat))
+        self.rows = order
+        self.latitudes = np.radians(latitudes[valid][order])
+        self.longitudes = np.radians(longitudes[valid][order])
+        cells = np.stack([cell_lat[order], cell_lon[order]], axis=1)
+        if len(cells):
+            starts = np.flatnonzero(np.any(np.diff(cells, axis=0) != 0, axis=1)) + 1
+            starts = np.concatenate([[0], starts])
+        else:
+            starts = np.empty(0, dtype=np.int64)
+        self.cell_lat = cells[starts, 0] if len(cells) else starts
+        self.cell_lon = cells[starts, 1] if len(cells) else starts
+        self.offsets = np.append(starts, len(cells)).astype(np.int64)
+
+    @classmethod
+    def from_catalog(cls, catalog, cell_km: float = DEFAULT_CELL_KM) -> "SpatialIndex":
+        """
+        Construye el índice con las coordenadas de un catálogo de lugares.
+
+        Args:
+            catalog: PlaceCatalog de la colección
+            cell_km: Lado de las celdas en kilómetros
+
+        Returns:
+            SpatialIndex de los lugares con coordenadas
+        """
+        ids = [value.decode('utf-8') for value in catalog.ids]
+        return cls(ids, catalog.latitude, catalog.longitude, cell_km)
+
+    @classmethod
+    def from_collection(cls, collection, cell_km: float = DEFAULT_CELL_KM) -> "SpatialIndex":
+        """
+        Construye el índice con las coordenadas de los metadatos de ChromaDB.
+
+        Args:
+            collection: Colección con metadatos latitude y longitude
+            cell_km: Lado de las celdas en kilómetros
+
+        Returns:
+            SpatialIndex de los lugares con coordenadas
+        """
+        results = collection.get(include=['metadatas'])
+        parse = lambda value: float(value) if value not in (None, "") else math.nan
+        return cls(
+            results['ids'],
+            [parse(metadata.get('latitude')) for metadata in results['metadatas']],
+            [parse(metadata.get('longitude')) for metadata in results['metadatas']],
+            cell_km
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Posiciones de los puntos de las celdas que cubren el círculo."""
+        delta_lat = radius_km / KM_PER_DEGREE
+        # Ancho en longitud en la latitud más alejada del ecuador del círculo
+        cos_lat = math.cos(math.radians(min(abs(latitude) + delta_lat, 90.0)))
+        if cos_lat < 1e-9 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180.0:
+            return np.arange(len(self.ids))
+        delta_lon = radius_km / (KM_PER_DEGREE * cos_lat)
+        if abs(longitude) + delta_lon > 180.0:
+            # El círculo cruza el antimeridiano
+            return np.arange(len(self.ids))
+
+        selected = np.flatnonzero(
+            (self.cell_lat >= math.floor((latitude - delta_lat) / self.cell_deg))
+            & (self.cell_lat <= math.floor((latitude + delta_lat) / self.cell_deg))
+            & (self.cell_lon >= math.floor((longitude - delta_lon) / self.cell_deg))
+            & (self.cell_lon <= math.floor((longitude + delta_lon) / self.cell_deg))
+        )
+        starts = self.offsets[selected]
+        lengths = self.offsets[selected + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Concatenar los rangos [start, start + length) sin bucle de Python
+        shifts = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return np.arange(total) + shifts
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Puntos a menos de radius_km de unas coordenadas.
+
+        Args:
+            latitude: Latitud del centro en grados
+            longitude: Longitud del centro en grados
+            radius_km: Radio en kilómetros
+
+        Returns:
+            Tupla de (posiciones en ids, distancias en km), ordenadas por distancia
+        """
+        positions = self._candidates(latitude, longitude, radius_km)
+        distances = haversine(
+            math.radians(latitude), math.radians(longitude), self.latitudes[positions], self.longitudes[positions]
+        )
+        keep = distances <= radius_km
+        positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return self.rows[positions[order]], distances[order]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        max_distance_km: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Los k puntos más cercanos a unas coordenadas.
+
+        Se busca en radios crecientes hasta encontrar k puntos; todos los
+        puntos dentro del radio se evalúan, así que el resultado es exacto.
+
+        Args:
+            latitude: Latitud en grados
+            longitude: Longitud en grados
+            k: Número de puntos
+            max_distance_km: Distancia máxima (opcional)
+
+        Returns:
+            Tupla de (posiciones en ids, distancias en km), ordenadas por distancia
+        """
+        limit = min(max_distance_km, MAX_DISTANCE_KM) if max_distance_km is not None else MAX_DISTANCE_KM
+        radius = min(self.cell_km, limit)
+        while True:
+            positions, distances = self.within(latitude, longitude, radius)
+            if len(positions) >= k or radius >= limit:
+                return positions[:k], distances[:k]
+            radius = min(radius * 4, limit)
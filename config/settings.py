@@ -6,4 +6,37 @@ load_dotenv()
 class Settings:
     OPENWEATHER_API_KEY = os.getenv("OWM_API_KEY")
     EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL")
-    NEWS_CHUNK_SIZE = int(os.getenv("NEWS_CHUNK_SIZE", 512))
+    # Tamaño de los chunks de noticias en tokens del modelo de embeddings:
+    # paraphrase-multilingual-mpnet-base-v2 trunca a 128 tokens contando
+    # <s> y </s>, así que al texto le quedan 126
+    NEWS_CHUNK_SIZE = int(os.getenv("NEWS_CHUNK_SIZE", 128 - 2))
+    NEWS_CHUNK_OVERLAP = int(os.getenv("NEWS_CHUNK_OVERLAP", 16))
+    # Umbrales del filtro de calidad del texto OCR de las noticias
+    NEWS_QUALITY_FILTER = os.getenv("NEWS_QUALITY_FILTER", "1") == "1"
+    NEWS_MIN_ALPHA_RATIO = float(os.getenv("NEWS_MIN_ALPHA_RATIO", 0.5))
+    NEWS_MAX_SYMBOL_RATIO = float(os.getenv("NEWS_MAX_SYMBOL_RATIO", 0.35))
+    NEWS_MAX_REPEATED_RATIO = float(os.getenv("NEWS_MAX_REPEATED_RATIO", 0.2))
+    NEWS_MAX_SHORT_WORD_RATIO = float(os.getenv("NEWS_MAX_SHORT_WORD_RATIO", 0.4))
+    NEWS_MIN_LINE_CHARS = int(os.getenv("NEWS_MIN_LINE_CHARS", 3))
+    NEWS_MIN_DICTIONARY_RATIO = float(os.getenv("NEWS_MIN_DICTIONARY_RATIO", 0.15))
+    # Deduplicación MinHash/LSH de los chunks de noticias (dentro de cada década)
+    NEWS_DEDUP = os.getenv("NEWS_DEDUP", "1") == "1"
+    NEWS_DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", 0.8))
+    # Caché persistente de embeddings, compartida por la ingesta y la API (directorio y tamaño máximo en MB)
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("chroma_db", "embedding_cache"))
+    EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 2048))
+    # Backend de inferencia de embeddings ("torch" u "onnx") y opciones de ONNX
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join("chroma_db", "onnx_models"))
+    # Hilos intra-op de onnxruntime (0 = los que elija onnxruntime)
+    EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", 0))
+    # Formato de los vectores almacenados ("float32", "float16" o "pca") y dimensiones de PCA
+    EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+    EMBEDDING_PCA_DIM = int(os.getenv("EMBEDDING_PCA_DIM", 256))
+    # Caché en memoria de embeddings de consultas (entradas y segundos de vida, 0 = sin caducidad)
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 4096))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+    # Caché semántica de respuestas del RAG (similitud mínima, entradas y segundos de vida)
+    RAG_CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", 0.95))
+    RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", 1024))
+    RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", 24 * 3600))
@@ -0,0 +1,89 @@
+"""
+Benchmark de los backends de embeddings (PyTorch frente a ONNX int8).
+
+Sobre las descripciones del corpus de landmarks mide la latencia de una
+consulta individual, el rendimiento por lotes y la concordancia coseno entre
+los vectores de ambos backends.
+
+Uso:
+    python -m data_processing.benchmark_embedding_backends [--limit N] [--threads 1 2 4]
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List
+
+import numpy as np
+
+from backend.ai.embeddings.onnx_backend import OnnxEncoder
+from backend.ai.embeddings.registry import INDEX_MODEL, get_model
+from data_processing.utils.html_utils import extract_page_info
+
+DATA_DIR = "data/landmarks"
+
+def load_descriptions(limit: int) -> List[str]:
+    """Carga las descripciones de los landmarks."""
+    names = sorted(f for f in os.listdir(DATA_DIR) if f.endswith('.txt'))
+    if limit:
+        names = names[:limit]
+    descriptions = []
+    for name in names:
+        description = extract_page_info(os.path.join(DATA_DIR, name))["description"]
+        if description:
+            descriptions.append(description)
+    return descriptions
+
+def measure(name: str, model, texts: List[str], queries: List[str]) -> np.ndarray:
+    """Imprime latencia y rendimiento de un modelo y devuelve sus vectores."""
+    model.encode(queries[:2])  # Calentamiento
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<16} consulta p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms  "
+        f"lotes {len(texts) / elapsed:7.1f} docs/s"
+    )
+    return embeddings
+
+def cosine_agreement(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Similitud coseno fila a fila entre dos matrices de vectores."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de backends de embeddings.')
+    parser.add_argument('--limit', type=int, default=0, help='Número máximo de landmarks')
+    parser.add_argument('--queries', type=int, default=100, help='Número de consultas individuales')
+    parser.add_argument('--threads', type=int, nargs='*', default=[0], help='Hilos intra-op de ONNX a probar (0 = automático)')
+    parser.add_argument('--model', default=INDEX_MODEL, help='Modelo de SentenceTransformer')
+    args = parser.parse_args()
+
+    texts = load_descriptions(args.limit)
+    # Consultas cortas: la primera oración de cada descripción
+    queries = [text.split('. ')[0] for text in texts[:args.queries]]
+    print(f"\nDescripciones: {len(texts)}, consultas: {len(queries)}\n")
+
+    reference = measure("PyTorch", get_model(args.model, "torch"), texts, queries)
+    for threads in args.threads:
+        encoder = OnnxEncoder(args.model, intra_op_threads=threads)
+        embeddings = measure(f"ONNX int8 ({threads or 'auto'})", encoder, texts, queries)
+        agreement = cosine_agreement(reference, embeddings)
+        print(
+            f"{'':<16} coseno con PyTorch: media {agreement.mean():.4f}  "
+            f"p5 {np.percentile(agreement, 5):.4f}  mínimo {agreement.min():.4f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark del extractor HTML de una sola pasada frente a BeautifulSoup.
+
+Verifica que extract_page_info produce exactamente la misma salida que
+parse_html_file + extract_coordinates/extract_description/extract_categories
+y muestra el tiempo de parseo por página de cada método.
+
+Uso:
+    python -m data_processing.benchmark_extraction [--limit N] [directorio ...]
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from data_processing.utils.html_utils import (
+    parse_html_file,
+    extract_coordinates,
+    extract_description,
+    extract_categories,
+    extract_page_info
+)
+
+DEFAULT_DIRS = ["data/landmarks", "data/municipalities"]
+
+def extract_with_soup(file_path: str) -> Dict:
+    """Extrae la información con el árbol completo de BeautifulSoup."""
+    soup = parse_html_file(file_path)
+    return {
+        "coordinates": extract_coordinates(soup),
+        "description": extract_description(soup),
+        "categories": extract_categories(soup)
+    }
+
+def time_per_page(func, file_paths: List[str]) -> List[float]:
+    """Devuelve el tiempo en milisegundos de cada página."""
+    timings = []
+    for file_path in file_paths:
+        start = time.perf_counter()
+        func(file_path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def summarize(name: str, timings: List[float]) -> None:
+    """Imprime las estadísticas de tiempos por página."""
+    ordered = sorted(timings)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(
+        f"{name:<16} media {statistics.mean(timings):7.2f} ms  "
+        f"p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms  "
+        f"total {sum(timings) / 1000:6.2f} s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del extractor HTML.')
+    parser.add_argument('dirs', nargs='*', default=DEFAULT_DIRS, help='Directorios con páginas HTML')
+    parser.add_argument('--limit', type=int, default=0, help='Número máximo de páginas por directorio')
+    args = parser.parse_args()
+
+    file_paths = []
+    for data_dir in args.dirs:
+        names = sorted(f for f in os.listdir(data_dir) if f.endswith('.txt'))
+        if args.limit:
+            names = names[:args.limit]
+        file_paths.extend(os.path.join(data_dir, name) for name in names)
+
+    # Verificar que ambos métodos producen la misma salida
+    mismatches = [p for p in file_paths if extract_page_info(p) != extract_with_soup(p)]
+    print(f"\nPáginas: {len(file_paths)}, diferencias: {len(mismatches)}")
+    for file_path in mismatches[:10]:
+        print(f"  {file_path}")
+
+    print()
+    summarize("BeautifulSoup", time_per_page(extract_with_soup, file_paths))
+    summarize("Una sola pasada", time_per_page(extract_page_info, file_paths))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Microbenchmark de los kernels geográficos.
+
+Compara las funciones escalares de utils.geo_utils (geodesic de geopy y
+Haversine con el módulo math, punto a punto) con los kernels vectorizados
+de NumPy sobre puntos aleatorios en Puerto Rico, verifica que los
+resultados coinciden y muestra el tiempo de cada uno.
+
+Uso:
+    python -m data_processing.benchmark_geo [--points N] [--queries Q] [--k K]
+"""
+import argparse
+import time
+from math import atan2, cos, radians, sin, sqrt
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from data_processing.utils.geo_utils import (
+    EARTH_RADIUS_KM,
+    PR_EXTENDED_BOUNDS,
+    calculate_distance,
+    distance_matrix,
+    distances_to,
+    find_nearest_points,
+    nearest_k,
+    within_bounds
+)
+
+def legacy_get_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
+    """Implementación anterior de geo_utils.get_distance (Haversine con math)."""
+    lat1, lon1, lat2, lon2 = map(radians, (*coord1, *coord2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * atan2(sqrt(a), sqrt(1 - a))
+
+def legacy_find_nearest_points(
+    target: Tuple[float, float],
+    points: List[Tuple[float, float]],
+    max_distance: Optional[float] = None
+) -> List[Tuple[float, float]]:
+    """Implementación anterior de geo_utils.find_nearest_points (geodesic por punto)."""
+    distances = [(p, calculate_distance(target, p)) for p in points]
+    if max_distance:
+        distances = [(p, d) for p, d in distances if d <= max_distance]
+    return [p for p, _ in sorted(distances, key=lambda x: x[1])]
+
+def legacy_is_within_puerto_rico(lat: float, lon: float) -> bool:
+    """Implementación anterior de geo_utils.is_within_puerto_rico."""
+    min_lat, max_lat, min_lon, max_lon = PR_EXTENDED_BOUNDS
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+def timed(func: Callable, repeat: int = 3) -> float:
+    """Mejor tiempo en milisegundos de varias ejecuciones."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def report(name: str, old_ms: float, new_ms: float) -> None:
+    """Imprime el tiempo de la versión anterior y la vectorizada."""
+    print(f"{name:<28} anterior {old_ms:10.2f} ms  vectorizada {new_ms:8.2f} ms  ({old_ms / max(new_ms, 1e-9):7.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los kernels geográficos.')
+    parser.add_argument('--points', type=int, default=20000, help='Número de puntos')
+    parser.add_argument('--queries', type=int, default=100, help='Filas de la matriz de distancias')
+    parser.add_argument('--k', type=int, default=10, help='Vecinos más cercanos')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    coords = np.column_stack([rng.uniform(17.8, 18.6, args.points), rng.uniform(-67.4, -65.1, args.points)])
+    points = [tuple(p) for p in coords.tolist()]
+    queries = points[:args.queries]
+    target = (18.2208, -66.5901)
+    print(f"\nPuntos: {len(points)}, consultas de la matriz: {len(queries)}, k = {args.k}\n")
+
+    # Verificar que los kernels coinciden con las funciones escalares
+    scalar = np.array([legacy_get_distance(target, p) for p in points])
+    print(f"{'distances_to':<28} error máximo frente a Haversine escalar: {np.abs(distances_to(target, coords) - scalar).max():.2e} km")
+    sample = np.array([[legacy_get_distance(q, p) for p in points[:1000]] for q in queries[:20]])
+    print(f"{'distance_matrix':<28} error máximo frente a Haversine escalar: {np.abs(distance_matrix(queries[:20], coords[:1000]) - sample).max():.2e} km")
+    indices, _ = nearest_k(target, coords, args.k)
+    print(f"{'nearest_k':<28} igual que ordenar Haversine escalar: {indices.tolist() == np.argsort(scalar, kind='stable')[:args.k].tolist()}")
+    legacy = legacy_find_nearest_points(target, points, max_distance=25)
+    new = find_nearest_points(target, points, max_distance=25)
+    geodesic_error = max(abs(calculate_distance(target, p) - legacy_get_distance(target, p)) for p in new)
+    print(
+        f"{'find_nearest_points':<28} {len(new)} puntos (antes {len(legacy)}), "
+        f"mismos {args.k} primeros: {legacy[:args.k] == new[:args.k]}, "
+        f"diferencia máxima geodesic/Haversine {geodesic_error * 1000:.0f} m"
+    )
+    inside = [legacy_is_within_puerto_rico(lat, lon) for lat, lon in points]
+    print(f"{'within_bounds':<28} iguales: {inside == within_bounds(coords[:, 0], coords[:, 1], PR_EXTENDED_BOUNDS).tolist()}")
+
+    print()
+    report("uno a muchos", timed(lambda: [legacy_get_distance(target, p) for p in points]), timed(lambda: distances_to(target, coords)))
+    report(
+        "muchos a muchos",
+        timed(lambda: [[legacy_get_distance(q, p) for p in points] for q in queries], repeat=1),
+        timed(lambda: distance_matrix(queries, coords))
+    )
+    report(
+        f"top-{args.k}",
+        timed(lambda: sorted(range(len(points)), key=lambda i: legacy_get_distance(target, points[i]))[:args.k]),
+        timed(lambda: nearest_k(target, coords, args.k))
+    )
+    report(
+        "find_nearest_points",
+        timed(lambda: legacy_find_nearest_points(target, points, max_distance=25), repeat=1),
+        timed(lambda: find_nearest_points(target, points, max_distance=25))
+    )
+    report(
+        "límites de Puerto Rico",
+        timed(lambda: [legacy_is_within_puerto_rico(lat, lon) for lat, lon in points]),
+        timed(lambda: within_bounds(coords[:, 0], coords[:, 1], PR_EXTENDED_BOUNDS))
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de la búsqueda híbrida (embeddings + BM25 con RRF).
+
+Sobre las páginas de landmarks y municipios genera tres tipos de consultas
+cuya respuesta correcta es una página concreta:
+
+- nombre: el nombre de la página ("castillo san felipe del morro");
+- rara: una palabra que solo aparece en esa página (topónimos taínos,
+  apellidos, etc.);
+- fragmento: una oración tomada de la descripción.
+
+Para cada tipo muestra el recall@k (fracción de consultas cuya página está
+entre los k primeros resultados) de la búsqueda densa sola (distancia L2,
+la de ChromaDB), BM25 solo y ambos fusionados con reciprocal rank fusion, y
+la latencia que añaden BM25 y la fusión.
+
+Uso:
+    python -m data_processing.benchmark_hybrid [--queries N] [-k K] [--model MODELO]
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.ai.embeddings.registry import INDEX_MODEL, get_model
+from backend.database.bm25 import CANDIDATE_FACTOR, MIN_CANDIDATES, BM25Index, reciprocal_rank_fusion, tokenize
+from data_processing.benchmark_vector_storage import top_k
+from data_processing.utils.encoding_utils import normalize_filename
+from data_processing.utils.html_utils import extract_page_info
+
+PAGE_DIRS = ["data/landmarks", "data/municipalities"]
+
+def load_pages(data_dirs: List[str]) -> Tuple[List[str], List[str]]:
+    """Nombres y descripciones de las páginas con descripción."""
+    names, descriptions = [], []
+    for data_dir in data_dirs:
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith('.txt'):
+                description = extract_page_info(os.path.join(data_dir, name))["description"]
+                if description:
+                    names.append(normalize_filename(Path(name).stem))
+                    descriptions.append(description)
+    return names, descriptions
+
+def build_queries(names: List[str], descriptions: List[str], count: int) -> Dict[str, List[Tuple[str, int]]]:
+    """Consultas de cada tipo con la fila de su página."""
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(names), size=min(count, len(names)), replace=False).tolist()
+    frequency: Dict[str, int] = {}
+    for description in descriptions:
+        for token in set(tokenize(description)):
+            frequency[token] = frequency.get(token, 0) + 1
+
+    queries: Dict[str, List[Tuple[str, int]]] = {"nombre": [], "rara": [], "fragmento": []}
+    for row in sample:
+        queries["nombre"].append((names[row].replace('_', ' '), row))
+        rare = sorted(
+            token for token in set(tokenize(descriptions[row]))
+            if frequency[token] == 1 and len(token) >= 6 and token.isalpha()
+        )
+        if rare:
+            queries["rara"].append((rare[int(rng.integers(len(rare)))], row))
+        sentences = [s for s in descriptions[row].split('. ') if len(s.split()) >= 6]
+        if sentences:
+            queries["fragmento"].append((sentences[int(rng.integers(len(sentences)))], row))
+    return queries
+
+def recall(rankings: List[List[int]], targets: List[int], k: int) -> float:
+    """Fracción de consultas cuya página está entre los k primeros."""
+    return float(np.mean([target in ranking[:k] for ranking, target in zip(rankings, targets)]))
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    """Percentil de una lista de tiempos en segundos, en milisegundos."""
+    return float(np.percentile(samples, q)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la búsqueda híbrida.')
+    parser.add_argument('--data-dirs', nargs='*', default=PAGE_DIRS, help='Directorios de páginas')
+    parser.add_argument('--queries', type=int, default=200, help='Consultas de cada tipo')
+    parser.add_argument('--model', default=INDEX_MODEL, help='Modelo de SentenceTransformer')
+    parser.add_argument('-k', type=int, default=5, help='Resultados para recall@k')
+    args = parser.parse_args()
+
+    names, descriptions = load_pages(args.data_dirs)
+    start = time.perf_counter()
+    lexical = BM25Index(range(len(names)), [f"{name}\n{text}" for name, text in zip(names, descriptions)])
+    build_ms = (time.perf_counter() - start) * 1000
+    model = get_model(args.model)
+    corpus = np.asarray(model.encode(descriptions), dtype=np.float32)
+    queries = build_queries(names, descriptions, args.queries)
+    candidates = max(args.k * CANDIDATE_FACTOR, MIN_CANDIDATES)
+    print(
+        f"\nPáginas: {len(names)}, términos: {len(lexical.vocabulary)}, apariciones: {len(lexical.rows)} "
+        f"({(lexical.rows.nbytes + lexical.weights.nbytes + lexical.offsets.nbytes) / 2**20:.2f}MB, "
+        f"construido en {build_ms:.0f} ms)\n"
+    )
+
+    print(f"{'consultas':<11} {'n':>4} {'densa':>8} {'BM25':>8} {'RRF':>8}   (recall@{args.k})")
+    lexical_times, fusion_times = [], []
+    for kind, items in queries.items():
+        texts = [text for text, _ in items]
+        targets = [row for _, row in items]
+        vectors = np.asarray(model.encode(texts), dtype=np.float32)
+        dense = top_k(corpus, vectors, candidates).tolist()
+        sparse, fused = [], []
+        for text, dense_rows in zip(texts, dense):
+            start = time.perf_counter()
+            rows = lexical.search(text, candidates)[0].tolist()
+            middle = time.perf_counter()
+            ranking = [row for row, _ in reciprocal_rank_fusion([dense_rows, rows])]
+            end = time.perf_counter()
+            lexical_times.append(middle - start)
+            fusion_times.append(end - middle)
+            sparse.append(rows)
+            fused.append(ranking)
+        print(
+            f"{kind:<11} {len(items):>4} {recall(dense, targets, args.k):>8.3f} "
+            f"{recall(sparse, targets, args.k):>8.3f} {recall(fused, targets, args.k):>8.3f}"
+        )
+
+    total = [a + b for a, b in zip(lexical_times, fusion_times)]
+    print(f"\nLatencia añadida por consulta ({len(total)} consultas, {candidates} candidatos por búsqueda):")
+    for label, samples in (("BM25", lexical_times), ("RRF", fusion_times), ("total", total)):
+        print(f"  {label:<6} p50 {percentile_ms(samples, 50):6.3f} ms  p95 {percentile_ms(samples, 95):6.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark del motor de normalización de texto.
+
+Compara las implementaciones anteriores de clean_text y normalize_filename
+con las del módulo utils.normalization sobre texto real de data/, verifica
+que producen la misma salida y muestra el tiempo de cada una.
+
+Uso:
+    python -m data_processing.benchmark_normalization [--limit N]
+"""
+import argparse
+import os
+import re
+import time
+import unicodedata
+from typing import Callable, List
+
+from data_processing.utils.normalization import (
+    collapse_whitespace,
+    collapse_whitespace_batch,
+    fold_text,
+    fold_texts,
+    normalize_filename,
+    normalize_filenames
+)
+
+DATA_DIRS = [
+    "data/landmarks",
+    "data/municipalities",
+    "data/elmundo_chunked_es_page1_40years"
+]
+
+def legacy_fold_text(text: str) -> str:
+    """Implementación anterior de encoding_utils.clean_text."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)
+                  and (c.isascii() or c in 'áéíóúñÁÉÍÓÚÑ'))
+    return ' '.join(text.split())
+
+def legacy_collapse_whitespace(text: str) -> str:
+    """Implementación anterior de text_utils.clean_text."""
+    text = re.sub(r'[\n\r\t]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def legacy_normalize_filename(filename: str) -> str:
+    """Implementación anterior de encoding_utils.normalize_filename."""
+    replacements = {
+        '‚': 'e', 'ค': 'n', '¡': 'i', '¤': 'n', '｣': 'a', 'ข': 'o', '‡': 'u',
+    }
+    for old, new in replacements.items():
+        filename = filename.replace(old, new)
+    filename = unicodedata.normalize('NFKD', filename)
+    filename = filename.replace(' ', '_')
+    filename = filename.replace(',', '')
+    filename = filename.replace('(', '')
+    filename = filename.replace(')', '')
+    return filename
+
+def load_corpus(limit: int):
+    """Carga líneas de texto y nombres de archivo de los directorios de datos."""
+    lines, filenames = [], []
+    for data_dir in DATA_DIRS:
+        if not os.path.isdir(data_dir):
+            continue
+        names = sorted(f for f in os.listdir(data_dir) if f.endswith('.txt'))
+        if limit:
+            names = names[:limit]
+        for name in names:
+            filenames.append(os.path.splitext(name)[0])
+            with open(os.path.join(data_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                lines.extend(f)
+    return lines, filenames
+
+def check(name: str, expected: List[str], actual: List[str]) -> None:
+    """Imprime el número de diferencias entre dos salidas."""
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"{name:<22} diferencias: {mismatches} de {len(expected)}")
+
+def timed(func: Callable, *args, repeat: int = 3) -> float:
+    """Mejor tiempo en milisegundos de varias ejecuciones."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def compare(name: str, legacy: Callable, new: Callable, batch: Callable, items: List[str]) -> None:
+    """Imprime el tiempo de la versión anterior, la nueva y la de lotes."""
+    old_ms = timed(lambda: [legacy(t) for t in items])
+    new_ms = timed(lambda: [new(t) for t in items])
+    batch_ms = timed(batch, items)
+    print(
+        f"{name:<22} anterior {old_ms:9.1f} ms  nueva {new_ms:9.1f} ms  "
+        f"lotes {batch_ms:9.1f} ms  ({old_ms / min(new_ms, batch_ms):5.1f}x)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de normalización de texto.')
+    parser.add_argument('--limit', type=int, default=0, help='Número máximo de archivos por directorio')
+    args = parser.parse_args()
+
+    lines, filenames = load_corpus(args.limit)
+    print(f"\nLíneas: {len(lines)}, nombres de archivo: {len(filenames)}\n")
+
+    # Verificar que las salidas son equivalentes
+    check("fold_text", [legacy_fold_text(t) for t in lines], fold_texts(lines))
+    check("collapse_whitespace", [legacy_collapse_whitespace(t) for t in lines], collapse_whitespace_batch(lines))
+    check("normalize_filename", [legacy_normalize_filename(t) for t in filenames], normalize_filenames(filenames))
+
+    print()
+    compare("fold_text", legacy_fold_text, fold_text, fold_texts, lines)
+    compare("collapse_whitespace", legacy_collapse_whitespace, collapse_whitespace, collapse_whitespace_batch, lines)
+    compare("normalize_filename", legacy_normalize_filename, normalize_filename, normalize_filenames, filenames)
+
+if __name__ == "__main__":
+    main()
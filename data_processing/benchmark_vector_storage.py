@@ -0,0 +1,122 @@
+"""
+Benchmark de los modos de almacenamiento compacto de vectores.
+
+Sobre las descripciones de landmarks y municipios (y opcionalmente chunks de
+noticias) compara float32 con float16 y proyecciones PCA:
+
+- recall@10 de la búsqueda exacta (distancia L2, la de las colecciones de
+  ChromaDB) respecto a los vectores float32 originales;
+- bytes por vector del formato y memoria del índice de ChromaDB, que guarda
+  siempre float32 (float16 no lo reduce; PCA sí, por tener menos
+  dimensiones);
+- memoria asignada al pasar un lote de vectores a la base de datos como
+  listas de Python frente a matrices de NumPy.
+
+Uso:
+    python -m data_processing.benchmark_vector_storage [--news N] [--pca-dims 384 256 128]
+"""
+import argparse
+import os
+import tracemalloc
+from typing import Callable, List
+
+import numpy as np
+
+from backend.ai.embeddings.registry import INDEX_MODEL, get_model
+from backend.ai.embeddings.storage import VectorStorage
+from data_processing.processors.news_processor import extract_news_info
+from data_processing.utils.html_utils import extract_page_info
+
+PAGE_DIRS = ["data/landmarks", "data/municipalities"]
+NEWS_DIR = "data/elmundo_chunked_es_page1_40years"
+
+def load_corpus(news_files: int) -> List[str]:
+    """Carga las descripciones de las páginas y, opcionalmente, chunks de noticias."""
+    texts = []
+    for data_dir in PAGE_DIRS:
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith('.txt'):
+                description = extract_page_info(os.path.join(data_dir, name))["description"]
+                if description:
+                    texts.append(description)
+    if news_files:
+        names = sorted(f for f in os.listdir(NEWS_DIR) if f.endswith('.txt'))[:news_files]
+        for name in names:
+            info = extract_news_info(os.path.join(NEWS_DIR, name))
+            if info:
+                texts.extend(info["chunks"])
+    return texts
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los k vecinos más cercanos por distancia L2."""
+    corpus = corpus.astype(np.float32)
+    queries = queries.astype(np.float32)
+    distances = (
+        (queries ** 2).sum(axis=1)[:, None]
+        - 2 * queries @ corpus.T
+        + (corpus ** 2).sum(axis=1)[None, :]
+    )
+    return np.argsort(distances, axis=1)[:, :k]
+
+def recall_at_k(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Fracción media de los vecinos exactos recuperados."""
+    k = expected.shape[1]
+    return float(np.mean([len(set(e) & set(a)) / k for e, a in zip(expected, actual)]))
+
+def allocated_bytes(func: Callable) -> int:
+    """Pico de memoria asignada por una función."""
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de almacenamiento compacto de vectores.')
+    parser.add_argument('--news', type=int, default=0, help='Número de archivos de noticias a incluir')
+    parser.add_argument('--queries', type=int, default=200, help='Número de consultas')
+    parser.add_argument('--pca-dims', type=int, nargs='*', default=[384, 256, 128], help='Dimensiones PCA a probar')
+    parser.add_argument('--batch-size', type=int, default=256, help='Tamaño de lote para medir asignaciones')
+    parser.add_argument('--model', default=INDEX_MODEL, help='Modelo de SentenceTransformer')
+    parser.add_argument('-k', type=int, default=10, help='Vecinos para recall@k')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.news)
+    model = get_model(args.model)
+    corpus = np.asarray(model.encode(texts), dtype=np.float32)
+    # Consultas cortas: la primera oración de una muestra de documentos
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    queries = np.asarray(model.encode([texts[i].split('. ')[0] for i in sample]), dtype=np.float32)
+    expected = top_k(corpus, queries, args.k)
+    print(f"\nDocumentos: {len(texts)}, consultas: {len(queries)}, dimensión: {corpus.shape[1]}\n")
+
+    modes = [VectorStorage("float16")]
+    for dim in args.pca_dims:
+        storage = VectorStorage("pca", dim)
+        storage.fit(corpus)
+        modes.append(storage)
+
+    base_bytes = corpus[0].nbytes
+    print(f"{'modo':<10} {'recall@' + str(args.k):>10} {'bytes/vector':>13} {'índice':>8}")
+    print(f"{'float32':<10} {1.0:>10.4f} {base_bytes:>13} {corpus.nbytes / 2**20:>6.1f}MB")
+    for storage in modes:
+        stored = storage.apply(corpus)
+        recall = recall_at_k(expected, top_k(stored, storage.apply(queries), args.k))
+        # ChromaDB convierte los vectores a float32 al indexarlos
+        index_bytes = stored.size * np.dtype(np.float32).itemsize
+        print(f"{storage.name:<10} {recall:>10.4f} {stored[0].nbytes:>13} {index_bytes / 2**20:>6.1f}MB")
+
+    # Asignaciones al entregar un lote a la base de datos
+    batch = corpus[:args.batch_size]
+    as_lists = allocated_bytes(lambda: batch.tolist())
+    as_arrays = allocated_bytes(lambda: list(batch.copy()))
+    as_float16 = allocated_bytes(lambda: list(batch.astype(np.float16)))
+    print(
+        f"\nLote de {len(batch)} vectores: listas {as_lists / 2**20:.2f}MB, "
+        f"NumPy float32 {as_arrays / 2**20:.2f}MB, NumPy float16 {as_float16 / 2**20:.2f}MB"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -3,29 +3,35 @@ Script principal para procesar los datos.
 """
 import argparse
 import logging
+
+from config.settings import Settings
+from backend.ai.embeddings.storage import DEFAULT_PCA_DIM, DEFAULT_STORAGE, STORAGE_MODES
+from backend.database.chromadb_setup import DEFAULT_PERSIST_DIRECTORY
 from .processors.landmark_processor import LandmarkProcessor
 from .processors.municipality_processor import MunicipalityProcessor
 from .processors.news_processor import NewsProcessor
+from .utils.manifest import finish_force_run, start_force_run
+from .utils.profiling import IngestionProfiler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def process_landmarks(force_reprocess: bool = False):
+def process_landmarks(force_reprocess: bool = False, workers: int = 1, batch_size: int = 256, **options):
     """Procesa los landmarks históricos."""
     logger.info("Procesando landmarks...")
-    processor = LandmarkProcessor()
+    processor = LandmarkProcessor(workers=workers, batch_size=batch_size, **options)
     processor.create_embeddings_db(force_reprocess=force_reprocess)
 
-def process_municipalities(force_reprocess: bool = False):
+def process_municipalities(force_reprocess: bool = False, workers: int = 1, batch_size: int = 256, **options):
     """Procesa los municipios."""
     logger.info("\nProcesando municipios...")
-    processor = MunicipalityProcessor()
+    processor = MunicipalityProcessor(workers=workers, batch_size=batch_size, **options)
     processor.create_embeddings_db(force_reprocess=force_reprocess)
 
-def process_news(force_reprocess: bool = False):
+def process_news(force_reprocess: bool = False, workers: int = 1, batch_size: int = 256, **options):
     """Procesa las noticias históricas."""
     logger.info("\nProcesando noticias históricas...")
-    processor = NewsProcessor()
+    processor = NewsProcessor(workers=workers, batch_size=batch_size, **options)
     processor.create_embeddings_db(force_reprocess=force_reprocess)
 
 def main():
@@ -34,7 +40,25 @@ def main():
     parser.add_argument('--municipalities', action='store_true', help='Procesar municipios')
     parser.add_argument('--news', action='store_true', help='Procesar noticias históricas')
     parser.add_argument('--force', action='store_true', help='Forzar reprocesamiento aunque existan datos')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Con --force, continuar una reconstrucción interrumpida desde el último lote confirmado en lugar de empezar de nuevo'
+    )
     parser.add_argument('--all', action='store_true', help='Procesar todos los tipos de datos')
+    parser.add_argument('--workers', type=int, default=1, help='Número de procesos para parsear los archivos (por defecto 1, serial)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Número de documentos por lote de embeddings y escritura')
+    parser.add_argument(
+        '--storage', choices=STORAGE_MODES, default=DEFAULT_STORAGE,
+        help='Formato de los vectores almacenados: pca reduce la memoria del índice; float16 solo las transferencias y el catálogo'
+    )
+    parser.add_argument('--pca-dim', type=int, default=DEFAULT_PCA_DIM, help='Dimensiones de la proyección con --storage pca')
+    parser.add_argument('--no-quality-filter', action='store_true', help='No descartar la basura OCR de las noticias')
+    parser.add_argument('--no-dedup', action='store_true', help='Indexar también los chunks de noticias casi duplicados')
+    parser.add_argument('--news-dir', nargs='+', help='Directorios de noticias (se deduplican entre sí)')
+    parser.add_argument(
+        '--profile', nargs='?', const='ingestion_profile.json', metavar='JSON',
+        help='Medir cada etapa de la ingesta y guardar el informe (por defecto ingestion_profile.json)'
+    )
     
     args = parser.parse_args()
     
@@ -44,14 +68,43 @@ def main():
         return
     
     # Procesar según los argumentos
+    options = dict(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        storage=args.storage,
+        pca_dim=args.pca_dim,
+        resume=args.resume
+    )
+    profiler = None
+    if args.profile:
+        profiler = IngestionProfiler(force=args.force, **options)
+        options["profiler"] = profiler
+    if args.force:
+        # Un solo id para todas las colecciones: --resume salta las ya reconstruidas
+        options["force_run"] = start_force_run(DEFAULT_PERSIST_DIRECTORY, resume=args.resume)
+    
     if args.all or args.landmarks:
-        process_landmarks(force_reprocess=args.force)
+        process_landmarks(force_reprocess=args.force, **options)
     
     if args.all or args.municipalities:
-        process_municipalities(force_reprocess=args.force)
+        process_municipalities(force_reprocess=args.force, **options)
     
     if args.all or args.news:
-        process_news(force_reprocess=args.force)
+        news_options = dict(
+            quality_filter=Settings.NEWS_QUALITY_FILTER and not args.no_quality_filter,
+            dedup=Settings.NEWS_DEDUP and not args.no_dedup
+        )
+        if args.news_dir:
+            news_options["data_dir"] = args.news_dir
+        process_news(force_reprocess=args.force, **news_options, **options)
+    
+    if args.force:
+        finish_force_run(DEFAULT_PERSIST_DIRECTORY)
+    
+    if profiler:
+        report = profiler.report()
+        profiler.print_report(report)
+        profiler.save(args.profile, report)
     
     logger.info("\n¡Procesamiento completado!")
 
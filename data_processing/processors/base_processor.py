@@ -2,65 +2,169 @@
 Base processor for all data types.
 """
 import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, islice
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 import logging
+import numpy as np
+
+from backend.ai.embeddings import (
+    INDEX_MODEL,
+    MultilingualEmbedder,
+    VectorStorage,
+    check_collection_model,
+    get_embedder,
+    index_metadata
+)
+from backend.ai.embeddings.storage import DEFAULT_PCA_DIM, DEFAULT_STORAGE
+from backend.database.bm25 import BM25Index, lexical_index_path
+from backend.database.catalog import build_catalog, catalog_exists, catalog_path
+from backend.database.index_version import IndexVersion, bump_index_version, new_index_version
+from config.settings import Settings
+from ..utils.manifest import IngestionManifest, start_force_run
+from ..utils.profiling import IngestionProfiler, ProfiledTask, SectionProfile
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class FileCommit(NamedTuple):
+    """Marker following the last record of a file in a record stream."""
+    file_path: str
+    ids: List[str]
+
 class BaseProcessor:
     """Base class for all processors with common ChromaDB functionality."""
     
-    def __init__(self, persist_directory: str = "chroma_db"):
+    # Model used to embed every collection
+    EMBEDDING_MODEL = INDEX_MODEL
+    # Bump in a subclass whenever its extraction output changes
+    EXTRACTOR_VERSION = "1"
+    # Documents used to fit the PCA projection of the "pca" storage mode
+    PCA_SAMPLE_SIZE = 4096
+    # Export a columnar place catalog after each sync (see backend.database.catalog)
+    EXPORT_CATALOG = False
+    # Save the BM25 index of the collection after each sync (see backend.database.bm25)
+    EXPORT_LEXICAL_INDEX = False
+    # Metadata field indexed with each document in the BM25 index
+    LEXICAL_NAME_FIELD: Optional[str] = None
+    
+    def __init__(
+        self,
+        persist_directory: str = "chroma_db",
+        workers: int = 1,
+        batch_size: int = 256,
+        max_pending_batches: int = 2,
+        storage: str = DEFAULT_STORAGE,
+        pca_dim: int = DEFAULT_PCA_DIM,
+        profiler: Optional[IngestionProfiler] = None,
+        resume: bool = False,
+        force_run: Optional[str] = None
+    ):
         """
         Initialize the base processor.
         
         Args:
             persist_directory: Directory to persist ChromaDB data
+            workers: Number of worker processes for the parsing stage (1 = serial)
+            batch_size: Number of documents embedded and written per batch
+            max_pending_batches: Batches allowed to wait for the writer before
+                the parsing stage blocks
+            storage: Vector storage mode ("float32", "float16" or "pca");
+                only "pca" shrinks the ChromaDB index, which keeps float32
+            pca_dim: Dimensions kept by the "pca" storage mode
+            profiler: Collects per-stage timings (``--profile``)
+            resume: Continue an interrupted rebuild instead of restarting it
+                when ``force_reprocess`` is set (``--resume``)
+            force_run: Id of the forced rebuild shared by every processor of
+                the run (started on the first forced sync if omitted)
         """
         self.persist_directory = persist_directory
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_pending_batches = max(1, max_pending_batches)
+        self.storage = storage
+        self.pca_dim = pca_dim
+        self.profiler = profiler
+        self.resume = resume
+        self.force_run = force_run
+        self.profile_section: Optional[SectionProfile] = None
         self._ensure_persist_directory()
         
         # Initialize ChromaDB with persistence
         self.client = chromadb.PersistentClient(path=persist_directory)
         
-        # Initialize the multilingual embedding function
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
-        )
+        # Shared multilingual embedding function. The model is loaded once per
+        # process, and only when a vector is missing from the on-disk cache
+        # (Settings.EMBEDDING_CACHE_DIR, shared with the API).
+        self.embedding_function = get_embedder(self.EMBEDDING_MODEL, Settings.EMBEDDING_CACHE_DIR)
+        self.embedding_cache = self.embedding_function.cache
+    
+    @property
+    def extractor_signature(self) -> str:
+        """
+        Extraction signature recorded in the manifest and the catalog.
+        
+        Subclasses whose output also depends on constructor options append
+        those options to ``EXTRACTOR_VERSION`` here, so changing them rebuilds
+        the collection.
+        """
+        return self.EXTRACTOR_VERSION
     
     def _ensure_persist_directory(self):
         """Ensure the persistence directory exists."""
         os.makedirs(self.persist_directory, exist_ok=True)
     
-    def get_or_create_collection(self, collection_name: str):
+    def get_or_create_collection(
+        self,
+        collection_name: str,
+        embedding_function: Optional[MultilingualEmbedder] = None,
+        metadata: Optional[Dict] = None
+    ):
         """
         Get an existing collection or create a new one.
         
+        New collections record the embedding model in their metadata.
+        
         Args:
             collection_name: Name of the collection
+            embedding_function: Embedding function of the collection (defaults
+                to the shared float32 one)
+            metadata: Extra metadata for a new collection
             
         Returns:
             ChromaDB collection
+            
+        Raises:
+            EmbeddingModelMismatchError: If the existing collection was indexed
+                with a different model
         """
+        embedding_function = embedding_function or self.embedding_function
         try:
             # Try to get existing collection
             collection = self.client.get_collection(
                 name=collection_name,
-                embedding_function=self.embedding_function
+                embedding_function=embedding_function
             )
-            logger.info(f"Using existing collection: {collection_name}")
         except:
             # Create new collection if it doesn't exist
             collection = self.client.create_collection(
                 name=collection_name,
-                embedding_function=self.embedding_function
+                embedding_function=embedding_function,
+                metadata={**index_metadata(self.EMBEDDING_MODEL), **(metadata or {})}
             )
             logger.info(f"Created new collection: {collection_name}")
+            return collection
         
+        check_collection_model(collection, self.EMBEDDING_MODEL)
+        logger.info(f"Using existing collection: {collection_name}")
         return collection
     
     def collection_exists(self, collection_name: str) -> bool:
@@ -93,4 +197,533 @@ class BaseProcessor:
             collection = self.client.get_collection(name=collection_name)
             return collection.count()
         except:
-            return 0 
\ No newline at end of file
+            return 0
+
+    def list_data_files(self, data_dir: str, extension: str = '.txt') -> List[str]:
+        """
+        List the data files of a directory in a deterministic order.
+        
+        Args:
+            data_dir: Directory containing the raw files
+            extension: File extension to keep
+            
+        Returns:
+            List[str]: Sorted file paths
+        """
+        return [
+            os.path.join(data_dir, filename)
+            for filename in sorted(os.listdir(data_dir))
+            if filename.endswith(extension)
+        ]
+    
+    def iter_processed_files(
+        self,
+        func: Callable[[str], Any],
+        file_paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Apply a CPU-bound processing function to each file.
+        
+        With more than one worker the files are fanned out to a process pool.
+        Only ``workers * 4`` files are in flight at any time, so memory stays
+        bounded however many files there are. Results are always yielded in the
+        order of ``file_paths``, so the embedding and writer stage sees exactly
+        the same sequence as a serial run.
+        
+        Args:
+            func: Module-level (picklable) function taking a file path
+            file_paths: Files to process
+            
+        Yields:
+            Tuple of (file_path, result)
+        """
+        if self.workers <= 1:
+            for file_path in file_paths:
+                yield file_path, func(file_path)
+            return
+        
+        logger.info(f"Processing files with {self.workers} workers")
+        window = self.workers * 4
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = deque()
+            for file_path in file_paths:
+                in_flight.append((file_path, executor.submit(func, file_path)))
+                if len(in_flight) >= window:
+                    done_path, future = in_flight.popleft()
+                    yield done_path, future.result()
+            while in_flight:
+                done_path, future = in_flight.popleft()
+                yield done_path, future.result()
+    
+    def embed_documents(
+        self,
+        documents: List[str],
+        embedding_function: Optional[MultilingualEmbedder] = None
+    ) -> np.ndarray:
+        """
+        Embed a batch of documents with a single encoder call.
+        
+        Documents are sorted by length before encoding so that padding inside
+        the encoder's mini-batches is minimal, and the vectors are returned in
+        the original order. Only documents missing from the embedding cache
+        reach the encoder.
+        
+        Args:
+            documents: Texts to embed
+            embedding_function: Embedding function to use (defaults to the
+                shared float32 one)
+            
+        Returns:
+            np.ndarray: One embedding per row, in the storage format
+        """
+        embedding_function = embedding_function or self.embedding_function
+        order = np.argsort([len(document) for document in documents], kind="stable")
+        sorted_embeddings = embedding_function.embed([documents[i] for i in order])
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings
+    
+    def write_batch(
+        self,
+        collection,
+        batch: List[Dict],
+        embedding_function: Optional[MultilingualEmbedder] = None
+    ) -> int:
+        """
+        Embed and write a batch of records with one ``upsert`` call.
+        
+        Upserting makes the write idempotent: rows of a batch that was written
+        but not checkpointed before a crash are overwritten on resume.
+        
+        Args:
+            collection: ChromaDB collection
+            batch: Records with ``id``, ``document`` and ``metadata`` keys
+            embedding_function: Embedding function of the collection
+            
+        Returns:
+            int: Number of records written
+        """
+        documents = [record["document"] for record in batch]
+        hits = self.embedding_cache.hits
+        start = time.perf_counter()
+        embeddings = self.embed_documents(documents, embedding_function)
+        hits = self.embedding_cache.hits - hits
+        embed_seconds = time.perf_counter() - start
+        
+        collection.upsert(
+            ids=[record["id"] for record in batch],
+            documents=documents,
+            metadatas=[record["metadata"] for record in batch],
+            embeddings=embeddings
+        )
+        write_seconds = time.perf_counter() - start - embed_seconds
+        if self.profile_section is not None:
+            self.profile_section.add_stage("embed", embed_seconds, vectors=len(batch), cached=hits)
+            self.profile_section.add_stage("write", write_seconds)
+        
+        logger.info(
+            f"Batch of {len(batch)} documents: embed {embed_seconds:.2f}s "
+            f"({len(batch) / max(embed_seconds, 1e-9):.1f} docs/s, {hits} cached), write {write_seconds:.2f}s"
+        )
+        return len(batch)
+    
+    def write_records(
+        self,
+        collection,
+        records: Iterable[Union[Dict, FileCommit]],
+        embedding_function: Optional[MultilingualEmbedder] = None,
+        on_commit: Optional[Callable[[List[FileCommit]], None]] = None
+    ) -> int:
+        """
+        Group records into batches of about ``batch_size`` and write them.
+        
+        Embedding and writing run in a background thread fed through a queue
+        of at most ``max_pending_batches`` batches. When the writer falls
+        behind, the producer blocks on the queue, so only a bounded window of
+        documents waits to be embedded at any time.
+        
+        Batches are cut at the first ``FileCommit`` marker after they reach
+        ``batch_size`` records, so a file never spans two batches and its
+        marker is passed to ``on_commit`` as soon as the batch holding its
+        records is written, i.e. once every record of the file is in the
+        collection.
+        
+        Args:
+            collection: ChromaDB collection
+            records: Records with ``id``, ``document`` and ``metadata`` keys,
+                interleaved with ``FileCommit`` markers
+            embedding_function: Embedding function of the collection
+            on_commit: Called from the writer thread with the files of each
+                written batch
+            
+        Returns:
+            int: Total number of records written
+        """
+        start = time.perf_counter()
+        pending = queue.Queue(maxsize=self.max_pending_batches)
+        state = {"written": 0, "error": None}
+        
+        def writer():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                batch, commits = item
+                if state["error"] is None:
+                    try:
+                        if batch:
+                            state["written"] += self.write_batch(collection, batch, embedding_function)
+                        if commits and on_commit is not None:
+                            on_commit(commits)
+                    except Exception as e:
+                        state["error"] = e
+        
+        thread = threading.Thread(target=writer, name=f"{collection.name}-writer", daemon=True)
+        thread.start()
+        try:
+            batch, commits = [], []
+            for record in records:
+                if not isinstance(record, FileCommit):
+                    batch.append(record)
+                    continue
+                commits.append(record)
+                # Cut batches at file boundaries only, so each batch carries
+                # the markers of every file it completes
+                if len(batch) >= self.batch_size:
+                    pending.put((batch, commits))
+                    batch, commits = [], []
+                    if state["error"] is not None:
+                        break
+            if (batch or commits) and state["error"] is None:
+                pending.put((batch, commits))
+        finally:
+            pending.put(None)
+            thread.join()
+        
+        if state["error"] is not None:
+            raise state["error"]
+        
+        written = state["written"]
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Wrote {written} documents to {collection.name} in {elapsed:.1f}s "
+            f"({written / max(elapsed, 1e-9):.1f} docs/s, batch size {self.batch_size})"
+        )
+        return written
+    
+    def build_records(self, file_path: str, result: Any) -> List[Dict]:
+        """
+        Convert the processing result of one file into ChromaDB records.
+        
+        Args:
+            file_path: Source file path
+            result: Value returned by the processing function
+            
+        Returns:
+            List[Dict]: Records with ``id``, ``document`` and ``metadata`` keys
+        """
+        return [self.build_record(file_path, result)]
+    
+    def sync_collection(
+        self,
+        collection_name: str,
+        data_dir: Union[str, Sequence[str]],
+        func: Callable[[str], Any],
+        force_reprocess: bool = False,
+        file_paths: Optional[List[str]] = None
+    ) -> int:
+        """
+        Bring a collection up to date with the files of a data directory.
+        
+        Only new or modified files (by content hash) are parsed and embedded,
+        rows of modified or removed files are deleted first. A full rebuild
+        happens with ``force_reprocess`` or when the manifest was written by a
+        different extractor version, embedding model, inference backend or
+        storage mode.
+        
+        Every written batch checkpoints its completed files in the manifest
+        journal, so an interrupted run loses at most one batch: the next run
+        continues after the last committed file. With ``resume`` set, an
+        interrupted rebuild is continued even when ``force_reprocess`` is given,
+        and collections the interrupted forced run already rebuilt are only
+        brought up to date.
+        
+        Args:
+            collection_name: Name of the collection
+            data_dir: Directory (or directories) containing the raw files
+            func: Module-level processing function for one file
+            force_reprocess: Rebuild the collection from scratch
+            file_paths: Files of the collection, when it holds only part of
+                the data directory (defaults to every data file)
+            
+        Returns:
+            int: Number of documents written
+        """
+        if self.profiler is None:
+            return self._sync_collection(collection_name, data_dir, func, force_reprocess, file_paths)
+        self.profile_section = self.profiler.section(collection_name)
+        start = time.perf_counter()
+        try:
+            return self._sync_collection(collection_name, data_dir, func, force_reprocess, file_paths)
+        finally:
+            self.profile_section.wall_seconds += time.perf_counter() - start
+            self.profile_section = None
+    
+    def _sync_collection(
+        self,
+        collection_name: str,
+        data_dir: Union[str, Sequence[str]],
+        func: Callable[[str], Any],
+        force_reprocess: bool,
+        file_paths: Optional[List[str]]
+    ) -> int:
+        """Body of ``sync_collection``."""
+        storage = VectorStorage.for_collection(
+            self.persist_directory, collection_name, self.storage, self.pca_dim
+        )
+        index_identity = self.embedding_function.cache_model_name
+        if storage.mode != "float32":
+            index_identity += f"@{storage.mode}" + (str(self.pca_dim) if storage.mode == "pca" else "")
+        manifest = IngestionManifest.for_collection(
+            self.persist_directory, collection_name, self.extractor_signature, index_identity
+        )
+        resuming = manifest.interrupted and manifest.compatible
+        if resuming:
+            logger.info(
+                f"Resuming interrupted ingestion of {collection_name} "
+                f"({manifest.recovered} files committed since the last complete run)"
+            )
+        force_run = self.force_run_id() if force_reprocess else None
+        # Already emptied by this forced run (before it was interrupted)
+        rebuilt_in_run = force_run is not None and manifest.compatible and manifest.force_run == force_run
+        rebuilt = (
+            (force_reprocess and not rebuilt_in_run and not (self.resume and resuming))
+            or not manifest.compatible
+        )
+        if rebuilt:
+            # Persist the empty manifest first so a crash mid-rebuild is resumed,
+            # never mistaken for an up-to-date collection
+            manifest.reset(force_run)
+            manifest.save(complete=False)
+            if self.collection_exists(collection_name):
+                logger.info(f"Rebuilding collection {collection_name} from scratch")
+                self.client.delete_collection(name=collection_name)
+            storage.reset()
+            self.reset_collection_state(collection_name)
+        
+        embedding_function = get_embedder(
+            self.EMBEDDING_MODEL, self.embedding_cache.cache_dir, storage=storage
+        )
+        collection = self.get_or_create_collection(collection_name, embedding_function, storage.metadata())
+        
+        if file_paths is None:
+            data_dirs = [data_dir] if isinstance(data_dir, str) else list(data_dir)
+            file_paths = [path for directory in data_dirs for path in self.list_data_files(directory)]
+        changed, removed = manifest.diff(file_paths)
+        stale_ids = manifest.stale_ids(changed, removed)
+        # Unchanged files whose output depended on the deleted rows are redone too
+        known = set(file_paths)
+        dependents = (self.dependent_files(changed, removed, stale_ids) & known) - set(changed)
+        while dependents:
+            logger.info(f"Reprocessing {len(dependents)} files that depend on modified rows")
+            changed = sorted(set(changed) | dependents)
+            stale_ids = manifest.stale_ids(changed, removed)
+            dependents = (self.dependent_files(changed, removed, stale_ids) & known) - set(changed)
+        # Files being redone leave the manifest before their rows are deleted,
+        # so an interrupted run picks them up again
+        manifest.forget(removed + [os.path.basename(file_path) for file_path in changed])
+        if changed or removed:
+            manifest.save(complete=False)
+            self.save_collection_state()
+        if stale_ids:
+            with self.profile_stage("delete"):
+                for start in range(0, len(stale_ids), self.batch_size):
+                    collection.delete(ids=stale_ids[start:start + self.batch_size])
+            logger.info(f"Deleted {len(stale_ids)} stale documents from {collection_name}")
+        
+        if not changed:
+            manifest.save()
+            logger.info(f"Collection {collection_name} is up to date ({len(file_paths)} files)")
+            written = 0
+        else:
+            logger.info(f"{len(changed)} new or modified files, {len(removed)} removed in {collection_name}")
+            records = self._iter_records(func, changed)
+            if not storage.fitted:
+                records = self._fit_storage(storage, records)
+            written = self.write_records(
+                collection, records, embedding_function, on_commit=partial(self.commit_files, manifest)
+            )
+            manifest.save()
+        
+        if self.EXPORT_CATALOG and (written or stale_ids or not catalog_exists(self.persist_directory, collection_name)):
+            with self.profile_stage("catalog"):
+                self.export_catalog(collection)
+        changed_index = bool(written or stale_ids or rebuilt)
+        version = new_index_version() if changed_index else IndexVersion(self.persist_directory).collection(collection_name)
+        # Saved before the version is published, so the API never sees the new
+        # version without its BM25 index
+        if self.EXPORT_LEXICAL_INDEX and not BM25Index.is_current(
+            lexical_index_path(self.persist_directory, collection_name),
+            name_field=self.LEXICAL_NAME_FIELD,
+            collection_version=version
+        ):
+            with self.profile_stage("bm25"):
+                self.export_lexical_index(collection, version)
+        if changed_index:
+            # Invalidate caches derived from the indexed content (e.g. RAG responses)
+            bump_index_version(self.persist_directory, collection_name, version)
+        return written
+    
+    def force_run_id(self) -> str:
+        """
+        Id of the forced rebuild this processor takes part in.
+        
+        With ``resume`` the id of the interrupted run is reused, so the
+        collections it already rebuilt are not emptied again.
+        
+        Returns:
+            str: Id recorded in the manifests of the rebuilt collections
+        """
+        if self.force_run is None:
+            self.force_run = start_force_run(self.persist_directory, self.resume)
+        return self.force_run
+    
+    @contextmanager
+    def profile_stage(self, name: str):
+        """Time a main-process stage of the collection being profiled."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.profile_section is not None:
+                self.profile_section.add_stage(name, time.perf_counter() - start)
+    
+    def commit_files(self, manifest: IngestionManifest, commits: List[FileCommit]) -> None:
+        """
+        Checkpoint files whose records are all written.
+        
+        Called from the writer thread after each batch; a crash afterwards
+        resumes from the next file.
+        
+        Args:
+            manifest: Manifest of the collection being synced
+            commits: Files completed by the batch
+        """
+        self.checkpoint_collection_state([commit.file_path for commit in commits])
+        manifest.commit(commits)
+    
+    def save_collection_state(self) -> None:
+        """
+        Persist any state a subclass derives from a collection.
+        
+        Called once the manifest has dropped the files about to be redone, and
+        before their rows are deleted.
+        """
+    
+    def checkpoint_collection_state(self, file_paths: List[str]) -> None:
+        """
+        Make durable any state a subclass derived from the committed files.
+        
+        Runs before the files are checkpointed in the manifest, so on resume
+        the state never lags behind the files it was derived from.
+        
+        Args:
+            file_paths: Files completed by the last written batch
+        """
+    
+    def reset_collection_state(self, collection_name: str) -> None:
+        """
+        Drop any state a subclass derives from a collection (full rebuild).
+        
+        Args:
+            collection_name: Name of the collection being rebuilt
+        """
+    
+    def dependent_files(self, changed: List[str], removed: List[str], stale_ids: List[str]) -> Set[str]:
+        """
+        Files whose records depend on rows about to be deleted.
+        
+        Subclasses that derive records from other files (e.g. near-duplicate
+        aliases of another file's rows) return them here so they are
+        reprocessed in the same run.
+        
+        Args:
+            changed: New or modified files
+            removed: Files no longer present
+            stale_ids: Ids about to be deleted
+            
+        Returns:
+            Set[str]: Paths of the dependent files
+        """
+        return set()
+    
+    def export_catalog(self, collection) -> int:
+        """
+        Export the columnar catalog of a place collection.
+        
+        Args:
+            collection: ChromaDB collection
+            
+        Returns:
+            int: Number of places in the catalog
+        """
+        return build_catalog(
+            collection,
+            catalog_path(self.persist_directory, collection.name),
+            extra={"extractor_version": self.extractor_signature}
+        )
+    
+    def export_lexical_index(self, collection, version: Optional[str]) -> int:
+        """
+        Save the BM25 index of a collection for the API to memory-map.
+        
+        Args:
+            collection: ChromaDB collection
+            version: Index version of the collection the BM25 index matches
+            
+        Returns:
+            int: Number of documents in the index
+        """
+        lexical = BM25Index.from_collection(collection, self.LEXICAL_NAME_FIELD)
+        lexical.save(
+            lexical_index_path(self.persist_directory, collection.name),
+            extra={
+                "collection": collection.name,
+                "name_field": self.LEXICAL_NAME_FIELD,
+                "collection_version": version
+            }
+        )
+        return len(lexical)
+    
+    def _fit_storage(self, storage: VectorStorage, records: Iterator[Dict]) -> Iterator[Dict]:
+        """
+        Fit the PCA projection on the first records of the stream.
+        
+        The sample is embedded at full precision (filling the embedding cache,
+        so it is not encoded twice) and then written like any other record.
+        """
+        sample = list(islice(records, self.PCA_SAMPLE_SIZE))
+        documents = [record["document"] for record in sample if not isinstance(record, FileCommit)]
+        if not documents:
+            return chain(sample, records)
+        with self.profile_stage("pca_fit"):
+            storage.fit(self.embedding_function.embed(documents))
+        return chain(sample, records)
+    
+    def _iter_records(
+        self,
+        func: Callable[[str], Any],
+        file_paths: List[str]
+    ) -> Iterator[Union[Dict, FileCommit]]:
+        """Yield the records of each processed file followed by its ``FileCommit``."""
+        section = self.profile_section
+        if section is not None:
+            func = ProfiledTask(func)
+        for file_path, result in self.iter_processed_files(func, file_paths):
+            if section is not None:
+                result, file_profile = result
+                section.add_file(file_profile)
+            with self.profile_stage("build"):
+                records = self.build_records(file_path, result) if result else []
+            yield from records
+            yield FileCommit(file_path, [record["id"] for record in records])
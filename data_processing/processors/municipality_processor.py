@@ -2,35 +2,90 @@
 Procesador de municipios de Puerto Rico.
 """
 from typing import Dict, List, Optional, Tuple
-import os
 import logging
 from pathlib import Path
 
+from backend.database.catalog import CATEGORY_SEPARATOR
+
 from .base_processor import BaseProcessor
-from ..utils.html_utils import (
-    parse_html_file,
-    extract_coordinates,
-    extract_description,
-    extract_categories
-)
+from ..utils.html_utils import extract_page_info
 from ..utils.encoding_utils import normalize_filename, clean_text
 from ..utils.geo_utils import is_within_puerto_rico
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def extract_municipality_info(file_path: str) -> Optional[Dict]:
+    """
+    Procesa un archivo HTML de municipio y extrae información relevante.
+    
+    Es una función de módulo para poder ejecutarse en un pool de procesos.
+    
+    Args:
+        file_path: Ruta al archivo HTML del municipio
+        
+    Returns:
+        Dict con la información extraída o None si hay error
+    """
+    try:
+        # Obtener el nombre del municipio del nombre del archivo
+        municipality_name = normalize_filename(Path(file_path).stem)
+        
+        # Extraer coordenadas, descripción y categorías en una sola pasada
+        page = extract_page_info(file_path)
+            
+        # Verificar coordenadas
+        coords = page["coordinates"]
+        if coords:
+            lat, lon = coords
+            if not is_within_puerto_rico(lat, lon):
+                logger.warning(f"Coordenadas de {municipality_name} fuera de Puerto Rico")
+        
+        # Verificar descripción
+        description = page["description"]
+        if not description:
+            logger.warning(f"No se encontró descripción para {municipality_name}")
+            return None
+            
+        categories = page["categories"]
+        
+        # Crear diccionario con la información
+        municipality_info = {
+            "name": municipality_name,
+            "description": description,
+            "categories": categories,
+            "coordinates": {"latitude": lat, "longitude": lon} if coords else None
+        }
+        
+        return municipality_info
+        
+    except Exception as e:
+        logger.error(f"Error procesando {file_path}: {str(e)}")
+        return None
+
 class MunicipalityProcessor(BaseProcessor):
     """Procesa archivos HTML de municipios y los almacena en ChromaDB."""
     
-    def __init__(self, data_dir: str = "data/municipalities", persist_directory: str = "chroma_db"):
+    # Exportar el catálogo columnar (coordenadas y categorías) tras cada sincronización
+    EXPORT_CATALOG = True
+    # Guardar el índice BM25 de nombres y descripciones para la búsqueda híbrida
+    EXPORT_LEXICAL_INDEX = True
+    LEXICAL_NAME_FIELD = "name"
+    # 2: lista completa de categorías (sin repetidas) separadas por CATEGORY_SEPARATOR
+    EXTRACTOR_VERSION = "2"
+    
+    def __init__(self, data_dir: str = "data/municipalities", persist_directory: str = "chroma_db", workers: int = 1, batch_size: int = 256, **kwargs):
         """
         Inicializa el procesador de municipios.
         
         Args:
             data_dir: Directorio que contiene los archivos HTML de municipios
             persist_directory: Directorio para persistir los datos de ChromaDB
+            workers: Número de procesos para parsear los archivos en paralelo
+            batch_size: Número de documentos por lote de embeddings
+            **kwargs: Otras opciones de BaseProcessor (p. ej. storage, pca_dim)
         """
-        super().__init__(persist_directory=persist_directory)
+        super().__init__(persist_directory=persist_directory, workers=workers, batch_size=batch_size, **kwargs)
         self.data_dir = data_dir
         
     def process_municipality_file(self, file_path: str) -> Optional[Dict]:
@@ -43,45 +98,29 @@ class MunicipalityProcessor(BaseProcessor):
         Returns:
             Dict con la información extraída o None si hay error
         """
-        try:
-            # Obtener el nombre del municipio del nombre del archivo
-            municipality_name = normalize_filename(Path(file_path).stem)
-            
-            # Parsear el HTML
-            soup = parse_html_file(file_path)
-            if not soup:
-                logger.warning(f"No se pudo parsear el archivo {file_path}")
-                return None
-                
-            # Extraer coordenadas
-            coords = extract_coordinates(soup)
-            if coords:
-                lat, lon = coords
-                if not is_within_puerto_rico(lat, lon):
-                    logger.warning(f"Coordenadas de {municipality_name} fuera de Puerto Rico")
+        return extract_municipality_info(file_path)
             
-            # Extraer descripción
-            description = extract_description(soup)
-            if not description:
-                logger.warning(f"No se encontró descripción para {municipality_name}")
-                return None
-                
-            # Extraer categorías
-            categories = extract_categories(soup)
+    def build_record(self, file_path: str, municipality_info: Dict) -> Dict:
+        """
+        Convierte la información de un municipio en un registro para ChromaDB.
+        
+        Args:
+            file_path: Ruta al archivo HTML de origen
+            municipality_info: Diccionario devuelto por extract_municipality_info
             
-            # Crear diccionario con la información
-            municipality_info = {
-                "name": municipality_name,
-                "description": description,
-                "categories": categories,
-                "coordinates": {"latitude": lat, "longitude": lon} if coords else None
+        Returns:
+            Dict con las claves id, document y metadata
+        """
+        return {
+            "id": f"municipality_{municipality_info['name']}",
+            "document": municipality_info["description"],
+            "metadata": {
+                "name": municipality_info["name"],
+                "categories": CATEGORY_SEPARATOR.join(dict.fromkeys(municipality_info["categories"])),
+                "latitude": str(municipality_info["coordinates"]["latitude"]) if municipality_info["coordinates"] else "",
+                "longitude": str(municipality_info["coordinates"]["longitude"]) if municipality_info["coordinates"] else ""
             }
-            
-            return municipality_info
-            
-        except Exception as e:
-            logger.error(f"Error procesando {file_path}: {str(e)}")
-            return None
+        }
             
     def create_embeddings_db(self, collection_name: str = "municipalities", force_reprocess: bool = False) -> None:
         """
@@ -89,45 +128,13 @@ class MunicipalityProcessor(BaseProcessor):
         
         Args:
             collection_name: Nombre de la colección en ChromaDB
-            force_reprocess: Si es True, reprocesa aunque la colección exista
+            force_reprocess: Si es True, reconstruye la colección desde cero
         """
         try:
-            # Verificar si la colección ya existe y tiene datos
-            if not force_reprocess and self.collection_exists(collection_name):
-                count = self.get_collection_count(collection_name)
-                if count > 0:
-                    logger.info(f"La colección {collection_name} ya existe con {count} elementos")
-                    return
-            
-            # Obtener o crear la colección
-            collection = self.get_or_create_collection(collection_name)
-            
-            # Procesar cada archivo
-            processed_count = 0
-            for filename in os.listdir(self.data_dir):
-                if not filename.endswith('.txt'):
-                    continue
-                    
-                file_path = os.path.join(self.data_dir, filename)
-                municipality_info = self.process_municipality_file(file_path)
-                
-                if not municipality_info:
-                    continue
-                
-                # Preparar datos para ChromaDB
-                collection.add(
-                    documents=[municipality_info["description"]],
-                    metadatas=[{
-                        "name": municipality_info["name"],
-                        "categories": ", ".join(municipality_info["categories"][:5]) if municipality_info["categories"] else "",
-                        "latitude": str(municipality_info["coordinates"]["latitude"]) if municipality_info["coordinates"] else "",
-                        "longitude": str(municipality_info["coordinates"]["longitude"]) if municipality_info["coordinates"] else ""
-                    }],
-                    ids=[f"municipality_{municipality_info['name']}"]
-                )
-                
-                processed_count += 1
-                logger.info(f"Procesado {municipality_info['name']}")
+            # Procesar solo los archivos nuevos o modificados
+            processed_count = self.sync_collection(
+                collection_name, self.data_dir, extract_municipality_info, force_reprocess=force_reprocess
+            )
             
             logger.info(f"Procesados {processed_count} municipios")
             
@@ -1,32 +1,225 @@
 """
 Procesador de noticias históricas de Puerto Rico.
 """
-from typing import Dict, List, Optional, Tuple
-import os
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 import logging
+from functools import partial
+from itertools import chain
 from pathlib import Path
 from datetime import datetime
 
+from backend.database.index_version import bump_index_version
+from backend.database.news_shards import NEWS_COLLECTION, list_shards, shard_name
+from config.settings import Settings
 from .base_processor import BaseProcessor
-from ..utils.text_utils import clean_text, create_embeddings, split_into_chunks
-from ..utils.encoding_utils import normalize_filename
+from ..utils.text_utils import clean_text, count_tokens, iter_chunks, iter_sentences, tokenizer_signature
+from ..utils.encoding_utils import normalize_filename, detect_file_encoding
+from ..utils import profiling
+from ..utils.dedup import MinHasher, NearDuplicateIndex
+from ..utils.quality import QualityFilter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Alias listados en los metadatos de un chunk canónico (el resto queda en el índice de duplicados)
+MAX_LISTED_ALIASES = 20
+
+def extract_date_info(filename: str) -> Tuple[str, str]:
+    """
+    Extrae la fecha y década de una noticia basado en su nombre de archivo.
+    
+    Args:
+        filename: Nombre del archivo en formato YYYYMMDD_1.txt (o YYYYMMDD.txt
+            en el archivo sin dividir por páginas)
+        
+    Returns:
+        Tupla de (fecha_formateada, década)
+    """
+    try:
+        # Extraer fecha del nombre del archivo
+        date_str = filename.split('_')[0].split('.')[0]
+        date_obj = datetime.strptime(date_str, '%Y%m%d')
+        formatted_date = date_obj.strftime('%Y-%m-%d')
+        decade = f"{date_str[:3]}0s"  # e.g., "1940s"
+        return formatted_date, decade
+    except Exception as e:
+        logger.error(f"Error extrayendo fecha de {filename}: {str(e)}")
+        return None, None
+
+def iter_clean_lines(file_path: str) -> Iterator[str]:
+    """
+    Lee un archivo de noticias línea a línea y produce las líneas limpias no vacías.
+    
+    La codificación se determina sin cargar el archivo completo (con caché
+    por directorio para los archivos que no son UTF-8).
+    
+    Args:
+        file_path: Ruta al archivo de noticias
+        
+    Yields:
+        Líneas limpias
+    """
+    with profiling.stage("encoding"):
+        encoding = detect_file_encoding(file_path)
+    with open(file_path, 'r', encoding=encoding) as f:
+        for line in profiling.timed(f, "read"):
+            profiling.count("chars", len(line))
+            with profiling.stage("clean"):
+                line = clean_text(line)
+            if line:
+                yield line
+
+def extract_news_info(
+    file_path: str,
+    chunk_size: int = Settings.NEWS_CHUNK_SIZE,
+    chunk_overlap: int = Settings.NEWS_CHUNK_OVERLAP,
+    quality_filter: Optional[QualityFilter] = None,
+    minhasher: Optional[MinHasher] = None
+) -> Optional[Dict]:
+    """
+    Procesa un archivo de noticias y extrae información relevante.
+    
+    El archivo se lee línea a línea y se divide en chunks por oraciones de
+    como máximo chunk_size tokens del modelo de embeddings, de modo que todo
+    el texto de la página se indexa sin que el modelo lo trunque. Con un
+    filtro de calidad, la basura OCR se descarta antes de formar los chunks
+    y los chunks ilegibles antes de calcular sus embeddings. Con un
+    minhasher se calculan también las firmas MinHash de los chunks para la
+    deduplicación. Es una función de módulo para poder ejecutarse en un pool
+    de procesos.
+    
+    Args:
+        file_path: Ruta al archivo de noticias
+        chunk_size: Tamaño máximo de cada chunk en tokens
+        chunk_overlap: Solapamiento máximo entre chunks consecutivos en tokens
+        quality_filter: Filtro de calidad del texto OCR (None para no filtrar)
+        minhasher: Calculador de firmas MinHash (None para no deduplicar)
+        
+    Returns:
+        Dict con la información extraída o None si hay error
+    """
+    try:
+        # Obtener información de la fecha del nombre del archivo
+        filename = Path(file_path).name
+        date, decade = extract_date_info(filename)
+        if not date or not decade:
+            return None
+            
+        # Leer y limpiar el contenido del archivo línea a línea
+        lines = iter_clean_lines(file_path)
+        if quality_filter:
+            lines = profiling.timed(quality_filter.filter_lines(lines), "quality")
+        
+        # Extraer título (primera línea después de limpiar)
+        first_line = next(lines, None)
+        title = first_line if first_line else "Sin título"
+        
+        # Dividir el contenido en chunks por oraciones
+        chunks = []
+        if first_line:
+            sentences = iter_sentences(chain([first_line], lines))
+            chunks = profiling.timed(iter_chunks(sentences, chunk_size, chunk_overlap, count_tokens), "chunk")
+            if quality_filter:
+                with profiling.stage("quality"):
+                    chunks = quality_filter.filter_chunks(chunks)
+            else:
+                chunks = list(chunks)
+        
+        # Preparar metadata
+        parts = Path(filename).stem.split('_')
+        metadata = {
+            "date": date,
+            "decade": decade,
+            "title": title,
+            "page": parts[1] if len(parts) > 1 else "",  # e.g., "1" from "_1.txt"
+            "source": "El Mundo",
+            "type": "news_article"
+        }
+        
+        signatures = None
+        if minhasher:
+            with profiling.stage("minhash"):
+                signatures = minhasher.signatures(chunks)
+        
+        return {
+            "chunks": chunks,
+            "metadata": metadata,
+            "quality": quality_filter.take_stats() if quality_filter else None,
+            "signatures": signatures
+        }
+        
+    except Exception as e:
+        logger.error(f"Error procesando archivo {file_path}: {str(e)}")
+        return None
+
 class NewsProcessor(BaseProcessor):
-    """Procesa archivos de noticias históricas y los almacena en ChromaDB."""
+    """
+    Procesa archivos de noticias históricas y los almacena en ChromaDB.
+    
+    Cada década se guarda en su propia colección (ver
+    backend.database.news_shards), con su manifiesto y su índice de duplicados.
+    La deduplicación es por partición: un chunk solo se compara con los de su
+    misma década, así cada alias queda en la colección de su canónico y una
+    consulta dirigida a una década encuentra los duplicados de esa década.
+    """
     
-    def __init__(self, data_dir: str = "data/elmundo_chunked_es_page1_40years", persist_directory: str = "chroma_db"):
+    EXTRACTOR_VERSION = "4"
+    
+    def __init__(
+        self,
+        data_dir: Union[str, List[str]] = "data/elmundo_chunked_es_page1_40years",
+        persist_directory: str = "chroma_db",
+        workers: int = 1,
+        batch_size: int = 256,
+        chunk_size: int = Settings.NEWS_CHUNK_SIZE,
+        chunk_overlap: int = Settings.NEWS_CHUNK_OVERLAP,
+        quality_filter: bool = Settings.NEWS_QUALITY_FILTER,
+        dedup: bool = Settings.NEWS_DEDUP,
+        dedup_threshold: float = Settings.NEWS_DEDUP_THRESHOLD,
+        **kwargs
+    ):
         """
         Inicializa el procesador de noticias.
         
         Args:
-            data_dir: Directorio que contiene los archivos de noticias
+            data_dir: Directorio (o lista de directorios) con los archivos de noticias
             persist_directory: Directorio para persistir los datos de ChromaDB
+            workers: Número de procesos para parsear los archivos en paralelo
+            batch_size: Número de documentos por lote de embeddings
+            chunk_size: Tamaño máximo de cada chunk en tokens
+            chunk_overlap: Solapamiento máximo entre chunks consecutivos en tokens
+            quality_filter: Descartar la basura OCR con los umbrales de Settings
+            dedup: No indexar los chunks casi duplicados de otros ya indexados
+            dedup_threshold: Similitud de Jaccard mínima de un duplicado
+            **kwargs: Otras opciones de BaseProcessor (p. ej. storage, pca_dim)
         """
-        super().__init__(persist_directory=persist_directory)
+        super().__init__(persist_directory=persist_directory, workers=workers, batch_size=batch_size, **kwargs)
         self.data_dir = data_dir
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.quality_filter = QualityFilter() if quality_filter else None
+        self.quality_stats: Dict[str, int] = {}
+        self.minhasher = MinHasher() if dedup else None
+        self.dedup_threshold = dedup_threshold
+        # Índices de duplicados por partición; dedup_index es el de la que se sincroniza
+        self.dedup_indexes: Dict[str, NearDuplicateIndex] = {}
+        self.dedup_index: Optional[NearDuplicateIndex] = None
+    
+    @property
+    def extractor_signature(self) -> str:
+        """
+        Versión del extractor con las opciones que cambian los chunks.
+        
+        Los chunks dependen de su tamaño, de cómo se cuentan los tokens, de los
+        umbrales del filtro de calidad y del umbral de deduplicación; cambiar
+        cualquiera reconstruye la colección.
+        """
+        signature = f"{self.EXTRACTOR_VERSION}+{tokenizer_signature()}-{self.chunk_size}.{self.chunk_overlap}"
+        if self.quality_filter:
+            signature += f"+{self.quality_filter.signature}"
+        if self.minhasher is not None:
+            signature += f"+dedup{self.dedup_threshold}"
+        return signature
         
     def extract_date_info(self, filename: str) -> Tuple[str, str]:
         """
@@ -38,16 +231,7 @@ class NewsProcessor(BaseProcessor):
         Returns:
             Tupla de (fecha_formateada, década)
         """
-        try:
-            # Extraer fecha del nombre del archivo
-            date_str = filename.split('_')[0]
-            date_obj = datetime.strptime(date_str, '%Y%m%d')
-            formatted_date = date_obj.strftime('%Y-%m-%d')
-            decade = f"{date_str[:3]}0s"  # e.g., "1940s"
-            return formatted_date, decade
-        except Exception as e:
-            logger.error(f"Error extrayendo fecha de {filename}: {str(e)}")
-            return None, None
+        return extract_date_info(filename)
             
     def process_news_file(self, file_path: str) -> Optional[Dict]:
         """
@@ -59,85 +243,211 @@ class NewsProcessor(BaseProcessor):
         Returns:
             Dict con la información extraída o None si hay error
         """
-        try:
-            # Obtener información de la fecha del nombre del archivo
-            filename = Path(file_path).name
-            date, decade = self.extract_date_info(filename)
-            if not date or not decade:
-                return None
-                
-            # Leer el contenido del archivo
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        return extract_news_info(
+            file_path, self.chunk_size, self.chunk_overlap, self.quality_filter, self.minhasher
+        )
             
-            # Limpiar el texto
-            cleaned_content = clean_text(content)
-            
-            # Extraer título (primera línea después de limpiar)
-            title = cleaned_content.split('\n')[0] if cleaned_content else "Sin título"
-            
-            # Preparar metadata
-            metadata = {
-                "date": date,
-                "decade": decade,
-                "title": title,
-                "page": filename.split('_')[1].replace('.txt', ''),  # e.g., "1" from "_1.txt"
-                "source": "El Mundo",
-                "type": "news_article"
-            }
+    def build_records(self, file_path: str, result: Dict) -> List[Dict]:
+        """
+        Convierte una noticia procesada en registros para ChromaDB, uno por chunk.
+        
+        Cada chunk conserva la metadata de su página (fecha, década, página)
+        y el id de la página en parent_id. Con deduplicación, los chunks casi
+        idénticos a uno ya indexado solo se registran como alias suyos.
+        
+        Args:
+            file_path: Ruta al archivo de noticias
+            result: Diccionario devuelto por extract_news_info
             
-            return {
-                "content": cleaned_content,
-                "metadata": metadata
-            }
+        Returns:
+            Lista de diccionarios con las claves id, document y metadata
+        """
+        for key, value in (result.get("quality") or {}).items():
+            self.quality_stats[key] = self.quality_stats.get(key, 0) + value
+        parent_id = f"news_{Path(file_path).name}"
+        records = []
+        for i, chunk in enumerate(result["chunks"]):
+            record_id = f"{parent_id}#{i}"
+            if self.dedup_index is not None:
+                signature = result["signatures"][i] if result.get("signatures") is not None else None
+                if self.dedup_index.add(record_id, chunk, file_path, signature):
+                    continue
+            records.append({
+                "id": record_id,
+                "document": chunk,
+                "metadata": {**result["metadata"], "chunk_index": i, "parent_id": parent_id}
+            })
+        return records
+    
+    def files_by_decade(self) -> Dict[str, List[str]]:
+        """
+        Agrupa los archivos de noticias por la década de su fecha.
+        
+        Returns:
+            Dict de década a las rutas de sus archivos
+        """
+        data_dirs = [self.data_dir] if isinstance(self.data_dir, str) else list(self.data_dir)
+        groups: Dict[str, List[str]] = {}
+        skipped = 0
+        for directory in data_dirs:
+            for file_path in self.list_data_files(directory):
+                _, decade = extract_date_info(Path(file_path).name)
+                if decade:
+                    groups.setdefault(decade, []).append(file_path)
+                else:
+                    skipped += 1
+        if skipped:
+            logger.warning(f"{skipped} archivos sin fecha en el nombre no se indexan")
+        return groups
+    
+    def dedup_index_for(self, collection_name: str) -> NearDuplicateIndex:
+        """Índice de duplicados de una partición (se carga una vez); no ve las demás particiones."""
+        if collection_name not in self.dedup_indexes:
+            self.dedup_indexes[collection_name] = NearDuplicateIndex.for_collection(
+                self.persist_directory, collection_name, self.dedup_threshold
+            )
+        return self.dedup_indexes[collection_name]
+    
+    def reset_collection_state(self, collection_name: str) -> None:
+        """Vacía el índice de duplicados al reconstruir la colección."""
+        if self.dedup_index is not None:
+            self.dedup_index.reset()
+    
+    def dependent_files(self, changed: List[str], removed: List[str], stale_ids: List[str]) -> Set[str]:
+        """
+        Archivos con alias de chunks que se van a eliminar.
+        
+        Sus chunks dejaron de tener un canónico indexado, así que se vuelven
+        a procesar.
+        
+        Args:
+            changed: Archivos nuevos o modificados
+            removed: Archivos eliminados
+            stale_ids: Ids que se van a eliminar
             
-        except Exception as e:
-            logger.error(f"Error procesando archivo {file_path}: {str(e)}")
-            return None
+        Returns:
+            Rutas de los archivos a reprocesar
+        """
+        if self.dedup_index is None:
+            return set()
+        self.dedup_index.forget_sources(changed + removed)
+        # También los chunks de archivos que una ejecución interrumpida no llegó a confirmar
+        return self.dedup_index.forget(stale_ids + self.dedup_index.ids_of_sources(changed + removed))
+    
+    def save_collection_state(self) -> None:
+        """Guarda el índice de duplicados sin los chunks que se van a rehacer."""
+        if self.dedup_index is not None:
+            self.dedup_index.save()
+    
+    def checkpoint_collection_state(self, file_paths: List[str]) -> None:
+        """Añade al diario del índice de duplicados los archivos ya escritos."""
+        if self.dedup_index is not None:
+            self.dedup_index.checkpoint(file_paths)
+    
+    def write_aliases(self, collection) -> None:
+        """
+        Registra en los metadatos de los chunks canónicos sus alias.
+        
+        Args:
+            collection: Colección de noticias
+        """
+        canonical_ids = self.dedup_index.touched_canonical_ids()
+        aliases = self.dedup_index.aliases_of(canonical_ids)
+        for start in range(0, len(canonical_ids), self.batch_size):
+            ids = canonical_ids[start:start + self.batch_size]
+            collection.update(
+                ids=ids,
+                metadatas=[
+                    {
+                        "duplicate_count": len(aliases[canonical_id]),
+                        "aliases": ", ".join(aliases[canonical_id][:MAX_LISTED_ALIASES])
+                    }
+                    for canonical_id in ids
+                ]
+            )
+        self.dedup_index.touched.clear()
+        self.dedup_index.save()
+        if canonical_ids:
+            bump_index_version(self.persist_directory, collection.name)
+    
+    def log_dedup_stats(self) -> None:
+        """Registra el trabajo de embeddings y el espacio de índice ahorrados (suma de las particiones)."""
+        stats = {"chunks": 0, "duplicates": 0, "chars_saved": 0}
+        for index in self.dedup_indexes.values():
+            for key, value in index.take_stats().items():
+                stats[key] += value
+        if not stats["chunks"]:
+            return
+        dim = self.embedding_cache.model_dim(self.embedding_function.cache_model_name) or 0
+        saved_bytes = stats["duplicates"] * dim * 4 + stats["chars_saved"]
+        logger.info(
+            f"Deduplicación por década ({len(self.dedup_indexes)} particiones, sin comparar entre ellas): "
+            f"{stats['duplicates']}/{stats['chunks']} chunks casi duplicados "
+            f"({stats['duplicates'] / stats['chunks']:.1%}) no se embebieron; ahorro de "
+            f"~{saved_bytes / 2**20:.1f}MB de índice (vectores float32 y texto), "
+            f"{sum(len(index.aliases) for index in self.dedup_indexes.values())} alias en total"
+        )
             
     def create_embeddings_db(self, force_reprocess: bool = False) -> bool:
         """
         Crea una base de datos de embeddings para las noticias.
         
         Args:
-            force_reprocess: Si es True, reprocesa todos los archivos incluso si ya existen
+            force_reprocess: Si es True, reconstruye la colección desde cero
             
         Returns:
             True si el proceso fue exitoso, False en caso contrario
         """
         try:
-            # Verificar si la colección ya existe
-            if not force_reprocess and self.collection_exists("news_articles"):
-                logger.info("La colección de noticias ya existe. Usa force_reprocess=True para reprocesar.")
-                return True
-                
-            # Crear o recuperar la colección
-            collection = self.get_or_create_collection("news_articles")
-            
-            # Procesar cada archivo de noticias
+            # Procesar solo los archivos nuevos o modificados
+            extract = partial(
+                extract_news_info,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                quality_filter=self.quality_filter,
+                minhasher=self.minhasher
+            )
+            files_by_decade = self.files_by_decade()
+            existing = list_shards(self.client)
             processed_count = 0
-            for filename in os.listdir(self.data_dir):
-                if not filename.endswith('.txt'):
-                    continue
-                    
-                file_path = os.path.join(self.data_dir, filename)
-                result = self.process_news_file(file_path)
-                
-                if result:
-                    # Crear embeddings y almacenar en ChromaDB
-                    collection.add(
-                        documents=[result["content"]],
-                        metadatas=[result["metadata"]],
-                        ids=[f"news_{filename}"]
-                    )
-                    processed_count += 1
-                    
-                    if processed_count % 10 == 0:
-                        logger.info(f"Procesadas {processed_count} noticias...")
+            # También las particiones existentes sin archivos, para vaciarlas
+            for decade in sorted(set(files_by_decade) | set(existing)):
+                collection_name = shard_name(decade)
+                if self.minhasher is not None:
+                    self.dedup_index = self.dedup_index_for(collection_name)
+                processed_count += self.sync_collection(
+                    collection_name, self.data_dir, extract,
+                    force_reprocess=force_reprocess, file_paths=files_by_decade.get(decade, [])
+                )
+                if decade not in files_by_decade:
+                    logger.info(f"Eliminando la partición {collection_name}, ya sin noticias")
+                    self.client.delete_collection(name=collection_name)
+                    bump_index_version(self.persist_directory, collection_name)
+                elif self.dedup_index is not None:
+                    self.write_aliases(self.get_or_create_collection(collection_name))
+            if self.minhasher is not None:
+                self.log_dedup_stats()
+            if self.collection_exists(NEWS_COLLECTION):
+                logger.warning(
+                    f"La colección {NEWS_COLLECTION} sin particionar ya no se consulta "
+                    f"si existen particiones por década; puede eliminarse"
+                )
             
             logger.info(f"Proceso completado. Se procesaron {processed_count} noticias.")
+            self.log_quality_stats()
             return True
             
         except Exception as e:
             logger.error(f"Error creando base de datos de embeddings: {str(e)}")
             return False
+    
+    def log_quality_stats(self) -> None:
+        """Registra cuánto texto descartó el filtro de calidad."""
+        stats = self.quality_stats
+        if not stats.get("lines"):
+            return
+        logger.info(
+            f"Filtro de calidad: {stats['lines_dropped']}/{stats['lines']} líneas descartadas, "
+            f"{stats['lines_trimmed']} recortadas, {stats['chars_dropped'] / max(stats['chars'], 1):.1%} "
+            f"de los caracteres eliminados, {stats['chunks_dropped']}/{stats['chunks']} chunks descartados"
+        )
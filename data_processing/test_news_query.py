@@ -2,23 +2,21 @@
 Script para probar la recuperación de noticias de ChromaDB.
 """
 import chromadb
-from chromadb.utils import embedding_functions
 import json
 
+from backend.ai.embeddings import INDEX_MODEL, get_collection
+from backend.database.news_shards import list_shards
+
 def main():
     # Inicializar el cliente de ChromaDB
     client = chromadb.PersistentClient(path="chroma_db")
     
-    # Usar la misma función de embedding que usamos para procesar
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
-    )
-    
-    # Obtener la colección de noticias
-    collection = client.get_collection(
-        name="news_articles",
-        embedding_function=embedding_function
-    )
+    # Obtener la primera partición de noticias con el mismo modelo que usamos para procesar
+    shards = list_shards(client)
+    if not shards:
+        print("No hay particiones de noticias")
+        return
+    collection = get_collection(client, next(iter(shards.values())), INDEX_MODEL)
     
     # Obtener una noticia específica (usaremos la primera)
     results = collection.get(
@@ -0,0 +1,443 @@
+"""
+Detección de chunks casi duplicados con MinHash y LSH.
+
+Cada chunk se resume en una firma MinHash de sus shingles de caracteres,
+calculada con NumPy (hashing multiplica-desplaza sobre todos los shingles a
+la vez), y se indexa en bandas LSH: dos chunks son candidatos si coinciden
+en alguna banda, de modo que cada búsqueda cuesta un número constante de
+consultas y el corpus completo se deduplica en tiempo lineal. Los
+candidatos se confirman con la similitud de Jaccard estimada por la firma.
+
+El primer chunk de cada grupo es el canónico; los demás se registran como
+alias suyos (con el archivo del que provienen) y no se indexan.
+
+Entre dos guardados completos, las filas y alias de cada archivo confirmado
+en la colección se añaden a un diario para que una ingesta interrumpida se
+reanude con el índice al día.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DIRNAME = "dedup"
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+SEED = 20240101
+NON_WORD = re.compile(r'\W+')
+JOURNAL_SUFFIX = ".journal"
+
+class MinHasher:
+    """Calcula firmas MinHash de textos."""
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = SEED):
+        """
+        Inicializa las permutaciones (funciones hash multiplica-desplaza).
+
+        Args:
+            num_perm: Número de funciones hash de la firma
+            shingle_size: Bytes por shingle (como máximo 8)
+            seed: Semilla de las funciones hash
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._weights = np.uint64(256) ** np.arange(shingle_size, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Shingles de bytes del texto normalizado (minúsculas, solo palabras).
+
+        Args:
+            text: Texto del chunk
+
+        Returns:
+            np.ndarray: Shingles únicos como enteros uint64
+        """
+        data = np.frombuffer(NON_WORD.sub(' ', text.lower()).strip().encode('utf-8'), dtype=np.uint8)
+        if len(data) < self.shingle_size:
+            data = np.pad(data, (0, self.shingle_size - len(data)))
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size).astype(np.uint64)
+        return np.unique(windows @ self._weights)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Firma MinHash de un texto.
+
+        Args:
+            text: Texto del chunk
+
+        Returns:
+            np.ndarray: Firma (num_perm,) uint32
+        """
+        shingles = self.shingles(text)
+        # Hash multiplica-desplaza: los 32 bits altos de a * x + b (mod 2^64)
+        hashes = (self.a[:, None] * shingles[None, :] + self.b[:, None]) >> np.uint64(32)
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: Iterable[str]) -> np.ndarray:
+        """Firmas de varios textos como matriz (n, num_perm) uint32."""
+        rows = [self.signature(text) for text in texts]
+        return np.vstack(rows) if rows else np.empty((0, self.num_perm), dtype=np.uint32)
+
+class NearDuplicateIndex:
+    """Índice LSH persistente de los chunks canónicos de una colección."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.8,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS
+    ):
+        """
+        Inicializa el índice, cargándolo de disco si existe y es compatible.
+
+        Args:
+            path: Archivo .npz del índice (None para no persistirlo)
+            threshold: Similitud de Jaccard estimada mínima de un duplicado
+            num_perm: Número de funciones hash de la firma
+            bands: Bandas LSH (num_perm debe ser múltiplo)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) debe ser múltiplo de bands ({bands})")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        rng = np.random.default_rng(SEED + 1)
+        self._band_weights = rng.integers(1, 2 ** 63, (bands, num_perm // bands), dtype=np.uint64) | np.uint64(1)
+        self._band_salts = rng.integers(0, 2 ** 63, bands, dtype=np.uint64)
+        self.journal_path = f"{path}{JOURNAL_SUFFIX}" if path else None
+        self._lock = threading.Lock()
+        self.reset(remove_file=False)
+        if path and os.path.exists(path):
+            self._load()
+        if self.journal_path and os.path.exists(self.journal_path):
+            self._replay_journal()
+
+    @classmethod
+    def for_collection(cls, persist_directory: str, collection_name: str, threshold: float = 0.8) -> "NearDuplicateIndex":
+        """
+        Obtiene el índice de duplicados de una colección.
+
+        Args:
+            persist_directory: Directorio de persistencia de ChromaDB
+            collection_name: Nombre de la colección
+            threshold: Similitud mínima de un duplicado
+
+        Returns:
+            NearDuplicateIndex de la colección
+        """
+        return cls(os.path.join(persist_directory, DEDUP_DIRNAME, f"{collection_name}.npz"), threshold)
+
+    def reset(self, remove_file: bool = True) -> None:
+        """
+        Vacía el índice (reconstrucción completa).
+
+        Args:
+            remove_file: Borrar también el archivo persistido
+        """
+        self.ids: List[Optional[str]] = []
+        self.sources: List[str] = []
+        self._signatures: List[np.ndarray] = []
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._key_rows = np.empty(0, dtype=np.int64)
+        # clave LSH -> filas añadidas desde la última carga
+        self._pending: Dict[int, List[int]] = {}
+        self._rows: Dict[str, int] = {}
+        # alias -> (id canónico, archivo del alias)
+        self.aliases: Dict[str, Tuple[str, str]] = {}
+        self.touched: Set[str] = set()
+        # archivo -> (filas, alias) añadidos y aún no escritos en el diario
+        self._unsaved: Dict[str, Tuple[List[int], List[str]]] = {}
+        self.stats = {"chunks": 0, "duplicates": 0, "chars_saved": 0}
+        if remove_file and self.path:
+            for path in (self.path, f"{self.path}.aliases.json", self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Claves LSH de varias firmas.
+
+        Args:
+            signatures: Matriz (n, num_perm) de firmas
+
+        Returns:
+            np.ndarray: Matriz (n, bands) uint64, una clave por banda
+        """
+        rows = signatures.reshape(len(signatures), self.bands, -1).astype(np.uint64)
+        return (rows * self._band_weights).sum(axis=2) ^ self._band_salts
+
+    def _candidates(self, keys: np.ndarray) -> Iterable[int]:
+        """Filas que comparten alguna banda con las claves (olvidadas incluidas)."""
+        starts = np.searchsorted(self._keys, keys, side='left')
+        ends = np.searchsorted(self._keys, keys, side='right')
+        for key, start, end in zip(keys.tolist(), starts.tolist(), ends.tolist()):
+            yield from self._key_rows[start:end].tolist()
+            yield from self._pending.get(key, ())
+
+    def find(self, signature: np.ndarray, keys: Optional[np.ndarray] = None) -> Optional[int]:
+        """
+        Busca el chunk canónico casi idéntico a una firma.
+
+        Args:
+            signature: Firma MinHash
+            keys: Claves LSH de la firma (se calculan si no se dan)
+
+        Returns:
+            Fila del chunk canónico o None
+        """
+        if keys is None:
+            keys = self.band_keys(signature[None, :])[0]
+        for row in sorted(set(self._candidates(keys))):
+            if self.ids[row] is not None and np.mean(self._signatures[row] == signature) >= self.threshold:
+                return row
+        return None
+
+    def add(self, record_id: str, text: str, source: str, signature: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        Registra un chunk, como canónico o como alias de uno existente.
+
+        Args:
+            record_id: Id del chunk
+            text: Texto del chunk
+            source: Archivo del que proviene
+            signature: Firma MinHash ya calculada
+
+        Returns:
+            Id del chunk canónico si es un duplicado, None si es canónico
+        """
+        if signature is None:
+            signature = self.hasher.signature(text)
+        keys = self.band_keys(signature[None, :])[0]
+        self.stats["chunks"] += 1
+        row = self.find(signature, keys)
+        with self._lock:
+            rows, aliases = self._unsaved.setdefault(source, ([], []))
+            if row is not None:
+                canonical_id = self.ids[row]
+                self._add_alias(record_id, canonical_id, source)
+                aliases.append(record_id)
+                self.stats["duplicates"] += 1
+                self.stats["chars_saved"] += len(text)
+                return canonical_id
+            rows.append(self._add_row(record_id, source, signature, keys))
+        return None
+
+    def _add_row(self, record_id: str, source: str, signature: np.ndarray, keys: np.ndarray) -> int:
+        """Añade un chunk canónico y sus bandas pendientes de compactar."""
+        row = len(self.ids)
+        self.ids.append(record_id)
+        self.sources.append(source)
+        self._signatures.append(signature)
+        self._rows[record_id] = row
+        for key in keys.tolist():
+            self._pending.setdefault(key, []).append(row)
+        return row
+
+    def _add_alias(self, record_id: str, canonical_id: str, source: str) -> None:
+        """Registra un alias de un chunk canónico."""
+        self.aliases[record_id] = (canonical_id, source)
+        self.touched.add(canonical_id)
+
+    def ids_of_sources(self, sources: Iterable[str]) -> List[str]:
+        """
+        Ids canónicos vigentes que provienen de ciertos archivos.
+
+        Args:
+            sources: Rutas (o nombres) de los archivos
+
+        Returns:
+            Lista de ids
+        """
+        names = {os.path.basename(source) for source in sources}
+        return [
+            record_id for record_id, source in zip(self.ids, self.sources)
+            if record_id is not None and os.path.basename(source) in names
+        ]
+
+    def checkpoint(self, sources: Iterable[str]) -> None:
+        """
+        Añade al diario las filas y alias de archivos ya escritos en la colección.
+
+        Cada línea guarda todo lo que produjo un archivo y sustituye, al
+        reanudar, a lo registrado antes para ese archivo.
+
+        Args:
+            sources: Rutas de los archivos confirmados
+        """
+        if not self.journal_path:
+            return
+        lines = []
+        with self._lock:
+            for source in sources:
+                rows, aliases = self._unsaved.pop(source, ([], []))
+                lines.append(json.dumps({
+                    "source": source,
+                    "rows": [[self.ids[row], self._signatures[row].tobytes().hex()] for row in rows],
+                    "aliases": [[alias, self.aliases[alias][0]] for alias in aliases]
+                }, ensure_ascii=False))
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_journal(self) -> None:
+        """Aplica el diario de una ingesta interrumpida sobre el índice cargado."""
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Última línea a medio escribir
+                    break
+        for entry in entries:
+            source = entry["source"]
+            # Lo registrado antes para el archivo queda sustituido
+            self.forget(self.ids_of_sources([source]))
+            self.forget_sources([source])
+            for record_id, signature_hex in entry["rows"]:
+                signature = np.frombuffer(bytes.fromhex(signature_hex), dtype=np.uint32)
+                self._add_row(record_id, source, signature, self.band_keys(signature[None, :])[0])
+            for alias, canonical_id in entry["aliases"]:
+                self._add_alias(alias, canonical_id, source)
+        logger.info(f"Índice de duplicados: {len(entries)} archivos recuperados del diario")
+
+    def forget_sources(self, sources: Iterable[str]) -> None:
+        """
+        Olvida los alias que provienen de archivos modificados o eliminados.
+
+        Args:
+            sources: Rutas (o nombres) de los archivos
+        """
+        names = {os.path.basename(source) for source in sources}
+        for alias, (canonical_id, source) in list(self.aliases.items()):
+            if os.path.basename(source) in names:
+                del self.aliases[alias]
+                self.touched.add(canonical_id)
+
+    def forget(self, record_ids: Iterable[str]) -> Set[str]:
+        """
+        Olvida chunks canónicos eliminados de la colección.
+
+        Sus alias quedan sin texto indexado, así que se devuelven los archivos
+        de esos alias para volver a procesarlos.
+
+        Args:
+            record_ids: Ids eliminados
+
+        Returns:
+            Rutas de los archivos con alias huérfanos
+        """
+        forgotten = set()
+        for record_id in record_ids:
+            row = self._rows.pop(record_id, None)
+            if row is not None:
+                self.ids[row] = None
+                forgotten.add(record_id)
+        orphaned = set()
+        for alias, (canonical_id, source) in list(self.aliases.items()):
+            if canonical_id in forgotten:
+                del self.aliases[alias]
+                orphaned.add(source)
+        self.touched -= forgotten
+        return orphaned
+
+    def touched_canonical_ids(self) -> List[str]:
+        """Ids canónicos vigentes cuyos alias aún no se volcaron a los metadatos."""
+        return sorted(record_id for record_id in self.touched if record_id in self._rows)
+
+    def aliases_of(self, canonical_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Alias de varios chunks canónicos.
+
+        Args:
+            canonical_ids: Ids canónicos
+
+        Returns:
+            Dict de id canónico a la lista ordenada de sus alias
+        """
+        wanted = set(canonical_ids)
+        result = {canonical_id: [] for canonical_id in wanted}
+        for alias, (canonical_id, _) in self.aliases.items():
+            if canonical_id in wanted:
+                result[canonical_id].append(alias)
+        for alias_ids in result.values():
+            alias_ids.sort()
+        return result
+
+    def take_stats(self) -> Dict[str, int]:
+        """Devuelve y reinicia los contadores de la ejecución."""
+        stats, self.stats = self.stats, dict.fromkeys(self.stats, 0)
+        return stats
+
+    def _load(self) -> None:
+        """Carga el índice de disco (lo descarta si usa otros parámetros)."""
+        data = np.load(self.path)
+        signatures = data["signatures"]
+        if signatures.shape[1] != self.num_perm or int(data["bands"]) != self.bands:
+            logger.warning(f"Índice de duplicados {self.path} con otros parámetros, se descarta")
+            return
+        self.ids = data["ids"].tolist()
+        self.sources = data["sources"].tolist()
+        self._signatures = list(signatures)
+        self._rows = {record_id: row for row, record_id in enumerate(self.ids)}
+        self.touched = set(data["touched"].tolist()) if "touched" in data else set()
+        with open(f"{self.path}.aliases.json", 'r', encoding='utf-8') as f:
+            self.aliases = {alias: tuple(value) for alias, value in json.load(f).items()}
+
+        # Reconstruir las bandas con NumPy: claves ordenadas con todas sus filas,
+        # para que una fila olvidada no oculte a otra vigente con la misma clave
+        keys = self.band_keys(signatures).ravel() if len(signatures) else np.empty(0, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(signatures), dtype=np.int64), self.bands)
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._key_rows = rows[order]
+
+    def save(self) -> None:
+        """
+        Compacta el índice (sin las filas olvidadas) y lo guarda en disco.
+
+        Los alias pendientes de volcar a los metadatos (touched) se guardan
+        también y el diario se vacía.
+        """
+        if not self.path:
+            return
+        live = [row for row, record_id in enumerate(self.ids) if record_id is not None]
+        signatures = (
+            np.vstack([self._signatures[row] for row in live])
+            if live else np.empty((0, self.num_perm), dtype=np.uint32)
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array([self.ids[row] for row in live], dtype=str),
+            sources=np.array([self.sources[row] for row in live], dtype=str),
+            signatures=signatures,
+            bands=np.array(self.bands),
+            touched=np.array(sorted(self.touched), dtype=str)
+        )
+        with open(f"{self.path}.aliases.json.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.aliases, f, ensure_ascii=False)
+        os.replace(f"{self.path}.aliases.json.tmp", f"{self.path}.aliases.json")
+        os.replace(tmp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._unsaved.clear()
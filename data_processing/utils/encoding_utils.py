@@ -1,9 +1,28 @@
 """
 Utilidades para manejar la codificación de caracteres y normalización de texto.
 """
-import unicodedata
+import codecs
+import json
+import mmap
+import os
 import chardet
-from typing import Dict, Optional
+from chardet.universaldetector import UniversalDetector
+from typing import Dict, Optional, Union
+
+from . import profiling
+from .normalization import fold_text, normalize_filename as _normalize_filename
+
+# Archivo, por directorio, donde se guardan las codificaciones detectadas
+ENCODING_CACHE_FILENAME = '.encoding_cache.json'
+# A partir de este tamaño los archivos se leen con mmap
+MMAP_THRESHOLD = 1 << 20
+# Tamaño de bloque para la detección incremental
+DETECTION_BLOCK_SIZE = 1 << 16
+# Codificaciones de respaldo si chardet no da un resultado utilizable
+FALLBACK_ENCODINGS = ['cp1252', 'latin1']
+
+# Caché en memoria de los archivos de caché ya cargados, por directorio
+_encoding_caches: Dict[str, Dict[str, Dict]] = {}
 
 def normalize_filename(filename: str) -> str:
     """
@@ -15,36 +34,203 @@ def normalize_filename(filename: str) -> str:
     Returns:
         str: Nombre del archivo normalizado
     """
-    # Mapa de reemplazos para caracteres especiales comunes
-    replacements = {
-        '‚': 'e',  # Para é
-        'ค': 'n',  # Para ñ
-        '¡': 'i',  # Para í
-        '¤': 'n',  # Para ñ
-        '｣': 'a',  # Para á
-        'ข': 'o',  # Para ó
-        '‡': 'u',  # Para ú
-    }
+    return _normalize_filename(filename)
+
+def _cache_key(file_path: str) -> Dict:
+    """Identifica la versión de un archivo por tamaño y fecha de modificación."""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _load_encoding_cache(directory: str) -> Dict[str, Dict]:
+    """Carga (una vez por proceso) la caché de codificaciones de un directorio."""
+    cache = _encoding_caches.get(directory)
+    if cache is None:
+        cache = {}
+        cache_path = os.path.join(directory, ENCODING_CACHE_FILENAME)
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+        _encoding_caches[directory] = cache
+    return cache
+
+def get_cached_encoding(file_path: str) -> Optional[str]:
+    """
+    Busca la codificación detectada previamente para un archivo.
+    
+    Args:
+        file_path: Ruta al archivo
+        
+    Returns:
+        str: Codificación guardada, o None si no hay una válida para la versión actual
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    entry = _load_encoding_cache(directory).get(name)
+    if entry and {'size': entry.get('size'), 'mtime_ns': entry.get('mtime_ns')} == _cache_key(file_path):
+        return entry['encoding']
+    return None
+
+def cache_encoding(file_path: str, encoding: str) -> None:
+    """
+    Guarda la codificación detectada de un archivo en la caché de su directorio.
+    
+    El archivo de caché se reescribe de forma atómica combinándolo con lo que
+    haya en disco, de modo que varios procesos pueden escribir en él; en el
+    peor caso se pierde una entrada y se vuelve a detectar más adelante.
+    
+    Args:
+        file_path: Ruta al archivo
+        encoding: Codificación detectada
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    cache = _load_encoding_cache(directory)
+    cache[name] = {**_cache_key(file_path), 'encoding': encoding}
+    
+    cache_path = os.path.join(directory, ENCODING_CACHE_FILENAME)
+    try:
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                on_disk = json.load(f)
+            on_disk.update(cache)
+            cache.update(on_disk)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError):
+        # La caché es opcional: si no se puede escribir se detectará de nuevo
+        pass
+
+def read_file_bytes(file_path: str) -> Union[bytes, mmap.mmap]:
+    """
+    Lee el contenido binario de un archivo una sola vez.
+    
+    Los archivos grandes se mapean en memoria en lugar de copiarse.
+    
+    Args:
+        file_path: Ruta al archivo
+        
+    Returns:
+        bytes o mmap con el contenido del archivo
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+def _detect_with_chardet(raw: Union[bytes, mmap.mmap]) -> Optional[str]:
+    """Detecta la codificación con chardet, alimentándolo por bloques."""
+    detector = UniversalDetector()
+    view = memoryview(raw)
+    for start in range(0, len(view), DETECTION_BLOCK_SIZE):
+        detector.feed(bytes(view[start:start + DETECTION_BLOCK_SIZE]))
+        if detector.done:
+            break
+    view.release()
+    detector.close()
+    return detector.result.get('encoding')
+
+def decode_bytes(raw: Union[bytes, mmap.mmap], file_path: Optional[str] = None) -> str:
+    """
+    Decodifica el contenido de un archivo.
     
-    # Primero aplicar reemplazos específicos
-    for old, new in replacements.items():
-        filename = filename.replace(old, new)
+    Primero se usa la codificación guardada en caché (si hay), luego se
+    comprueba si el contenido es UTF-8 válido y solo si no lo es se recurre
+    a chardet. El resultado de chardet se guarda en la caché del directorio.
     
-    # Normalizar caracteres Unicode
-    filename = unicodedata.normalize('NFKD', filename)
+    Args:
+        raw: Contenido binario
+        file_path: Ruta del archivo, para consultar y actualizar la caché
+        
+    Returns:
+        str: Contenido decodificado
+    """
+    cached = get_cached_encoding(file_path) if file_path else None
+    if cached:
+        try:
+            return str(raw, cached)
+        except (UnicodeDecodeError, LookupError):
+            pass
     
-    # Reemplazar caracteres no deseados
-    filename = filename.replace(' ', '_')
-    filename = filename.replace(',', '')
-    filename = filename.replace('(', '')
-    filename = filename.replace(')', '')
+    try:
+        return str(raw, 'utf-8')
+    except UnicodeDecodeError:
+        pass
     
-    return filename
+    candidates = FALLBACK_ENCODINGS
+    detected = _detect_with_chardet(raw)
+    if detected:
+        candidates = [detected] + candidates
+    for encoding in candidates:
+        try:
+            text = str(raw, encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        if file_path:
+            cache_encoding(file_path, encoding)
+        return text
+    # latin1 decodifica cualquier secuencia de bytes, no se llega aquí
+    raise UnicodeDecodeError('latin1', b'', 0, 1, 'no se pudo decodificar')
+
+def detect_file_encoding(file_path: str) -> str:
+    """
+    Determina la codificación de un archivo sin cargarlo completo en memoria.
+    
+    Valida UTF-8 de forma incremental por bloques y solo si falla recurre
+    a chardet. Útil para leer archivos grandes en modo streaming.
+    
+    Args:
+        file_path: Ruta al archivo
+        
+    Returns:
+        str: Codificación a usar para abrir el archivo
+    """
+    cached = get_cached_encoding(file_path)
+    if cached:
+        return cached
+    
+    if _decodes_incrementally(file_path, 'utf-8'):
+        return 'utf-8'
+    
+    detector = UniversalDetector()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(DETECTION_BLOCK_SIZE), b''):
+            detector.feed(block)
+            if detector.done:
+                break
+    detector.close()
+    
+    candidates = FALLBACK_ENCODINGS
+    if detector.result.get('encoding'):
+        candidates = [detector.result['encoding']] + candidates
+    for encoding in candidates:
+        if _decodes_incrementally(file_path, encoding):
+            cache_encoding(file_path, encoding)
+            return encoding
+    return FALLBACK_ENCODINGS[-1]
+
+def _decodes_incrementally(file_path: str, encoding: str) -> bool:
+    """Comprueba por bloques si un archivo es válido en una codificación."""
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(DETECTION_BLOCK_SIZE), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
 
 def read_html_file(file_path: str) -> str:
     """
     Lee un archivo HTML asegurando la correcta codificación.
     
+    El archivo se lee una sola vez como bytes y la codificación se decide
+    sobre ese contenido (caché, validación UTF-8 y, si hace falta, chardet).
+    
     Args:
         file_path: Ruta al archivo HTML
         
@@ -54,22 +240,16 @@ def read_html_file(file_path: str) -> str:
     Raises:
         UnicodeDecodeError: Si no se puede decodificar el archivo
     """
-    # Lista de codificaciones a intentar
-    encodings = ['utf-8', 'latin1', 'cp1252']
-    
-    # Intentar codificaciones conocidas
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-    
-    # Si ninguna codificación funciona, intentar detección automática
-    with open(file_path, 'rb') as f:
-        raw = f.read()
-        result = chardet.detect(raw)
-        return raw.decode(result['encoding'])
+    with profiling.stage("read"):
+        raw = read_file_bytes(file_path)
+    try:
+        with profiling.stage("encoding"):
+            text = decode_bytes(raw, file_path)
+        profiling.count("chars", len(text))
+        return text
+    finally:
+        if isinstance(raw, mmap.mmap):
+            raw.close()
 
 def clean_text(text: str) -> str:
     """
@@ -81,17 +261,8 @@ def clean_text(text: str) -> str:
     Returns:
         str: Texto limpio y normalizado
     """
-    # Normalizar caracteres Unicode
-    text = unicodedata.normalize('NFKD', text)
-    
-    # Eliminar caracteres no ASCII pero mantener ñ y acentos
-    text = ''.join(c for c in text if not unicodedata.combining(c) 
-                  and (c.isascii() or c in 'áéíóúñÁÉÍÓÚÑ'))
-    
-    # Eliminar espacios múltiples
-    text = ' '.join(text.split())
-    
-    return text
+    with profiling.stage("clean"):
+        return fold_text(text)
 
 def detect_encoding(file_path: str) -> Dict[str, Optional[str]]:
     """
@@ -1,9 +1,41 @@
 """
 Utilidades para manejo de coordenadas geográficas.
+
+Además de las funciones escalares, incluye kernels de Haversine vectorizados
+con NumPy que operan sobre arrays float64 de coordenadas en grados: distancia
+de un punto a muchos, matriz de distancias entre dos conjuntos y los k más
+cercanos con argpartition.
 """
 from geopy.distance import geodesic
-from typing import Tuple, List, Optional
-from math import radians, sin, cos, sqrt, atan2
+from typing import Sequence, Tuple, List, Optional, Union
+from math import radians
+
+import numpy as np
+
+# Radio medio de la Tierra en kilómetros
+EARTH_RADIUS_KM = 6371.0
+
+# Coordenadas: lista de tuplas (latitud, longitud) o array de forma (n, 2)
+Points = Union[Sequence[Tuple[float, float]], np.ndarray]
+
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Fórmula de Haversine sobre arrays en radianes (con broadcasting).
+
+    Es el kernel de todas las distancias de este módulo y del índice
+    espacial de backend.database.spatial.
+
+    Args:
+        lat1: Latitudes del primer conjunto
+        lon1: Longitudes del primer conjunto
+        lat2: Latitudes del segundo conjunto
+        lon2: Longitudes del segundo conjunto
+
+    Returns:
+        np.ndarray: Distancias en kilómetros
+    """
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
 def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
@@ -18,22 +50,130 @@ def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float])
     """
     return geodesic(coord1, coord2).kilometers
 
-def find_nearest_points(target: Tuple[float, float], points: List[Tuple[float, float]], max_distance: Optional[float] = None) -> List[Tuple[float, float]]:
+def as_coordinate_array(points: Points) -> np.ndarray:
+    """
+    Convierte coordenadas a un array float64 de forma (n, 2).
+    
+    Args:
+        points: Lista de tuplas (latitud, longitud) o array (n, 2)
+        
+    Returns:
+        np.ndarray: Coordenadas en grados
+    """
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+def distances_to(target: Tuple[float, float], points: Points) -> np.ndarray:
+    """
+    Distancias de Haversine de un punto a muchos.
+    
+    Args:
+        target: Tupla (latitud, longitud) del punto
+        points: Coordenadas de los puntos
+        
+    Returns:
+        np.ndarray: Distancias en kilómetros, una por punto
+    """
+    coords = np.radians(as_coordinate_array(points))
+    lat, lon = radians(target[0]), radians(target[1])
+    return haversine(lat, lon, coords[:, 0], coords[:, 1])
+
+def distance_matrix(points_a: Points, points_b: Points) -> np.ndarray:
+    """
+    Matriz de distancias de Haversine entre dos conjuntos de puntos.
+    
+    Ocupa len(points_a) * len(points_b) float64 (más los temporales), así
+    que los conjuntos muy grandes conviene procesarlos por bloques.
+    
+    Args:
+        points_a: Coordenadas de las filas
+        points_b: Coordenadas de las columnas
+        
+    Returns:
+        np.ndarray: Matriz (len(points_a), len(points_b)) en kilómetros
+    """
+    a = np.radians(as_coordinate_array(points_a))
+    b = np.radians(as_coordinate_array(points_b))
+    return haversine(a[:, 0, None], a[:, 1, None], b[None, :, 0], b[None, :, 1])
+
+def nearest_k(
+    target: Tuple[float, float],
+    points: Points,
+    k: int,
+    max_distance: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Los k puntos más cercanos a un punto objetivo.
+    
+    Selecciona con argpartition (lineal) y solo ordena los k elegidos.
+    
+    Args:
+        target: Tupla (latitud, longitud) del punto objetivo
+        points: Coordenadas de los puntos
+        k: Número de puntos
+        max_distance: Distancia máxima en kilómetros (opcional)
+        
+    Returns:
+        Tupla de (índices en points, distancias en km), ordenados por distancia
+    """
+    distances = distances_to(target, points)
+    indices = np.arange(len(distances))
+    if max_distance is not None:
+        keep = distances <= max_distance
+        indices, distances = indices[keep], distances[keep]
+    if k < len(distances):
+        selected = np.argpartition(distances, k)[:k]
+        indices, distances = indices[selected], distances[selected]
+    order = np.argsort(distances, kind="stable")
+    return indices[order], distances[order]
+
+def find_nearest_points(
+    target: Tuple[float, float],
+    points: List[Tuple[float, float]],
+    max_distance: Optional[float] = None,
+    k: Optional[int] = None
+) -> List[Tuple[float, float]]:
     """
     Encuentra los puntos más cercanos a un punto objetivo.
     
+    Las distancias son de Haversine (como get_distance), calculadas para
+    todos los puntos a la vez. Difieren de las geodésicas de
+    calculate_distance en menos de un 0,5 %, así que un punto justo en el
+    borde de max_distance puede quedar dentro o fuera según la fórmula.
+    
     Args:
         target: Coordenadas del punto objetivo
         points: Lista de coordenadas de puntos a comparar
         max_distance: Distancia máxima en kilómetros (opcional)
+        k: Devolver solo los k más cercanos (opcional)
         
     Returns:
         Lista de puntos ordenados por distancia
     """
-    distances = [(p, calculate_distance(target, p)) for p in points]
-    if max_distance:
-        distances = [(p, d) for p, d in distances if d <= max_distance]
-    return [p for p, _ in sorted(distances, key=lambda x: x[1])]
+    if not len(points):
+        return []
+    indices, _ = nearest_k(target, points, len(points) if k is None else k, max_distance)
+    return [points[i] for i in indices.tolist()]
+
+def within_bounds(
+    latitudes: Union[float, np.ndarray],
+    longitudes: Union[float, np.ndarray],
+    bounds: Tuple[float, float, float, float]
+) -> Union[bool, np.ndarray]:
+    """
+    Verifica si unas coordenadas (escalares o arrays) están dentro de unos límites.
+    
+    Args:
+        latitudes: Latitud o array de latitudes
+        longitudes: Longitud o array de longitudes
+        bounds: Tuple de (min_lat, max_lat, min_lon, max_lon)
+        
+    Returns:
+        bool o array de bool, uno por punto
+    """
+    min_lat, max_lat, min_lon, max_lon = bounds
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    return (min_lat <= latitudes) & (latitudes <= max_lat) & (min_lon <= longitudes) & (longitudes <= max_lon)
 
 def is_within_bounds(coord: Tuple[float, float], bounds: Tuple[float, float, float, float]) -> bool:
     """
@@ -46,39 +186,36 @@ def is_within_bounds(coord: Tuple[float, float], bounds: Tuple[float, float, flo
     Returns:
         Boolean indicando si está dentro de los límites
     """
-    lat, lon = coord
-    min_lat, max_lat, min_lon, max_lon = bounds
-    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+    return bool(within_bounds(coord[0], coord[1], bounds))
 
 # Límites aproximados de Puerto Rico
 PR_BOUNDS = (17.9, 18.5, -67.3, -65.6)  # (min_lat, max_lat, min_lon, max_lon)
+# Límites incluyendo Vieques y Culebra
+PR_EXTENDED_BOUNDS = (17.8, 18.6, -67.3, -65.2)
 
-def is_within_puerto_rico(lat: float, lon: float) -> bool:
+def is_within_puerto_rico(
+    lat: Union[float, np.ndarray],
+    lon: Union[float, np.ndarray]
+) -> Union[bool, np.ndarray]:
     """
     Verifica si unas coordenadas están dentro de los límites de Puerto Rico.
     
     Args:
-        lat: Latitud
-        lon: Longitud
+        lat: Latitud (o array de latitudes)
+        lon: Longitud (o array de longitudes)
         
     Returns:
-        bool: True si las coordenadas están dentro de Puerto Rico
-    """
-    # Límites aproximados de Puerto Rico (incluyendo Vieques y Culebra)
-    PR_BOUNDS = {
-        'min_lat': 17.8,  # Sur
-        'max_lat': 18.6,  # Norte
-        'min_lon': -67.3, # Oeste
-        'max_lon': -65.2  # Este
-    }
-    
-    return (PR_BOUNDS['min_lat'] <= lat <= PR_BOUNDS['max_lat'] and
-            PR_BOUNDS['min_lon'] <= lon <= PR_BOUNDS['max_lon'])
+        bool (o array de bool): True si las coordenadas están dentro de Puerto Rico
+    """
+    inside = within_bounds(lat, lon, PR_EXTENDED_BOUNDS)
+    return bool(inside) if inside.ndim == 0 else inside
 
 def get_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
     Calcula la distancia entre dos puntos usando la fórmula de Haversine.
     
+    Usa el mismo kernel y radio terrestre que las funciones vectorizadas.
+    
     Args:
         coord1: Tupla (latitud, longitud) del primer punto
         coord2: Tupla (latitud, longitud) del segundo punto
@@ -86,21 +223,5 @@ def get_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> fl
     Returns:
         float: Distancia en kilómetros
     """
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    
-    R = 6371  # Radio de la Tierra en kilómetros
-    
-    # Convertir coordenadas a radianes
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    # Diferencias
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    # Fórmula de Haversine
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    distance = R * c
-    
-    return distance
+    lat1, lon1, lat2, lon2 = map(radians, (*coord1, *coord2))
+    return float(haversine(lat1, lon1, lat2, lon2))
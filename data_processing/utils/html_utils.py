@@ -2,10 +2,16 @@
 Utilidades para procesar archivos HTML de Wikipedia.
 """
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 import re
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
+from . import profiling
 from .encoding_utils import read_html_file, clean_text
 
+COORDINATES_PATTERN = re.compile(r'"wgCoordinates":\{"lat":([\d.-]+),"lon":([\d.-]+)')
+CATEGORY_HREF_PATTERN = re.compile(r'^/wiki/Category:')
+REFERENCE_PATTERN = re.compile(r'\[\d+\]')
+
 def parse_html_file(file_path: str) -> BeautifulSoup:
     """
     Lee y parsea un archivo HTML.
@@ -34,7 +40,7 @@ def extract_coordinates(soup: BeautifulSoup) -> Optional[Tuple[float, float]]:
         scripts = soup.find_all('script')
         for script in scripts:
             if script.string and 'wgCoordinates' in script.string:
-                coords_match = re.search(r'"wgCoordinates":\{"lat":([\d.-]+),"lon":([\d.-]+)', script.string)
+                coords_match = COORDINATES_PATTERN.search(script.string)
                 if coords_match:
                     return float(coords_match.group(1)), float(coords_match.group(2))
         
@@ -86,7 +92,7 @@ def extract_description(soup: BeautifulSoup) -> Optional[str]:
             # Ignorar párrafos vacíos o que solo contienen coordenadas
             if text and not text.startswith('Coordinates:'):
                 # Eliminar referencias [1], [2], etc.
-                text = re.sub(r'\[\d+\]', '', text)
+                text = REFERENCE_PATTERN.sub('', text)
                 return text
                 
         return None
@@ -106,7 +112,7 @@ def extract_categories(soup: BeautifulSoup) -> List[str]:
     """
     categories = []
     try:
-        cat_links = soup.find_all('a', href=re.compile(r'^/wiki/Category:'))
+        cat_links = soup.find_all('a', href=CATEGORY_HREF_PATTERN)
         for link in cat_links:
             cat_name = clean_text(link.text.strip())
             if cat_name and not cat_name.startswith('Category:'):
@@ -114,3 +120,220 @@ def extract_categories(soup: BeautifulSoup) -> List[str]:
     except Exception:
         pass
     return categories
+
+# Etiquetas vacías (void) que BeautifulSoup cierra al abrirlas
+VOID_TAGS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame',
+    'hr', 'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta',
+    'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+])
+
+# Etiquetas cuyo texto no forma parte de get_text() en BeautifulSoup
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+
+class _Node:
+    """Elemento abierto en la pila del extractor."""
+    
+    __slots__ = ('name', 'text', 'kind', 'slot')
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.text = None
+        self.kind = None
+        self.slot = None
+
+class WikiPageExtractor(HTMLParser):
+    """
+    Extrae coordenadas, descripción y categorías de una página de Wikipedia
+    en una sola pasada sobre el HTML, sin construir el árbol completo.
+    
+    Reproduce la semántica de árbol de BeautifulSoup con 'html.parser'
+    (cierre de etiquetas vacías, cierre hasta la etiqueta abierta más reciente,
+    exclusión del texto de script/style en get_text) para producir
+    exactamente los mismos resultados que extract_coordinates,
+    extract_description y extract_categories.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[_Node] = []
+        self.open_counts: Dict[str, int] = {}
+        self.container_depth = 0
+        self.collectors: List[_Node] = []
+        self.already_closed: List[str] = []
+        
+        self.script_coordinates: Optional[Tuple[float, float]] = None
+        self.script_matched = False
+        self.coordinates_error = False
+        self.geo_text: Optional[str] = None
+        self.geo_seen = False
+        self.content_node: Optional[_Node] = None
+        self.parser_output: Optional[_Node] = None
+        self.description: Optional[str] = None
+        self.categories: List[Optional[str]] = []
+        
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._start(tag, attrs)
+        if tag in VOID_TAGS:
+            self._pop_to(tag)
+            self.already_closed.append(tag)
+    
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._start(tag, attrs)
+        self._pop_to(tag)
+    
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+        else:
+            self._pop_to(tag)
+    
+    def handle_data(self, data: str) -> None:
+        if self.container_depth:
+            top = self.stack[-1]
+            if top.kind == 'script':
+                top.text.append(data)
+            return
+        for node in self.collectors:
+            node.text.append(data)
+    
+    def unknown_decl(self, data: str) -> None:
+        # Las secciones CDATA cuentan como texto en get_text()
+        if data.upper().startswith('CDATA['):
+            for node in self.collectors:
+                node.text.append(data[len('CDATA['):])
+    
+    def _start(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        node = _Node(tag)
+        parent = self.stack[-1] if self.stack else None
+        
+        if tag == 'script':
+            node.kind = 'script'
+            node.text = []
+        elif tag == 'a':
+            href = self._attr(attrs, 'href')
+            if href is not None and CATEGORY_HREF_PATTERN.search(href):
+                node.kind = 'category'
+                node.slot = len(self.categories)
+                self.categories.append(None)
+        elif tag == 'span':
+            if not self.geo_seen and 'geo' in (self._attr(attrs, 'class') or '').split():
+                self.geo_seen = True
+                node.kind = 'geo'
+        elif tag == 'div':
+            if self.content_node is None:
+                if self._attr(attrs, 'id') == 'mw-content-text':
+                    self.content_node = node
+            elif (self.parser_output is None
+                    and self.content_node in self.stack
+                    and 'mw-parser-output' in (self._attr(attrs, 'class') or '').split()):
+                self.parser_output = node
+        elif (tag == 'p'
+                and self.description is None
+                and parent is not None
+                and parent is self.parser_output
+                and not (self._attr(attrs, 'class') or '').split()
+                and not self.open_counts.get('table', 0)):
+            node.kind = 'paragraph'
+        
+        if node.kind in ('category', 'geo', 'paragraph'):
+            node.text = []
+            self.collectors.append(node)
+        
+        self.stack.append(node)
+        self.open_counts[tag] = self.open_counts.get(tag, 0) + 1
+        if tag in STRING_CONTAINER_TAGS:
+            self.container_depth += 1
+    
+    def _pop_to(self, tag: str) -> None:
+        if not self.open_counts.get(tag):
+            return
+        while self.stack:
+            node = self.stack.pop()
+            self._finish(node)
+            if node.name == tag:
+                return
+    
+    def _finish(self, node: _Node) -> None:
+        self.open_counts[node.name] -= 1
+        if node.name in STRING_CONTAINER_TAGS:
+            self.container_depth -= 1
+        if node.kind is None:
+            return
+        if node.kind != 'script':
+            self.collectors.remove(node)
+        
+        if node.kind == 'script':
+            content = ''.join(node.text)
+            if not self.script_matched and content and 'wgCoordinates' in content:
+                coords_match = COORDINATES_PATTERN.search(content)
+                if coords_match:
+                    self.script_matched = True
+                    try:
+                        self.script_coordinates = float(coords_match.group(1)), float(coords_match.group(2))
+                    except ValueError:
+                        self.coordinates_error = True
+        elif node.kind == 'category':
+            cat_name = clean_text(''.join(node.text).strip())
+            if cat_name and not cat_name.startswith('Category:'):
+                self.categories[node.slot] = cat_name
+        elif node.kind == 'geo':
+            self.geo_text = ''.join(node.text)
+        elif node.kind == 'paragraph' and self.description is None:
+            text = clean_text(''.join(node.text).strip())
+            if text and not text.startswith('Coordinates:'):
+                self.description = REFERENCE_PATTERN.sub('', text)
+    
+    @staticmethod
+    def _attr(attrs: List[Tuple[str, Optional[str]]], name: str) -> Optional[str]:
+        value = None
+        for key, attr_value in attrs:
+            if key == name:
+                value = attr_value if attr_value is not None else ''
+        return value
+    
+    def close(self) -> None:
+        super().close()
+        while self.stack:
+            self._finish(self.stack.pop())
+    
+    def coordinates(self) -> Optional[Tuple[float, float]]:
+        """Coordenadas con la misma prioridad que extract_coordinates."""
+        if self.coordinates_error:
+            return None
+        if self.script_coordinates:
+            return self.script_coordinates
+        if self.geo_text is not None:
+            try:
+                coords = self.geo_text.split(';')
+                if len(coords) == 2:
+                    return float(coords[0]), float(coords[1])
+            except ValueError:
+                return None
+        return None
+
+def extract_page_info(file_path: str) -> Dict:
+    """
+    Lee un archivo HTML de Wikipedia y extrae coordenadas, descripción y
+    categorías en una sola pasada.
+    
+    Equivale a llamar a parse_html_file seguido de extract_coordinates,
+    extract_description y extract_categories, pero sin construir el árbol
+    de BeautifulSoup ni recorrerlo tres veces.
+    
+    Args:
+        file_path: Ruta al archivo HTML.
+        
+    Returns:
+        Dict con las claves coordinates, description y categories.
+    """
+    content = read_html_file(file_path)
+    with profiling.stage("parse"):
+        extractor = WikiPageExtractor()
+        extractor.feed(content)
+        extractor.close()
+    return {
+        "coordinates": extractor.coordinates(),
+        "description": extractor.description,
+        "categories": [name for name in extractor.categories if name is not None]
+    }
@@ -0,0 +1,286 @@
+"""
+Manifiesto de ingesta incremental.
+
+Guarda, por colección, el hash del contenido de cada archivo fuente junto con
+los ids de ChromaDB que generó, la versión del extractor y el modelo de
+embeddings. Con esto una nueva ejecución solo procesa los archivos nuevos o
+modificados y elimina las filas de los archivos borrados.
+
+Durante la ingesta, cada lote escrito en ChromaDB se confirma añadiendo sus
+archivos completos a un diario (JSON Lines) junto al manifiesto. Si el proceso
+muere, la siguiente ejecución carga el manifiesto más el diario y continúa
+desde el último lote confirmado.
+
+Una reconstrucción forzada (--force) que abarca varias colecciones registra
+su id en un marcador del directorio de manifiestos, y cada manifiesto guarda
+el id de la reconstrucción que lo vació. Al continuarla (--force --resume) las
+colecciones que ya reconstruyó no se vuelven a vaciar.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_DIRNAME = "manifests"
+HASH_BLOCK_SIZE = 1 << 20
+JOURNAL_SUFFIX = ".journal"
+FORCE_RUN_FILENAME = "force_run.json"
+
+def file_hash(file_path: str) -> str:
+    """
+    Calcula el hash del contenido de un archivo leyéndolo por bloques.
+
+    Args:
+        file_path: Ruta al archivo
+
+    Returns:
+        str: Hash SHA-1 en hexadecimal
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def force_run_path(persist_directory: str) -> str:
+    """Ruta del marcador de la reconstrucción forzada en curso."""
+    return os.path.join(persist_directory, MANIFEST_DIRNAME, FORCE_RUN_FILENAME)
+
+def start_force_run(persist_directory: str, resume: bool = False) -> str:
+    """
+    Empieza una reconstrucción forzada o continúa la interrumpida.
+
+    Args:
+        persist_directory: Directorio de persistencia de ChromaDB
+        resume: Reutilizar el id de la reconstrucción anterior si no terminó
+
+    Returns:
+        str: Id de la reconstrucción
+    """
+    path = force_run_path(persist_directory)
+    if resume and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)["run_id"]
+        except (ValueError, KeyError):
+            pass
+    run_id = uuid.uuid4().hex
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"run_id": run_id, "started_at": time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return run_id
+
+def finish_force_run(persist_directory: str) -> None:
+    """Elimina el marcador cuando la reconstrucción forzada ha terminado."""
+    path = force_run_path(persist_directory)
+    if os.path.exists(path):
+        os.remove(path)
+
+class IngestionManifest:
+    """Estado persistente de los archivos ingeridos en una colección."""
+
+    def __init__(self, path: str, extractor_version: str, embedding_model: str):
+        """
+        Inicializa el manifiesto, cargándolo de disco si existe.
+
+        Args:
+            path: Ruta al archivo JSON del manifiesto
+            extractor_version: Versión actual del extractor del procesador
+            embedding_model: Modelo de embeddings usado para indexar
+        """
+        self.path = path
+        self.journal_path = f"{path}{JOURNAL_SUFFIX}"
+        self.extractor_version = extractor_version
+        self.embedding_model = embedding_model
+        self.files: Dict[str, Dict] = {}
+        self.compatible = False
+        # False mientras una ejecución no haya terminado (ingesta interrumpida)
+        self.complete = True
+        # Archivos recuperados del diario de una ejecución interrumpida
+        self.recovered = 0
+        # Id de la reconstrucción forzada que vació la colección por última vez
+        self.force_run: Optional[str] = None
+        self._pending_hashes: Dict[str, str] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.complete = data.get("complete", True)
+            self.force_run = data.get("force_run")
+            self.compatible = (
+                data.get("extractor_version") == extractor_version
+                and data.get("embedding_model") == embedding_model
+            )
+        self._replay_journal()
+
+    @classmethod
+    def for_collection(
+        cls,
+        persist_directory: str,
+        collection_name: str,
+        extractor_version: str,
+        embedding_model: str
+    ) -> "IngestionManifest":
+        """
+        Obtiene el manifiesto asociado a una colección.
+
+        Args:
+            persist_directory: Directorio de persistencia de ChromaDB
+            collection_name: Nombre de la colección
+            extractor_version: Versión actual del extractor
+            embedding_model: Modelo de embeddings actual
+
+        Returns:
+            IngestionManifest de la colección
+        """
+        path = os.path.join(persist_directory, MANIFEST_DIRNAME, f"{collection_name}.json")
+        return cls(path, extractor_version, embedding_model)
+
+    def _replay_journal(self) -> None:
+        """Aplica los lotes confirmados por una ejecución interrumpida."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir: su lote no llegó a confirmarse
+                    break
+                self.files[entry["name"]] = {"hash": entry["hash"], "ids": entry["ids"]}
+                self.recovered += 1
+        if self.recovered:
+            self.complete = False
+
+    @property
+    def interrupted(self) -> bool:
+        """Si la última ejecución terminó sin completar la ingesta."""
+        return not self.complete
+
+    def reset(self, force_run: Optional[str] = None) -> None:
+        """
+        Olvida todos los archivos registrados (reconstrucción completa).
+
+        Args:
+            force_run: Id de la reconstrucción forzada que vacía la colección
+        """
+        self.files = {}
+        self.force_run = force_run
+        self._pending_hashes = {}
+        self.compatible = True
+        self.complete = False
+
+    def diff(self, file_paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Compara los archivos actuales con los registrados.
+
+        Args:
+            file_paths: Rutas de los archivos fuente actuales
+
+        Returns:
+            Tupla de (rutas nuevas o modificadas, nombres de archivos eliminados)
+        """
+        changed = []
+        current = set()
+        for file_path in file_paths:
+            name = os.path.basename(file_path)
+            current.add(name)
+            digest = file_hash(file_path)
+            entry = self.files.get(name)
+            if entry is None or entry["hash"] != digest:
+                changed.append(file_path)
+                self._pending_hashes[name] = digest
+        removed = [name for name in self.files if name not in current]
+        return changed, removed
+
+    def stale_ids(self, changed: List[str], removed: List[str]) -> List[str]:
+        """
+        Ids de ChromaDB que deben eliminarse antes de reindexar.
+
+        Args:
+            changed: Rutas de archivos modificados
+            removed: Nombres de archivos eliminados
+
+        Returns:
+            Lista de ids a eliminar
+        """
+        names = [os.path.basename(p) for p in changed] + removed
+        return [doc_id for name in names for doc_id in self.files.get(name, {}).get("ids", [])]
+
+    def record(self, file_path: str, ids: List[str]) -> None:
+        """
+        Registra un archivo procesado y los ids que generó.
+
+        Args:
+            file_path: Ruta al archivo fuente
+            ids: Ids de los documentos escritos para el archivo
+        """
+        name = os.path.basename(file_path)
+        digest = self._pending_hashes.pop(name, None) or file_hash(file_path)
+        self.files[name] = {"hash": digest, "ids": ids}
+
+    def commit(self, committed: Iterable[Tuple[str, List[str]]]) -> None:
+        """
+        Registra archivos cuyos documentos ya están escritos y lo hace durable.
+
+        Se añade una línea por archivo al diario y se fuerza a disco, de modo
+        que una ejecución interrumpida no vuelve a procesarlos.
+
+        Args:
+            committed: Pares de (ruta del archivo, ids escritos)
+        """
+        lines = []
+        for file_path, ids in committed:
+            self.record(file_path, ids)
+            name = os.path.basename(file_path)
+            lines.append(json.dumps({"name": name, **self.files[name]}, ensure_ascii=False))
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def forget(self, names: List[str]) -> None:
+        """
+        Elimina del manifiesto archivos que ya no existen.
+
+        Args:
+            names: Nombres de archivo a eliminar
+        """
+        for name in names:
+            self.files.pop(name, None)
+
+    def save(self, complete: bool = True) -> None:
+        """
+        Escribe el manifiesto de forma atómica y vacía el diario.
+
+        Args:
+            complete: False al empezar una ejecución que modifica la colección,
+                para reconocerla como interrumpida si no llega a terminar
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.complete = complete
+        data = {
+            "extractor_version": self.extractor_version,
+            "embedding_model": self.embedding_model,
+            "complete": complete,
+            "force_run": self.force_run,
+            "files": self.files
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
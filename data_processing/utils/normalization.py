@@ -0,0 +1,154 @@
+"""
+Motor de normalización de texto.
+
+Reúne en un solo módulo las normalizaciones usadas en la ingesta:
+
+- fold_text: Unicode a ASCII sin acentos y espacios colapsados
+  (encoding_utils.clean_text).
+- collapse_whitespace: espacios colapsados sin tocar los caracteres
+  (text_utils.clean_text).
+- fold_case: minúsculas y sin acentos, para comparar términos de búsqueda
+  (categorías, décadas de noticias y tokens de BM25).
+- normalize_filename: nombres de archivo a identificadores
+  (encoding_utils.normalize_filename).
+
+Todas usan tablas de str.translate precompiladas y evitan la normalización
+Unicode cuando el texto ya es ASCII. Las variantes por lotes procesan muchas
+cadenas con una sola llamada a unicodedata.normalize.
+"""
+import unicodedata
+from typing import Iterable, List
+
+# Caracteres mal decodificados en los nombres de archivo y su reemplazo
+FILENAME_REPLACEMENTS = str.maketrans({
+    '‚': 'e',  # Para é
+    'ค': 'n',  # Para ñ
+    '¡': 'i',  # Para í
+    '¤': 'n',  # Para ñ
+    '｣': 'a',  # Para á
+    'ข': 'o',  # Para ó
+    '‡': 'u',  # Para ú
+})
+
+# Caracteres no deseados en los nombres de archivo
+FILENAME_CLEANUP = str.maketrans({' ': '_', ',': None, '(': None, ')': None})
+
+# Separador para normalizar varios textos en una sola llamada. NFKD no
+# compone ni reordena a través de él (clase combinatoria 0).
+BATCH_SEPARATOR = '\x00'
+
+def _fold_unicode(text: str) -> str:
+    """Descompone con NFKD y elimina todo lo que no es ASCII."""
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+def _fold_unicode_batch(texts: List[str]) -> List[str]:
+    """Aplica _fold_unicode a varios textos con una sola normalización."""
+    joined = BATCH_SEPARATOR.join(texts)
+    # Si algún texto contiene el separador no se puede dividir de vuelta
+    if joined.count(BATCH_SEPARATOR) != len(texts) - 1:
+        return [_fold_unicode(text) for text in texts]
+    return _fold_unicode(joined).split(BATCH_SEPARATOR)
+
+def collapse_whitespace(text: str) -> str:
+    """
+    Colapsa cualquier secuencia de espacios en blanco en un solo espacio.
+
+    Args:
+        text: Texto a limpiar
+
+    Returns:
+        Texto sin espacios al inicio ni al final y sin espacios repetidos
+    """
+    return ' '.join(text.split())
+
+def collapse_whitespace_batch(texts: Iterable[str]) -> List[str]:
+    """
+    Versión por lotes de collapse_whitespace.
+
+    Args:
+        texts: Textos a limpiar
+
+    Returns:
+        Lista de textos limpios en el mismo orden
+    """
+    return [' '.join(text.split()) for text in texts]
+
+def fold_text(text: str) -> str:
+    """
+    Convierte un texto a ASCII sin acentos y colapsa los espacios.
+
+    Args:
+        text: Texto a normalizar
+
+    Returns:
+        Texto normalizado
+    """
+    if not text.isascii():
+        text = _fold_unicode(text)
+    return ' '.join(text.split())
+
+def fold_texts(texts: Iterable[str]) -> List[str]:
+    """
+    Versión por lotes de fold_text.
+
+    Los textos que no son ASCII se normalizan juntos en una sola llamada.
+
+    Args:
+        texts: Textos a normalizar
+
+    Returns:
+        Lista de textos normalizados en el mismo orden
+    """
+    texts = list(texts)
+    pending = [i for i, text in enumerate(texts) if not text.isascii()]
+    if pending:
+        folded = _fold_unicode_batch([texts[i] for i in pending])
+        for i, text in zip(pending, folded):
+            texts[i] = text
+    return [' '.join(text.split()) for text in texts]
+
+def fold_case(text: str) -> str:
+    """
+    Pasa un texto a minúsculas y le quita los acentos.
+
+    A diferencia de fold_text conserva los caracteres no ASCII sin acento y
+    los espacios, de modo que las posiciones de las palabras no cambian.
+
+    Args:
+        text: Texto a normalizar
+
+    Returns:
+        Texto en minúsculas sin marcas diacríticas
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def normalize_filename(filename: str) -> str:
+    """
+    Normaliza un nombre de archivo, corrigiendo caracteres especiales.
+
+    Args:
+        filename: Nombre del archivo a normalizar
+
+    Returns:
+        str: Nombre del archivo normalizado
+    """
+    # Los reemplazos y NFKD solo afectan a caracteres no ASCII
+    if not filename.isascii():
+        filename = unicodedata.normalize('NFKD', filename.translate(FILENAME_REPLACEMENTS))
+    return filename.translate(FILENAME_CLEANUP)
+
+def normalize_filenames(filenames: Iterable[str]) -> List[str]:
+    """
+    Versión por lotes de normalize_filename.
+
+    Args:
+        filenames: Nombres de archivo a normalizar
+
+    Returns:
+        Lista de nombres normalizados en el mismo orden
+    """
+    return [normalize_filename(filename) for filename in filenames]
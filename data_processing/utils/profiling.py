@@ -0,0 +1,297 @@
+"""
+Perfilado por etapas de la ingesta (--profile en data_processing.main).
+
+Las funciones de extracción marcan sus etapas con stage() (bloques) o
+timed() (iteradores encadenados). El tiempo es exclusivo: al entrar en una
+etapa anidada se pausa la etapa exterior, de modo que la suma de las etapas
+de un archivo es su tiempo total. Sin un archivo en perfilado, stage() y
+timed() no miden nada.
+
+ProfiledTask envuelve la función por archivo (también en los procesos del
+pool) y devuelve sus tiempos junto al resultado; IngestionProfiler los agrega
+con las etapas del proceso principal (embeddings, escritura) y genera el
+informe.
+"""
+import json
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_FILES = 10
+_state = threading.local()
+_DISABLED = nullcontext()
+
+class _FileRecord:
+    """Tiempos y contadores del archivo en perfilado del hilo actual."""
+
+    __slots__ = ('stages', 'counters', 'stack')
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.stack: List["_Stage"] = []
+
+class _Stage:
+    """Bloque de una etapa con tiempo exclusivo."""
+
+    __slots__ = ('record', 'name', 'start')
+
+    def __init__(self, record: _FileRecord, name: str):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        now = time.perf_counter()
+        stack = self.record.stack
+        if stack:
+            # Pausar la etapa exterior
+            parent = stack[-1]
+            self.record.stages[parent.name] = self.record.stages.get(parent.name, 0.0) + now - parent.start
+        self.start = now
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        now = time.perf_counter()
+        stack = self.record.stack
+        stack.pop()
+        self.record.stages[self.name] = self.record.stages.get(self.name, 0.0) + now - self.start
+        if stack:
+            stack[-1].start = now
+        return False
+
+def stage(name: str):
+    """
+    Mide un bloque como la etapa name del archivo en perfilado.
+
+    Args:
+        name: Nombre de la etapa
+
+    Returns:
+        Gestor de contexto (sin efecto si no hay perfilado)
+    """
+    record = getattr(_state, 'record', None)
+    return _Stage(record, name) if record is not None else _DISABLED
+
+def timed(iterable: Iterable, name: str) -> Iterable:
+    """
+    Mide el tiempo de producir cada elemento de un iterador como la etapa name.
+
+    Args:
+        iterable: Iterador a medir
+        name: Nombre de la etapa
+
+    Returns:
+        El mismo iterable si no hay perfilado, o un iterador medido
+    """
+    record = getattr(_state, 'record', None)
+    if record is None:
+        return iterable
+    return _timed(iter(iterable), record, name)
+
+def _timed(iterator: Iterator, record: _FileRecord, name: str) -> Iterator:
+    while True:
+        with _Stage(record, name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def count(name: str, value: int) -> None:
+    """Suma value al contador name del archivo en perfilado (p. ej. chars)."""
+    record = getattr(_state, 'record', None)
+    if record is not None:
+        record.counters[name] = record.counters.get(name, 0) + value
+
+class ProfiledTask:
+    """Envuelve una función por archivo para devolver también sus tiempos."""
+
+    def __init__(self, func: Callable[[str], Any]):
+        """
+        Inicializa la tarea.
+
+        Args:
+            func: Función de módulo (serializable) que procesa un archivo
+        """
+        self.func = func
+
+    def __call__(self, file_path: str) -> Tuple[Any, Dict]:
+        """
+        Procesa un archivo midiendo sus etapas.
+
+        Args:
+            file_path: Ruta al archivo
+
+        Returns:
+            Tupla de (resultado de func, perfil del archivo)
+        """
+        record = _FileRecord()
+        _state.record = record
+        start = time.perf_counter()
+        try:
+            result = self.func(file_path)
+        finally:
+            _state.record = None
+        seconds = time.perf_counter() - start
+        # Tiempo fuera de las etapas marcadas: extracción de campos y metadatos
+        extract = seconds - sum(record.stages.values())
+        if extract > 0:
+            record.stages["extract"] = record.stages.get("extract", 0.0) + extract
+        return result, {
+            "path": file_path,
+            "seconds": seconds,
+            "stages": record.stages,
+            "counters": record.counters
+        }
+
+class SectionProfile:
+    """Tiempos de la ingesta de una colección."""
+
+    def __init__(self, name: str):
+        """
+        Inicializa la sección.
+
+        Args:
+            name: Nombre de la colección
+        """
+        self.name = name
+        self.files: List[Dict] = []
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_file(self, file_profile: Dict) -> None:
+        """Registra el perfil de un archivo devuelto por ProfiledTask."""
+        with self._lock:
+            self.files.append(file_profile)
+            for name, seconds in file_profile["stages"].items():
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+            for name, value in file_profile["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_stage(self, name: str, seconds: float, **counters: int) -> None:
+        """
+        Registra una etapa del proceso principal (p. ej. embed o write).
+
+        Args:
+            name: Nombre de la etapa
+            seconds: Tiempo de la etapa
+            **counters: Contadores a sumar (p. ej. vectors=256)
+        """
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            for counter, value in counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def report(self) -> Dict:
+        """Resumen de la sección: throughput, latencias y etapas."""
+        latencies = np.array([file_profile["seconds"] for file_profile in self.files])
+        wall = max(self.wall_seconds, 1e-9)
+        slowest = sorted(self.files, key=lambda file_profile: file_profile["seconds"], reverse=True)[:SLOWEST_FILES]
+        return {
+            "files": len(self.files),
+            "wall_seconds": self.wall_seconds,
+            "files_per_second": len(self.files) / wall,
+            "chars_per_second": self.counters.get("chars", 0) / wall,
+            "vectors_per_second": self.counters.get("vectors", 0) / wall,
+            "latency_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "stages": dict(sorted(self.stages.items(), key=lambda item: -item[1])),
+            "counters": self.counters,
+            "slowest_files": [
+                {
+                    "path": file_profile["path"],
+                    "seconds": file_profile["seconds"],
+                    "slowest_stage": max(file_profile["stages"], key=file_profile["stages"].get, default=None)
+                }
+                for file_profile in slowest
+            ]
+        }
+
+class IngestionProfiler:
+    """Agrega los perfiles de todas las colecciones de una ejecución."""
+
+    def __init__(self, **metadata: Any):
+        """
+        Inicializa el perfilador.
+
+        Args:
+            **metadata: Opciones de la ejecución a incluir en el informe
+        """
+        self.metadata = metadata
+        self.sections: Dict[str, SectionProfile] = {}
+
+    def section(self, name: str) -> SectionProfile:
+        """Obtiene (creándola si hace falta) la sección de una colección."""
+        if name not in self.sections:
+            self.sections[name] = SectionProfile(name)
+        return self.sections[name]
+
+    def report(self) -> Dict:
+        """Informe completo en un diccionario serializable a JSON."""
+        return {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": self.metadata,
+            "sections": {name: section.report() for name, section in self.sections.items()}
+        }
+
+    def print_report(self, report: Optional[Dict] = None) -> None:
+        """Imprime un resumen legible del informe."""
+        report = report or self.report()
+        for name, section in report["sections"].items():
+            print(f"\n=== {name} ===")
+            print(
+                f"{section['files']} archivos en {section['wall_seconds']:.1f}s: "
+                f"{section['files_per_second']:.1f} archivos/s, {section['chars_per_second']:,.0f} chars/s, "
+                f"{section['vectors_per_second']:.1f} vectores/s"
+            )
+            if section["latency_p50"] is not None:
+                print(f"Latencia por archivo: p50 {section['latency_p50'] * 1000:.1f}ms, p95 {section['latency_p95'] * 1000:.1f}ms")
+            total = sum(section["stages"].values()) or 1.0
+            print(f"{'etapa':<12} {'segundos':>10} {'%':>6}")
+            for stage_name, seconds in section["stages"].items():
+                print(f"{stage_name:<12} {seconds:>10.2f} {seconds / total:>6.1%}")
+            if section["slowest_files"]:
+                print("Archivos más lentos:")
+                for file_profile in section["slowest_files"]:
+                    print(f"  {file_profile['seconds'] * 1000:8.1f}ms  {file_profile['slowest_stage']:<10} {file_profile['path']}")
+
+    def save(self, path: str, report: Optional[Dict] = None) -> None:
+        """
+        Guarda el informe en JSON.
+
+        Args:
+            path: Ruta del archivo JSON
+            report: Informe ya calculado (se calcula si no se da)
+        """
+        report = report or self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Informe de perfilado guardado en {path}")
+
+def _git_commit() -> Optional[str]:
+    """Commit actual del repositorio, si está disponible."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
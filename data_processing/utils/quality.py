@@ -0,0 +1,235 @@
+"""
+Filtro de calidad para el texto OCR de las páginas escaneadas.
+
+Las líneas de las páginas son párrafos enteros en los que el texto legible
+se mezcla con basura OCR, así que se puntúan por tramos de SEGMENT_WORDS
+palabras. Los tramos de un lote de líneas se convierten en un arreglo de
+puntos de código y se cuentan, por tramo, letras, símbolos, símbolos
+repetidos y palabras de un carácter con np.add.reduceat. Los tramos sin
+contenido (separadores como "== ^z =====") se descartan, las rachas de
+símbolos repetidos se recortan y, ya formados los chunks, se descartan los
+que tienen muy pocas palabras de diccionario (cabeceras y suscripciones mal
+reconocidas) antes de calcular sus embeddings.
+"""
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from config.settings import Settings
+
+# Lote de líneas puntuadas a la vez y palabras por tramo puntuado
+LINE_BATCH_SIZE = 512
+SEGMENT_WORDS = 16
+# Racha mínima de un mismo símbolo que se recorta de una línea
+SYMBOL_RUN = re.compile(r'([^\w\s])\1{2,}')
+WORD_PATTERN = re.compile(r'[^\W\d_]{2,}')
+
+# Palabras funcionales frecuentes en español (y en inglés, para los avisos
+# postales y las páginas en inglés) con las que se estima si un chunk es texto
+COMMON_WORDS = frozenset("""
+a al algo algunos ante antes aquí así aun aunque bajo bien cada casi como con contra cual cuando
+de del desde donde dos durante e el ella ellas ellos en entre era eran es esa ese eso esta estaba
+estado estas este esto estos está están fue fueron gran ha haber había han hasta hay he hoy la las
+le les lo los mas más me mi muy mucho nada ni no nos nosotros nuestra nuestro nueva nuevo o otra
+otras otro otros para parte pero poco por porque primera primer pues que quien qué se sea según ser
+si sido sin sino sobre son su sus también tan tanto te tiene tienen todo todos toda todas tres tu
+un una uno unos unas usted ya y año años día días hace hacer puede pueden señor señora don doña
+gobierno país ciudad san juan puerto rico
+the of and to in is was for on that with by as at from be are this it an or which has have had
+not were but his their its will been
+""".split())
+
+# Clases de caracteres para los puntos de código latinos
+OTHER, LETTER, DIGIT, SPACE, SYMBOL = range(5)
+CHAR_CLASS_SIZE = 0x250
+
+def _build_char_classes() -> np.ndarray:
+    """Tabla de clase de cada punto de código latino."""
+    classes = np.full(CHAR_CLASS_SIZE, OTHER, dtype=np.uint8)
+    for code in range(CHAR_CLASS_SIZE):
+        char = chr(code)
+        if char.isalpha():
+            classes[code] = LETTER
+        elif char.isdigit():
+            classes[code] = DIGIT
+        elif char.isspace():
+            classes[code] = SPACE
+        elif char.isprintable():
+            classes[code] = SYMBOL
+    return classes
+
+CHAR_CLASSES = _build_char_classes()
+
+def score_segments(segments: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Calcula las proporciones de clases de caracteres de varios tramos de texto.
+
+    Args:
+        segments: Tramos no vacíos con las palabras separadas por un espacio
+
+    Returns:
+        Dict con arreglos (len(segments),) alpha (letras / caracteres no
+        espaciales), symbol (símbolos y caracteres no latinos / no
+        espaciales), repeated (símbolos iguales al anterior / no espaciales)
+        y short (palabras de un carácter / palabras); vacíos si no hay tramos
+    """
+    if not segments:
+        empty = np.empty(0, dtype=np.float64)
+        return {"alpha": empty, "symbol": empty, "repeated": empty, "short": empty}
+    # Separar los tramos con un espacio para que las palabras no se unan
+    codes = np.frombuffer(' '.join(segments).encode('utf-32-le'), dtype=np.uint32)
+    lengths = np.fromiter((len(segment) for segment in segments), dtype=np.int64, count=len(segments))
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+
+    classes = CHAR_CLASSES[np.minimum(codes, CHAR_CLASS_SIZE - 1)]
+    classes[codes >= CHAR_CLASS_SIZE] = OTHER
+    spaces = classes == SPACE
+    symbols = (classes == SYMBOL) | (classes == OTHER)
+    repeated = np.zeros_like(symbols)
+    repeated[1:] = symbols[1:] & (codes[1:] == codes[:-1])
+    # Palabras de un carácter: entre dos espacios (o los extremos)
+    bounded = np.ones(len(codes) + 2, dtype=bool)
+    bounded[1:-1] = spaces
+    short = ~spaces & bounded[:-2] & bounded[2:]
+
+    count = lambda mask: np.add.reduceat(mask.astype(np.int64), starts)
+    space_counts = count(spaces)
+    # El espacio separador final cuenta en todos los tramos menos el último
+    space_counts[:-1] -= 1
+    visible = np.maximum(lengths - space_counts, 1)
+    return {
+        "alpha": count(classes == LETTER) / visible,
+        "symbol": count(symbols) / visible,
+        "repeated": count(repeated) / visible,
+        "short": count(short) / (space_counts + 1)
+    }
+
+def dictionary_ratio(text: str) -> float:
+    """
+    Proporción de las palabras de un texto que son palabras frecuentes.
+
+    Args:
+        text: Texto a evaluar
+
+    Returns:
+        float: Proporción entre 0 y 1 (0 si no hay palabras)
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0.0
+    return sum(word in COMMON_WORDS for word in words) / len(words)
+
+class QualityFilter:
+    """Descarta o recorta las líneas y chunks de texto OCR de baja calidad."""
+
+    def __init__(
+        self,
+        min_alpha_ratio: float = Settings.NEWS_MIN_ALPHA_RATIO,
+        max_symbol_ratio: float = Settings.NEWS_MAX_SYMBOL_RATIO,
+        max_repeated_ratio: float = Settings.NEWS_MAX_REPEATED_RATIO,
+        max_short_ratio: float = Settings.NEWS_MAX_SHORT_WORD_RATIO,
+        min_line_chars: int = Settings.NEWS_MIN_LINE_CHARS,
+        min_dictionary_ratio: float = Settings.NEWS_MIN_DICTIONARY_RATIO
+    ):
+        """
+        Inicializa el filtro con sus umbrales.
+
+        Args:
+            min_alpha_ratio: Proporción mínima de letras de un tramo
+            max_symbol_ratio: Proporción máxima de símbolos de un tramo
+            max_repeated_ratio: Proporción máxima de símbolos repetidos de un tramo
+            max_short_ratio: Proporción máxima de palabras de un carácter de un tramo
+            min_line_chars: Longitud mínima de una línea tras recortarla
+            min_dictionary_ratio: Proporción mínima de palabras frecuentes de un chunk
+        """
+        self.min_alpha_ratio = min_alpha_ratio
+        self.max_symbol_ratio = max_symbol_ratio
+        self.max_repeated_ratio = max_repeated_ratio
+        self.max_short_ratio = max_short_ratio
+        self.min_line_chars = min_line_chars
+        self.min_dictionary_ratio = min_dictionary_ratio
+        self.stats = dict.fromkeys(
+            ("lines", "lines_dropped", "lines_trimmed", "chars", "chars_dropped", "chunks", "chunks_dropped"), 0
+        )
+
+    @property
+    def signature(self) -> str:
+        """Identifica los umbrales (cambiarlos invalida lo ya indexado)."""
+        return (
+            f"a{self.min_alpha_ratio}s{self.max_symbol_ratio}r{self.max_repeated_ratio}w{self.max_short_ratio}"
+            f"l{self.min_line_chars}d{self.min_dictionary_ratio}"
+        )
+
+    def filter_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Descarta los tramos de baja calidad de cada línea.
+
+        Args:
+            lines: Líneas limpias (las vacías se descartan)
+
+        Yields:
+            Líneas con al menos un tramo aceptado, sin los tramos descartados
+            ni las rachas de símbolos repetidos
+        """
+        lines = iter(lines)
+        while True:
+            batch = list(islice(lines, LINE_BATCH_SIZE))
+            if not batch:
+                return
+            # Dividir cada línea en tramos de SEGMENT_WORDS palabras
+            segments, owners = [], []
+            for index, line in enumerate(batch):
+                words = line.split()
+                for start in range(0, len(words), SEGMENT_WORDS):
+                    segments.append(' '.join(words[start:start + SEGMENT_WORDS]))
+                    owners.append(index)
+            scores = score_segments(segments)
+            keep = (
+                (scores["alpha"] >= self.min_alpha_ratio)
+                & (scores["symbol"] <= self.max_symbol_ratio)
+                & (scores["repeated"] <= self.max_repeated_ratio)
+                & (scores["short"] <= self.max_short_ratio)
+            )
+
+            kept: List[List[str]] = [[] for _ in batch]
+            for segment, owner, accepted in zip(segments, owners, keep):
+                if accepted:
+                    kept[owner].append(segment)
+            for line, line_segments in zip(batch, kept):
+                self.stats["lines"] += 1
+                self.stats["chars"] += len(line)
+                # Recortar rachas como "====" o "....." dentro de los tramos
+                filtered = ' '.join(SYMBOL_RUN.sub(' ', ' '.join(line_segments)).split())
+                self.stats["chars_dropped"] += len(line) - len(filtered)
+                if len(filtered) < self.min_line_chars:
+                    self.stats["lines_dropped"] += 1
+                    continue
+                if filtered != line:
+                    self.stats["lines_trimmed"] += 1
+                yield filtered
+
+    def filter_chunks(self, chunks: Iterable[str]) -> List[str]:
+        """
+        Descarta los chunks con pocas palabras de diccionario.
+
+        Args:
+            chunks: Chunks de texto
+
+        Returns:
+            Lista de chunks aceptados
+        """
+        accepted = []
+        for chunk in chunks:
+            self.stats["chunks"] += 1
+            if dictionary_ratio(chunk) >= self.min_dictionary_ratio:
+                accepted.append(chunk)
+            else:
+                self.stats["chunks_dropped"] += 1
+        return accepted
+
+    def take_stats(self) -> Dict[str, int]:
+        """Devuelve y reinicia los contadores."""
+        stats, self.stats = self.stats, dict.fromkeys(self.stats, 0)
+        return stats
@@ -1,25 +1,36 @@
 """
 Utilidades para procesamiento de texto.
 """
+import logging
 import re
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional
 from sentence_transformers import SentenceTransformer
 
-# Modelo para embeddings multilingüe
-MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
-model = None  # Lazy loading
+from backend.ai.embeddings import INDEX_MODEL, get_embedder, get_model
+from .normalization import collapse_whitespace
+
+logger = logging.getLogger(__name__)
+
+# Modelo para embeddings multilingüe (el mismo con el que se indexa)
+MODEL_NAME = INDEX_MODEL
+
+# Tokenizador del modelo de embeddings del índice, para medir chunks en tokens
+TOKENIZER_MODEL = INDEX_MODEL
+tokenizer = None  # Lazy loading
+
+# Fin de oración: espacio tras un signo de puntuación final
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+# Aproximación de tokens cuando no hay tokenizador disponible
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
 
 def get_embedding_model() -> SentenceTransformer:
     """
-    Obtiene el modelo de embeddings, cargándolo si es necesario.
+    Obtiene el modelo de embeddings compartido por el proceso.
     
     Returns:
         Modelo de SentenceTransformer
     """
-    global model
-    if model is None:
-        model = SentenceTransformer(MODEL_NAME)
-    return model
+    return get_model(MODEL_NAME)
 
 def clean_text(text: str) -> str:
     """
@@ -31,43 +42,169 @@ def clean_text(text: str) -> str:
     Returns:
         Texto limpio
     """
-    # Eliminar caracteres especiales y espacios extra
-    text = re.sub(r'[\n\r\t]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return collapse_whitespace(text)
 
-def split_into_chunks(text: str, max_length: int = 512) -> List[str]:
+def get_tokenizer():
     """
-    Divide un texto en chunks más pequeños respetando frases.
+    Obtiene el tokenizador del modelo de embeddings del índice, cargándolo si es necesario.
+    
+    Solo se carga el tokenizador (no el modelo), por lo que es barato en los
+    procesos del pool de ingesta.
+    
+    Returns:
+        Tokenizador de transformers o None si no está disponible
+    """
+    global tokenizer
+    if tokenizer is None:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_MODEL)
+        except Exception as e:
+            logger.warning(
+                f"No se pudo cargar el tokenizador de {TOKENIZER_MODEL} ({str(e)}); "
+                f"los chunks se medirán con una aproximación por palabras"
+            )
+            tokenizer = False
+    return tokenizer or None
+
+def tokenizer_signature() -> str:
+    """
+    Identifica cómo mide count_tokens los chunks.
+
+    Forma parte de la versión del extractor de noticias: si el tokenizador
+    deja de estar disponible (o vuelve), los chunks cambian y la colección
+    se reconstruye en lugar de mezclar ambos cortes.
+
+    Returns:
+        str: Nombre del modelo del tokenizador o "regex" para la aproximación
+    """
+    return TOKENIZER_MODEL.rsplit('/', 1)[-1] if get_tokenizer() is not None else "regex"
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta los tokens de un texto con el tokenizador del modelo de embeddings.
+    
+    Si el tokenizador no está disponible se aproxima contando palabras y
+    signos de puntuación.
     
     Args:
-        text: Texto a dividir
-        max_length: Longitud máxima de cada chunk
+        text: Texto a medir
         
     Returns:
-        Lista de chunks de texto
+        Número de tokens (sin los tokens especiales que añade el modelo)
+    """
+    tok = get_tokenizer()
+    if tok is None:
+        return len(TOKEN_PATTERN.findall(text))
+    return len(tok.encode(text, add_special_tokens=False))
+
+def iter_sentences(pieces: Iterable[str], max_sentence_chars: int = 2000) -> Iterator[str]:
+    """
+    Divide en oraciones un texto que llega por partes (p. ej. línea a línea).
+    
+    Las partes se unen con un espacio. Una oración sin puntuación final más
+    larga que max_sentence_chars se entrega tal cual para no acumular texto.
+    
+    Args:
+        pieces: Partes del texto en orden
+        max_sentence_chars: Longitud máxima de una oración pendiente
+        
+    Yields:
+        Oraciones
+    """
+    pending = ''
+    for piece in pieces:
+        text = f"{pending} {piece}" if pending else piece
+        sentences = SENTENCE_BOUNDARY.split(text)
+        pending = sentences.pop()
+        yield from sentences
+        if len(pending) > max_sentence_chars:
+            yield pending
+            pending = ''
+    if pending:
+        yield pending
+
+def iter_chunks(
+    sentences: Iterable[str],
+    max_length: int = 512,
+    overlap: int = 0,
+    length_function: Callable[[str], int] = len
+) -> Iterator[str]:
+    """
+    Agrupa oraciones en chunks de como máximo max_length, con solapamiento.
+    
+    Las oraciones más largas que max_length se dividen por palabras. Cada
+    chunk nuevo empieza con las últimas oraciones del anterior cuya longitud
+    total no supera overlap.
+    
+    Args:
+        sentences: Oraciones en orden
+        max_length: Longitud máxima de cada chunk
+        overlap: Longitud máxima del solapamiento entre chunks consecutivos
+        length_function: Función que mide la longitud (caracteres o tokens)
+        
+    Yields:
+        Chunks de texto
     """
-    # Dividir por oraciones
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
     current_chunk = []
+    current_lengths = []
     current_length = 0
+    has_new = False
     
     for sentence in sentences:
-        sentence_length = len(sentence)
-        if current_length + sentence_length <= max_length:
-            current_chunk.append(sentence)
-            current_length += sentence_length
+        sentence_length = length_function(sentence)
+        if sentence_length > max_length:
+            # Dividir la oración por palabras
+            units = [(word, length_function(word)) for word in sentence.split()]
         else:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-            current_chunk = [sentence]
-            current_length = sentence_length
+            units = [(sentence, sentence_length)]
+        
+        for unit, unit_length in units:
+            if current_chunk and current_length + unit_length > max_length:
+                if has_new:
+                    yield ' '.join(current_chunk)
+                # Conservar el final del chunk como solapamiento
+                kept = 0
+                keep_length = 0
+                for length in reversed(current_lengths):
+                    if keep_length + length > overlap or keep_length + length + unit_length > max_length:
+                        break
+                    keep_length += length
+                    kept += 1
+                current_chunk = current_chunk[len(current_chunk) - kept:]
+                current_lengths = current_lengths[len(current_lengths) - kept:]
+                current_length = keep_length
+                has_new = False
+            current_chunk.append(unit)
+            current_lengths.append(unit_length)
+            current_length += unit_length
+            has_new = True
     
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    if current_chunk and has_new:
+        yield ' '.join(current_chunk)
+
+def split_into_chunks(
+    text: str,
+    max_length: int = 512,
+    overlap: int = 0,
+    length_function: Callable[[str], int] = len
+) -> List[str]:
+    """
+    Divide un texto en chunks más pequeños respetando frases.
     
-    return chunks
+    Args:
+        text: Texto a dividir
+        max_length: Longitud máxima de cada chunk
+        overlap: Longitud máxima del solapamiento entre chunks consecutivos
+        length_function: Función que mide la longitud (len para caracteres,
+            count_tokens para tokens del modelo)
+        
+    Returns:
+        Lista de chunks de texto
+    """
+    # Dividir por oraciones
+    sentences = SENTENCE_BOUNDARY.split(text)
+    return list(iter_chunks(sentences, max_length, overlap, length_function))
 
 def create_embeddings(texts: List[str]) -> List[List[float]]:
     """
@@ -79,8 +216,8 @@ def create_embeddings(texts: List[str]) -> List[List[float]]:
     Returns:
         Lista de embeddings (vectores)
     """
-    model = get_embedding_model()
-    return model.encode(texts).tolist()
+    # Solo se calculan (y se carga el modelo) los textos que no están en caché
+    return get_embedder(MODEL_NAME)(texts)
 
 def extract_dates(text: str) -> List[str]:
     """
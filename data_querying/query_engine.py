@@ -1,38 +1,111 @@
 """
-Motor de consultas para landmarks y municipios.
+Motor de consultas para landmarks, municipios y noticias históricas.
 """
 import chromadb
-from chromadb.utils import embedding_functions
 from typing import Dict, List, Optional, Union
 import logging
 
+import numpy as np
+
+from backend.ai.embeddings import INDEX_MODEL, get_collection, get_embedder
+from backend.database.bm25 import HybridSearcher
+from backend.database.catalog import PlaceCatalog, split_categories
+from backend.database.categories import CategoryIndex
+from backend.database.news_shards import NewsShardRouter
+from backend.database.spatial import SpatialIndex
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class QueryEngine:
     """Motor de consultas para interactuar con la base de datos de landmarks y municipios."""
     
-    def __init__(self, persist_directory: str = "chroma_db"):
+    def __init__(self, persist_directory: str = "chroma_db", hybrid: bool = True):
         """
         Inicializa el motor de consultas.
         
         Args:
             persist_directory: Directorio donde se encuentra la base de datos ChromaDB
+            hybrid: Combinar la búsqueda por embeddings de landmarks y municipios
+                con índices BM25 en memoria (nombres exactos y topónimos raros)
         """
         self.client = chromadb.PersistentClient(path=persist_directory)
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+        self.embedding_function = get_embedder(INDEX_MODEL)
+        
+        # Obtener las colecciones (falla si se indexaron con otro modelo)
+        self.landmarks = get_collection(self.client, "landmarks", INDEX_MODEL, persist_directory=persist_directory)
+        self.municipalities = get_collection(self.client, "municipalities", INDEX_MODEL, persist_directory=persist_directory)
+        
+        # Catálogos columnares (memoria mapeada) con coordenadas y categorías tipadas
+        self.landmark_catalog = PlaceCatalog.open(persist_directory, "landmarks")
+        self.municipality_catalog = PlaceCatalog.open(persist_directory, "municipalities")
+        if self.landmark_catalog is None or self.municipality_catalog is None:
+            logger.warning("Falta el catálogo de lugares; se usarán los metadatos de ChromaDB")
+        
+        # Índices espaciales para las búsquedas por proximidad
+        self.landmark_index = self._build_spatial_index(self.landmarks, self.landmark_catalog)
+        self.municipality_index = self._build_spatial_index(self.municipalities, self.municipality_catalog)
+        
+        # Índice invertido de categorías para las recomendaciones
+        self.landmark_categories = (
+            CategoryIndex.from_catalog(self.landmark_catalog) if self.landmark_catalog is not None
+            else CategoryIndex.from_collection(self.landmarks)
         )
         
-        # Obtener las colecciones
-        self.landmarks = self.client.get_collection(
-            name="landmarks",
-            embedding_function=self.embedding_function
+        # Índices BM25 de nombres y descripciones para la búsqueda híbrida
+        self.landmark_search = (
+            HybridSearcher.from_collection(self.landmarks, name_field="name", persist_directory=persist_directory)
+            if hybrid else None
         )
-        self.municipalities = self.client.get_collection(
-            name="municipalities",
-            embedding_function=self.embedding_function
+        self.municipality_search = (
+            HybridSearcher.from_collection(self.municipalities, name_field="name", persist_directory=persist_directory)
+            if hybrid else None
         )
+        
+        # Noticias particionadas por década
+        self.news = NewsShardRouter(self.client, persist_directory, INDEX_MODEL)
+    
+    def _build_spatial_index(self, collection, catalog: Optional[PlaceCatalog]) -> SpatialIndex:
+        """Índice espacial de una colección, desde el catálogo si existe."""
+        if catalog is not None:
+            return SpatialIndex.from_catalog(catalog)
+        return SpatialIndex.from_collection(collection)
+    
+    def _format_places(self, results: Dict, catalog: Optional[PlaceCatalog]) -> List[Dict]:
+        """
+        Convierte el resultado de una consulta de ChromaDB en lugares.
+        
+        Las coordenadas y categorías se leen del catálogo cuando el lugar está
+        en él; si no, se interpretan desde los metadatos.
+        
+        Args:
+            results: Resultado de collection.query
+            catalog: Catálogo de la colección (o None)
+            
+        Returns:
+            Lista de lugares con sus metadatos
+        """
+        places = []
+        for place_id, metadata, document in zip(results['ids'][0], results['metadatas'][0], results['documents'][0]):
+            row = catalog.row(place_id) if catalog is not None else None
+            if row is not None:
+                latitude, longitude = catalog.coordinates(row)
+                categories = catalog.categories(row)
+            else:
+                latitude = float(metadata['latitude']) if metadata['latitude'] else None
+                longitude = float(metadata['longitude']) if metadata['longitude'] else None
+                categories = split_categories(metadata['categories'])
+            places.append({
+                'id': place_id,
+                'name': metadata['name'],
+                'description': document,
+                'categories': categories,
+                'coordinates': {
+                    'latitude': latitude,
+                    'longitude': longitude
+                }
+            })
+        return places
     
     def search_landmarks(
         self,
@@ -52,26 +125,15 @@ class QueryEngine:
             Lista de landmarks encontrados con sus metadatos
         """
         try:
-            results = self.landmarks.query(
-                query_texts=[query],
-                n_results=n_results
-            )
-            
-            # Procesar resultados
-            landmarks = []
-            for i in range(len(results['ids'][0])):
-                landmarks.append({
-                    'id': results['ids'][0][i],
-                    'name': results['metadatas'][0][i]['name'],
-                    'description': results['documents'][0][i],
-                    'categories': results['metadatas'][0][i]['categories'].split(', '),
-                    'coordinates': {
-                        'latitude': float(results['metadatas'][0][i]['latitude']) if results['metadatas'][0][i]['latitude'] else None,
-                        'longitude': float(results['metadatas'][0][i]['longitude']) if results['metadatas'][0][i]['longitude'] else None
-                    }
-                })
+            if self.landmark_search is not None:
+                results = self.landmark_search.search(query, n_results=n_results)
+            else:
+                results = self.landmarks.query(
+                    query_texts=[query],
+                    n_results=n_results
+                )
             
-            return landmarks
+            return self._format_places(results, self.landmark_catalog)
             
         except Exception as e:
             logger.error(f"Error buscando landmarks: {str(e)}")
@@ -95,31 +157,61 @@ class QueryEngine:
             Lista de municipios encontrados con sus metadatos
         """
         try:
-            results = self.municipalities.query(
-                query_texts=[query],
-                n_results=n_results
-            )
-            
-            # Procesar resultados
-            municipalities = []
-            for i in range(len(results['ids'][0])):
-                municipalities.append({
-                    'id': results['ids'][0][i],
-                    'name': results['metadatas'][0][i]['name'],
-                    'description': results['documents'][0][i],
-                    'categories': results['metadatas'][0][i]['categories'].split(', '),
-                    'coordinates': {
-                        'latitude': float(results['metadatas'][0][i]['latitude']) if results['metadatas'][0][i]['latitude'] else None,
-                        'longitude': float(results['metadatas'][0][i]['longitude']) if results['metadatas'][0][i]['longitude'] else None
-                    }
-                })
+            if self.municipality_search is not None:
+                results = self.municipality_search.search(query, n_results=n_results)
+            else:
+                results = self.municipalities.query(
+                    query_texts=[query],
+                    n_results=n_results
+                )
             
-            return municipalities
+            return self._format_places(results, self.municipality_catalog)
             
         except Exception as e:
             logger.error(f"Error buscando municipios: {str(e)}")
             return []
     
+    def search_news(
+        self,
+        query: str,
+        n_results: int = 5,
+        decades: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Busca fragmentos de noticias históricas.
+        
+        Si la consulta menciona un año, una década o una época solo se buscan
+        las décadas correspondientes; si no, todas en paralelo.
+        
+        Args:
+            query: Texto de búsqueda
+            n_results: Número máximo de resultados
+            decades: Limitar la búsqueda a estas décadas (p. ej. ["1940s"])
+            
+        Returns:
+            Lista de fragmentos ordenados por distancia, con su fecha y título
+        """
+        try:
+            results = self.news.search(query, n_results=n_results, decades=decades)
+            return [
+                {
+                    'id': doc_id,
+                    'title': metadata.get('title'),
+                    'date': metadata.get('date'),
+                    'decade': metadata.get('decade'),
+                    'page': metadata.get('page'),
+                    'text': document,
+                    'distance': distance
+                }
+                for doc_id, document, metadata, distance in zip(
+                    results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+                )
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error buscando noticias: {str(e)}")
+            return []
+    
     def get_nearby_landmarks(
         self,
         latitude: float,
@@ -139,23 +231,125 @@ class QueryEngine:
         Returns:
             Lista de landmarks cercanos ordenados por distancia
         """
-        # TODO: Implementar búsqueda por proximidad usando las coordenadas
-        pass
+        return self._nearby_places(
+            self.landmark_index, self.landmarks, self.landmark_catalog, latitude, longitude, radius_km, max_results
+        )
+    
+    def get_nearby_municipalities(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 10.0,
+        max_results: int = 5
+    ) -> List[Dict]:
+        """
+        Encuentra municipios cercanos a unas coordenadas dadas.
+        
+        Args:
+            latitude: Latitud del punto central
+            longitude: Longitud del punto central
+            radius_km: Radio de búsqueda en kilómetros
+            max_results: Número máximo de resultados
+            
+        Returns:
+            Lista de municipios cercanos ordenados por distancia
+        """
+        return self._nearby_places(
+            self.municipality_index, self.municipalities, self.municipality_catalog,
+            latitude, longitude, radius_km, max_results
+        )
+    
+    def _nearby_places(
+        self,
+        index: SpatialIndex,
+        collection,
+        catalog: Optional[PlaceCatalog],
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        max_results: int
+    ) -> List[Dict]:
+        """
+        Lugares del índice espacial a menos de radius_km, con sus documentos.
+        
+        Returns:
+            Lista de lugares ordenados por distancia, con distance_km
+        """
+        try:
+            positions, distances = index.nearest(latitude, longitude, max_results, max_distance_km=radius_km)
+            if not len(positions):
+                return []
+            places = self._get_places(collection, catalog, [index.ids[position] for position in positions])
+            distance_of = dict(zip((index.ids[position] for position in positions), distances.tolist()))
+            for place in places:
+                place['distance_km'] = distance_of[place['id']]
+            return places
+            
+        except Exception as e:
+            logger.error(f"Error buscando lugares cercanos: {str(e)}")
+            return []
+    
+    def _get_places(self, collection, catalog: Optional[PlaceCatalog], ids: List[str]) -> List[Dict]:
+        """
+        Lee de ChromaDB los lugares con estos ids, en el mismo orden.
+        
+        Returns:
+            Lista de lugares con sus metadatos (se omiten los ids que no están)
+        """
+        results = collection.get(ids=ids, include=['metadatas', 'documents'])
+        found = {
+            place_id: (metadata, document)
+            for place_id, metadata, document in zip(results['ids'], results['metadatas'], results['documents'])
+        }
+        ids = [place_id for place_id in ids if place_id in found]
+        return self._format_places(
+            {
+                'ids': [ids],
+                'metadatas': [[found[place_id][0] for place_id in ids]],
+                'documents': [[found[place_id][1] for place_id in ids]]
+            },
+            catalog
+        )
     
     def get_recommendations(
         self,
         categories: List[str],
-        n_results: int = 5
+        n_results: int = 5,
+        mode: str = "any",
+        weights: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         Obtiene recomendaciones de landmarks basadas en categorías.
         
+        Cada categoría de interés puede ser el nombre exacto de una categoría
+        de la Wikipedia en inglés o un término en inglés ("museum", "churches
+        in Puerto Rico"); los landmarks se ordenan por la suma de los pesos de
+        las categorías de interés que tienen. La selección se hace en el índice invertido en
+        memoria; ChromaDB solo se consulta para leer los n_results elegidos.
+        
         Args:
             categories: Lista de categorías de interés
             n_results: Número de recomendaciones
+            mode: "any" si basta con una de las categorías, "all" si deben
+                tener todas
+            weights: Peso de cada categoría de interés (1.0 si se omite)
             
         Returns:
-            Lista de landmarks recomendados
+            Lista de landmarks recomendados, con score y matched_categories
         """
-        # TODO: Implementar sistema de recomendaciones basado en categorías
-        pass 
\ No newline at end of file
+        try:
+            rows, scores, matched = self.landmark_categories.recommend(categories, n_results, mode, weights)
+            if not len(rows):
+                return []
+            index = self.landmark_categories
+            wanted = np.concatenate(matched)
+            places = self._get_places(self.landmarks, self.landmark_catalog, [index.ids[row] for row in rows])
+            found = {index.ids[row]: (row, score) for row, score in zip(rows.tolist(), scores.tolist())}
+            for place in places:
+                row, place['score'] = found[place['id']]
+                place['matched_categories'] = index.matching_categories(row, wanted)
+            return places
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo recomendaciones: {str(e)}")
+            return []
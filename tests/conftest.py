@@ -0,0 +1,95 @@
+"""
+Fixtures compartidas de los tests.
+
+Los tests no descargan modelos: FAKE_MODEL se registra en el registro de
+modelos de backend.ai.embeddings con un encoder determinista (bolsa de
+palabras con hashing), así que la ingesta y las búsquedas funcionan igual
+que con un SentenceTransformer.
+"""
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from backend.ai.embeddings import registry
+from backend.ai.embeddings.cache import model_key
+from data_processing.processors.base_processor import BaseProcessor
+
+FAKE_MODEL = "tests/hashing-encoder"
+
+class HashingEncoder:
+    """Encoder sin modelo: cada palabra suma 1 en la dimensión de su hash."""
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.encoded: List[str] = []
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        texts = list(texts)
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode('utf-8')) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+def read_text(file_path: str) -> str:
+    """Función de procesamiento de TextProcessor: el texto del archivo."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+class TextProcessor(BaseProcessor):
+    """Procesador mínimo: un documento por archivo .txt."""
+
+    EMBEDDING_MODEL = FAKE_MODEL
+
+    def build_record(self, file_path: str, text: str) -> Dict:
+        name = Path(file_path).stem
+        return {"id": f"doc_{name}", "document": text, "metadata": {"name": name}}
+
+    def sync(self, collection_name: str, data_dir: str, force_reprocess: bool = False) -> int:
+        return self.sync_collection(collection_name, data_dir, read_text, force_reprocess=force_reprocess)
+
+@pytest.fixture
+def fake_encoder(monkeypatch) -> HashingEncoder:
+    """Registra FAKE_MODEL en el registro de modelos durante el test."""
+    encoder = HashingEncoder()
+    for backend in registry.BACKENDS:
+        monkeypatch.setitem(registry._models, (model_key(FAKE_MODEL), backend), encoder)
+    return encoder
+
+@pytest.fixture
+def write_files(tmp_path):
+    """Escribe archivos de texto en un directorio del test."""
+    def write(files: Dict[str, str], directory: str = "data") -> str:
+        path = tmp_path / directory
+        path.mkdir(exist_ok=True)
+        for name, text in files.items():
+            (path / name).write_text(text, encoding='utf-8')
+        return str(path)
+    return write
+
+@pytest.fixture
+def make_processor(tmp_path, fake_encoder):
+    """Crea TextProcessor sobre un ChromaDB del test."""
+    def make(**kwargs) -> TextProcessor:
+        kwargs.setdefault("persist_directory", str(tmp_path / "db"))
+        return TextProcessor(**kwargs)
+    return make
+
+def collection_documents(processor: BaseProcessor, collection_name: str) -> Dict[str, str]:
+    """Documentos de una colección por id."""
+    stored = processor.client.get_collection(collection_name).get(include=["documents"])
+    return dict(zip(stored["ids"], stored["documents"]))
+
+@pytest.fixture
+def documents_of():
+    return collection_documents
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    # Los directorios por defecto (chroma_db/...) quedan dentro del test
+    monkeypatch.chdir(tmp_path)
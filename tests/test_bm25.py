@@ -0,0 +1,121 @@
+"""Búsqueda híbrida BM25 + densa con RRF y reconstrucción del índice BM25."""
+from typing import Dict, List, Optional
+
+import pytest
+
+from backend.database.bm25 import RRF_K, BM25Index, HybridSearcher, lexical_index_path, reciprocal_rank_fusion
+from backend.database.index_version import IndexVersion, bump_index_version
+
+class FakeCollection:
+    """Colección con una búsqueda densa fija: el orden de inserción de los documentos."""
+
+    name = "landmarks"
+
+    def __init__(self, documents: Dict[str, str]):
+        self.documents = dict(documents)
+
+    def add(self, doc_id: str, document: str) -> None:
+        self.documents[doc_id] = document
+
+    def get(self, include, limit: int, offset: int) -> Dict[str, List]:
+        ids = list(self.documents)[offset:offset + limit]
+        return {
+            "ids": ids,
+            "documents": [self.documents[doc_id] for doc_id in ids],
+            "metadatas": [{"name": doc_id} for doc_id in ids]
+        }
+
+    def query(self, query_texts, n_results: int, include, ids: Optional[List[str]] = None) -> Dict[str, List]:
+        ranking = [doc_id for doc_id in self.documents if ids is None or doc_id in ids][:n_results]
+        fields = {
+            "documents": [self.documents[doc_id] for doc_id in ranking],
+            "metadatas": [{"name": doc_id} for doc_id in ranking],
+            # Distancia según la posición en el orden denso completo
+            "distances": [float(list(self.documents).index(doc_id)) for doc_id in ranking]
+        }
+        return {"ids": [ranking], **{field: [fields[field]] for field in include}}
+
+def filler(count: int) -> Dict[str, str]:
+    return {f"doc_{i:02d}": f"playa arena sol numero {i}" for i in range(count)}
+
+def test_search_fuses_dense_and_bm25_rankings():
+    documents = filler(30)
+    # Solo BM25 lo encuentra entre los candidatos: queda fuera de los 20 densos
+    documents["doc_25"] = "castillo san felipe del morro"
+    collection = FakeCollection(documents)
+    searcher = HybridSearcher(collection, BM25Index.from_collection(collection))
+
+    results = searcher.search("morro", n_results=5)
+
+    dense = list(documents)[:20]
+    expected = reciprocal_rank_fusion([dense, ["doc_25"]], k=RRF_K)[:5]
+    assert results["ids"][0] == [doc_id for doc_id, _ in expected]
+    assert results["scores"][0] == pytest.approx([score for _, score in expected])
+    position = results["ids"][0].index("doc_25")
+    assert results["documents"][0][position] == "castillo san felipe del morro"
+    assert results["distances"][0][position] == 25.0
+
+def test_bm25_rebuilds_after_index_version_bump(tmp_path):
+    persist_directory = str(tmp_path / "db")
+    bump_index_version(persist_directory, "landmarks")
+    collection = FakeCollection(filler(3))
+    searcher = HybridSearcher.from_collection(collection, name_field="name", persist_directory=persist_directory)
+    collection.add("doc_yunque", "bosque nacional el yunque")
+
+    searcher.search("yunque", n_results=2)
+    assert len(searcher.lexical) == 3
+    assert searcher.lexical.search_ids("yunque") == []
+
+    bump_index_version(persist_directory, "landmarks")
+    results = searcher.search("yunque", n_results=2)
+    assert len(searcher.lexical) == 4
+    assert searcher.lexical.search_ids("yunque") == ["doc_yunque"]
+    assert "doc_yunque" in results["ids"][0]
+
+def test_saved_index_opens_with_the_same_results(tmp_path):
+    collection = FakeCollection({**filler(10), "doc_morro": "castillo san felipe del morro"})
+    lexical = BM25Index.from_collection(collection)
+    path = lexical_index_path(str(tmp_path), collection.name)
+    lexical.save(path, extra={"collection_version": "v1"})
+
+    opened = BM25Index.open(path, collection_version="v1")
+
+    assert BM25Index.open(path, collection_version="v2") is None
+    assert opened.ids == lexical.ids
+    for query in ("morro", "playa numero 3", "castillo del sol"):
+        rows, scores = opened.search(query, 5)
+        expected_rows, expected_scores = lexical.search(query, 5)
+        assert rows.tolist() == expected_rows.tolist()
+        assert scores.tolist() == pytest.approx(expected_scores.tolist())
+
+def test_searcher_opens_the_saved_index_of_the_current_version(tmp_path, monkeypatch):
+    persist_directory = str(tmp_path / "db")
+    version = bump_index_version(persist_directory, "landmarks")
+    collection = FakeCollection(filler(3))
+    BM25Index.from_collection(collection, "name").save(
+        lexical_index_path(persist_directory, collection.name),
+        extra={"name_field": "name", "collection_version": version}
+    )
+    pages = []
+    get = collection.get
+    monkeypatch.setattr(collection, "get", lambda **kwargs: pages.append(kwargs) or get(**kwargs))
+
+    searcher = HybridSearcher.from_collection(collection, name_field="name", persist_directory=persist_directory)
+    assert len(searcher.lexical) == 3 and pages == []
+
+    # Versión nueva sin índice guardado: se construye leyendo la colección
+    collection.add("doc_yunque", "bosque nacional el yunque")
+    bump_index_version(persist_directory, "landmarks")
+    searcher.search("yunque", n_results=2)
+    assert len(searcher.lexical) == 4 and pages
+
+def test_ingestion_saves_the_bm25_index(make_processor, write_files, tmp_path):
+    data_dir = write_files({"a.txt": "castillo del morro", "b.txt": "playa de luquillo"})
+    processor = make_processor()
+    processor.EXPORT_LEXICAL_INDEX = True
+    processor.sync("docs", data_dir)
+    persist_directory = str(tmp_path / "db")
+
+    version = IndexVersion(persist_directory).collection("docs")
+    lexical = BM25Index.open(lexical_index_path(persist_directory, "docs"), collection_version=version)
+    assert version is not None and lexical.search_ids("luquillo") == ["doc_b"]
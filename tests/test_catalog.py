@@ -0,0 +1,86 @@
+"""Exportación del catálogo columnar de lugares y su apertura con memoria mapeada."""
+from typing import Dict, List
+
+import numpy as np
+
+from backend.database.catalog import CATEGORY_SEPARATOR, PlaceCatalog, build_catalog, catalog_path
+
+class FakePlaces:
+    """Colección de lugares con metadatos y embeddings, leída por páginas."""
+
+    name = "landmarks"
+    metadata = None
+
+    def __init__(self, places: Dict[str, Dict]):
+        self.places = places
+
+    def get(self, include, limit: int, offset: int) -> Dict[str, List]:
+        ids = list(self.places)[offset:offset + limit]
+        return {
+            "ids": ids,
+            "metadatas": [self.places[place_id]["metadata"] for place_id in ids],
+            "embeddings": [self.places[place_id]["embedding"] for place_id in ids]
+        }
+
+PLACES = {
+    "landmark_morro": {
+        "metadata": {
+            "name": "Castillo San Felipe del Morro", "latitude": 18.4708, "longitude": -66.1236,
+            "categories": CATEGORY_SEPARATOR.join(["Forts in Puerto Rico", "Museums in San Juan, Puerto Rico"])
+        },
+        "embedding": [1.0, 0.0, 0.0]
+    },
+    "landmark_yunque": {
+        "metadata": {"name": "El Yunque", "latitude": "", "longitude": "", "categories": ""},
+        "embedding": [0.0, 1.0, 0.0]
+    },
+    "landmark_cristobal": {
+        "metadata": {
+            "name": "Castillo San Cristóbal", "latitude": 18.4674, "longitude": -66.1110,
+            "categories": "Forts in Puerto Rico"
+        },
+        "embedding": [0.0, 0.0, 1.0]
+    }
+}
+
+def test_catalog_round_trip(tmp_path):
+    collection = FakePlaces(PLACES)
+    path = catalog_path(str(tmp_path), collection.name)
+
+    assert build_catalog(collection, path, extra={"extractor_version": "2"}) == 3
+    catalog = PlaceCatalog.open(str(tmp_path), collection.name)
+
+    assert len(catalog) == 3 and catalog.header["extractor_version"] == "2"
+    assert isinstance(catalog.embeddings, np.memmap)
+    # Filas ordenadas por id
+    assert [value.decode('utf-8') for value in catalog.ids] == sorted(PLACES)
+    for place_id, place in PLACES.items():
+        row = catalog.row(place_id)
+        metadata = place["metadata"]
+        assert catalog.name(row) == metadata["name"]
+        assert catalog.categories(row) == (metadata["categories"].split(CATEGORY_SEPARATOR) if metadata["categories"] else [])
+        np.testing.assert_array_equal(catalog.embedding(row), np.array(place["embedding"], dtype=np.float32))
+    assert catalog.coordinates(catalog.row("landmark_morro")) == (18.4708, -66.1236)
+    assert catalog.coordinates(catalog.row("landmark_yunque")) == (None, None)
+    assert catalog.row("landmark_desconocido") is None
+    assert catalog.category_names.count("Forts in Puerto Rico") == 1
+
+def test_missing_catalog_opens_as_none(tmp_path):
+    assert PlaceCatalog.open(str(tmp_path), "landmarks") is None
+
+def test_ingestion_exports_the_stored_vectors(make_processor, write_files, tmp_path):
+    data_dir = write_files({"a.txt": "castillo del morro", "b.txt": "playa de luquillo"})
+    processor = make_processor()
+    processor.EXPORT_CATALOG = True
+    processor.sync("docs", data_dir)
+
+    catalog = PlaceCatalog.open(str(tmp_path / "db"), "docs")
+    stored = processor.client.get_collection("docs").get(ids=["doc_b"], include=["embeddings"])
+    row = catalog.row("doc_b")
+    assert len(catalog) == 2 and catalog.name(row) == "b"
+    np.testing.assert_allclose(catalog.embedding(row), stored["embeddings"][0], rtol=1e-6)
+
+    # Un cambio en los archivos vuelve a exportar el catálogo
+    write_files({"c.txt": "bosque el yunque"})
+    processor.sync("docs", data_dir)
+    assert len(PlaceCatalog.open(str(tmp_path / "db"), "docs")) == 3
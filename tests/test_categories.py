@@ -0,0 +1,43 @@
+"""Resolución de términos a categorías y recomendaciones por categorías."""
+import pytest
+
+from backend.database.catalog import CATEGORY_SEPARATOR, intern_categories
+from backend.database.categories import CategoryIndex
+
+PLACES = {
+    "museo_arte": ["Museums in San Juan, Puerto Rico", "Art museums in Puerto Rico"],
+    "museo_ciencias": ["Science museums in Puerto Rico"],
+    "castillo": ["Forts in Puerto Rico", "Museums in San Juan, Puerto Rico"],
+    "playa": ["Beaches of Puerto Rico"],
+    "bosque": ["Protected areas of Puerto Rico"]
+}
+
+@pytest.fixture
+def index():
+    names, offsets, category_ids = intern_categories(
+        [CATEGORY_SEPARATOR.join(categories) for categories in PLACES.values()]
+    )
+    return CategoryIndex(list(PLACES), names, offsets, category_ids)
+
+def names_of(index, categories):
+    return sorted(index.category_names[i] for i in categories)
+
+def test_exact_name_ignores_case_and_accents(index):
+    assert names_of(index, index.match("BEACHES OF PUERTO RICO")) == ["Beaches of Puerto Rico"]
+    assert names_of(index, index.match("Béaches of Puertó Rico ")) == ["Beaches of Puerto Rico"]
+
+def test_words_match_category_words_by_prefix(index):
+    assert names_of(index, index.match("museum")) == [
+        "Art museums in Puerto Rico", "Museums in San Juan, Puerto Rico", "Science museums in Puerto Rico"
+    ]
+    # Todas las palabras del término deben aparecer en la categoría
+    assert names_of(index, index.match("sci mus")) == ["Science museums in Puerto Rico"]
+    assert len(index.match("museos")) == 0
+
+def test_recommend_ranks_places_by_covered_terms(index):
+    rows, scores, _ = index.recommend(["museum", "forts"], n_results=3)
+
+    assert [index.ids[row] for row in rows] == ["castillo", "museo_arte", "museo_ciencias"]
+    assert scores.tolist() == [2.0, 1.0, 1.0]
+    rows, _, _ = index.recommend(["museum", "forts"], mode="all")
+    assert [index.ids[row] for row in rows] == ["castillo"]
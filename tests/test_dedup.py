@@ -0,0 +1,80 @@
+"""Detección de chunks casi duplicados con MinHash/LSH y su diario."""
+from data_processing.utils.dedup import NearDuplicateIndex
+
+STORY = (
+    "La Autoridad de Energía Eléctrica anunció ayer un plan para restablecer el servicio "
+    "en los municipios del oeste tras el paso de la tormenta, que dejó sin luz a miles de "
+    "familias en Mayagüez, Aguadilla y Cabo Rojo durante casi una semana completa."
+)
+REPRINT = STORY.replace("ayer", "hoy")
+OTHER = (
+    "El equipo de baloncesto de Bayamón ganó el campeonato nacional en un juego reñido "
+    "que se decidió en los últimos segundos ante un coliseo lleno de fanáticos."
+)
+
+def new_index(tmp_path) -> NearDuplicateIndex:
+    return NearDuplicateIndex(str(tmp_path / "dedup" / "news.npz"))
+
+def test_near_duplicates_become_aliases_of_the_first_chunk(tmp_path):
+    index = new_index(tmp_path)
+
+    assert index.add("a_0", STORY, "a.txt") is None
+    assert index.add("b_0", REPRINT, "b.txt") == "a_0"
+    assert index.add("c_0", OTHER, "c.txt") is None
+    assert index.aliases_of(["a_0", "c_0"]) == {"a_0": ["b_0"], "c_0": []}
+    assert index.take_stats() == {"chunks": 3, "duplicates": 1, "chars_saved": len(REPRINT)}
+
+def test_forgotten_row_does_not_shadow_a_live_row_with_the_same_bands(tmp_path):
+    index = new_index(tmp_path)
+    index.add("a_0", STORY, "a.txt")
+    index.forget(["a_0"])
+
+    assert index.add("b_0", STORY, "b.txt") is None
+    assert index.add("c_0", STORY, "c.txt") == "b_0"
+
+    index.save()
+    index = new_index(tmp_path)
+    assert index.add("d_0", REPRINT, "d.txt") == "b_0"
+
+def test_forget_returns_sources_of_orphaned_aliases(tmp_path):
+    index = new_index(tmp_path)
+    index.add("a_0", STORY, "a.txt")
+    index.add("b_0", REPRINT, "b.txt")
+    index.add("c_0", OTHER, "c.txt")
+
+    assert index.forget(index.ids_of_sources(["a.txt"])) == {"b.txt"}
+    assert index.aliases == {}
+    assert index.ids_of_sources(["a.txt", "c.txt"]) == ["c_0"]
+
+def test_checkpointed_files_are_replayed_after_a_crash(tmp_path):
+    index = new_index(tmp_path)
+    index.add("a_0", STORY, "a.txt")
+    index.save()
+    index.add("b_0", REPRINT, "b.txt")
+    index.add("c_0", OTHER, "c.txt")
+    index.checkpoint(["b.txt"])
+    # c.txt no llegó a confirmarse y la última línea quedó a medio escribir
+    with open(index.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"source": "c.txt", "ro')
+
+    recovered = new_index(tmp_path)
+
+    assert recovered.aliases == {"b_0": ("a_0", "b.txt")}
+    assert recovered.ids_of_sources(["a.txt", "b.txt", "c.txt"]) == ["a_0"]
+    assert recovered.add("c_0", OTHER, "c.txt") is None
+    recovered.save()
+    assert not (tmp_path / "dedup" / "news.npz.journal").exists()
+
+def test_replay_replaces_what_was_recorded_for_a_file(tmp_path):
+    index = new_index(tmp_path)
+    index.add("a_0", STORY, "a.txt")
+    index.checkpoint(["a.txt"])
+    # a.txt se volvió a procesar con otro contenido antes del guardado
+    index.forget(index.ids_of_sources(["a.txt"]))
+    index.add("a_1", OTHER, "a.txt")
+    index.checkpoint(["a.txt"])
+
+    recovered = new_index(tmp_path)
+
+    assert recovered.ids_of_sources(["a.txt"]) == ["a_1"]
+    assert recovered.add("b_0", REPRINT, "b.txt") is None
@@ -0,0 +1,69 @@
+"""Caché en disco de embeddings: lectura, persistencia y expulsión por segmentos."""
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from backend.ai.embeddings import EmbeddingCache
+from backend.ai.embeddings import cache as embedding_cache
+
+MODEL = "tests/model"
+DIM = 4
+# Un segmento lleno: dos vectores float32
+SEGMENT_BYTES = 2 * DIM * 4
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj de last_used controlado por el test."""
+    now = {"t": 1.0}
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now["t"])
+    return now
+
+def vectors(*values: float) -> np.ndarray:
+    return np.array([np.full(DIM, value) for value in values], dtype=np.float32)
+
+def cached_keys(cache: EmbeddingCache, keys) -> list:
+    return [key for key, vector in zip(keys, cache.get_many(keys, MODEL, DIM)) if vector is not None]
+
+def test_vectors_survive_reopening_the_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), segment_rows=2)
+    cache.put_many(["a", "b", "c"], vectors(1, 2, 3), MODEL)
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path), segment_rows=2)
+    found = reopened.get_many(["c", "x", "a"], MODEL, DIM)
+    assert reopened.model_dim(MODEL) == DIM
+    np.testing.assert_array_equal(found[0], vectors(3)[0])
+    assert found[1] is None
+    np.testing.assert_array_equal(found[2], vectors(1)[0])
+
+def test_least_recently_used_segment_is_evicted(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=2 * SEGMENT_BYTES, segment_rows=2)
+    cache.put_many(["a", "b"], vectors(1, 2), MODEL)
+    clock["t"] = 2.0
+    cache.put_many(["c", "d"], vectors(3, 4), MODEL)
+    clock["t"] = 3.0
+    cache.get_many(["a"], MODEL, DIM)
+
+    # Un tercer segmento supera max_bytes: se expulsa el de c y d
+    clock["t"] = 4.0
+    cache.put_many(["e", "f"], vectors(5, 6), MODEL)
+
+    assert cached_keys(cache, ["a", "b", "c", "d", "e", "f"]) == ["a", "b", "e", "f"]
+    assert len(glob.glob(os.path.join(str(tmp_path), "*.f32"))) == 2
+
+def test_embed_encodes_only_missing_texts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    encoded = []
+
+    def encode(texts):
+        encoded.extend(texts)
+        return vectors(*range(len(texts)))
+
+    cache.embed(["playa", "bosque"], MODEL, encode)
+    result = cache.embed(["bosque", "playa  ", "museo"], MODEL, encode)
+
+    assert encoded == ["playa", "bosque", "museo"]
+    assert result.shape == (3, DIM)
+    assert (cache.hits, cache.misses) == (2, 3)
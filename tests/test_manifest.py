@@ -0,0 +1,60 @@
+"""Manifiesto de ingesta incremental y sincronización de colecciones."""
+import os
+
+from data_processing.utils.manifest import IngestionManifest
+
+def new_manifest(tmp_path, extractor_version="1", model="m") -> IngestionManifest:
+    return IngestionManifest(str(tmp_path / "manifests" / "docs.json"), extractor_version, model)
+
+def test_diff_reports_new_modified_and_removed(tmp_path, write_files):
+    data_dir = write_files({"a.txt": "uno", "b.txt": "dos", "c.txt": "tres"})
+    manifest = new_manifest(tmp_path)
+    for name in ("a.txt", "b.txt", "c.txt"):
+        manifest.record(os.path.join(data_dir, name), [f"doc_{name}"])
+    manifest.save()
+
+    write_files({"a.txt": "uno modificado", "d.txt": "cuatro"})
+    os.remove(os.path.join(data_dir, "c.txt"))
+    manifest = new_manifest(tmp_path)
+    paths = [os.path.join(data_dir, name) for name in sorted(os.listdir(data_dir))]
+    changed, removed = manifest.diff(paths)
+
+    assert [os.path.basename(path) for path in changed] == ["a.txt", "d.txt"]
+    assert removed == ["c.txt"]
+    assert sorted(manifest.stale_ids(changed, removed)) == ["doc_a.txt", "doc_c.txt"]
+
+def test_compatibility_follows_extractor_version_and_model(tmp_path):
+    manifest = new_manifest(tmp_path)
+    manifest.save()
+
+    assert new_manifest(tmp_path).compatible
+    assert not new_manifest(tmp_path, extractor_version="2").compatible
+    assert not new_manifest(tmp_path, model="otro").compatible
+
+def test_sync_only_embeds_new_and_modified_files(make_processor, write_files, fake_encoder, documents_of):
+    data_dir = write_files({"a.txt": "castillo del morro", "b.txt": "playa de luquillo", "c.txt": "cueva ventana"})
+    processor = make_processor()
+    assert processor.sync("docs", data_dir) == 3
+    assert processor.sync("docs", data_dir) == 0
+
+    write_files({"a.txt": "castillo san cristobal", "d.txt": "bosque el yunque"})
+    os.remove(os.path.join(data_dir, "c.txt"))
+    fake_encoder.encoded.clear()
+    processor = make_processor()
+
+    assert processor.sync("docs", data_dir) == 2
+    assert sorted(fake_encoder.encoded) == ["bosque el yunque", "castillo san cristobal"]
+    assert documents_of(processor, "docs") == {
+        "doc_a": "castillo san cristobal",
+        "doc_b": "playa de luquillo",
+        "doc_d": "bosque el yunque"
+    }
+
+def test_extractor_version_change_rebuilds_collection(make_processor, write_files, documents_of):
+    data_dir = write_files({"a.txt": "castillo del morro", "b.txt": "playa de luquillo"})
+    make_processor().sync("docs", data_dir)
+
+    processor = make_processor()
+    processor.EXTRACTOR_VERSION = "2"
+    assert processor.sync("docs", data_dir) == 2
+    assert set(documents_of(processor, "docs")) == {"doc_a", "doc_b"}
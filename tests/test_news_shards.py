@@ -0,0 +1,56 @@
+"""Enrutado de consultas a las particiones de noticias por década."""
+import chromadb
+import pytest
+
+from backend.ai.embeddings import get_embedder, index_metadata
+from backend.database.news_shards import NewsShardRouter, query_decades, shard_name
+from tests.conftest import FAKE_MODEL
+
+DECADES = ["1910s", "1920s", "1940s", "1950s", "2000s"]
+
+@pytest.fixture
+def router(tmp_path, fake_encoder):
+    persist_directory = str(tmp_path / "db")
+    client = chromadb.PersistentClient(path=persist_directory)
+    for decade in DECADES:
+        client.create_collection(
+            shard_name(decade), metadata=index_metadata(FAKE_MODEL), embedding_function=get_embedder(FAKE_MODEL)
+        )
+    return NewsShardRouter(client, persist_directory, model_name=FAKE_MODEL)
+
+@pytest.mark.parametrize("query,decades", [
+    ("huracán de 1928", ["1920s"]),
+    ("noticias en el año 1947", ["1940s"]),
+    ("what happened in 1955", ["1950s"]),
+    ("los años 40 en Ponce", ["1940s"]),
+    ("la década de los 20", ["1920s"]),
+    ("jazz in the '20s", ["1920s"]),
+    ("the roaring 20s", ["1920s"]),
+    ("the fifties", ["1950s"]),
+    ("entre 1915 y 1925", ["1910s", "1920s"]),
+    ("Segunda Guerra Mundial", ["1930s", "1940s"])
+])
+def test_query_decades_reads_dates_with_context(query, decades):
+    assert query_decades(query) == decades
+
+@pytest.mark.parametrize("query", [
+    "the 10 best beaches in San Juan",
+    "un pueblo de 2000 habitantes",
+    "in 1500 acres of forest",
+    "los 80 mejores restaurantes",
+    "hotel 2000 cerca del mar"
+])
+def test_numbers_without_date_context_are_not_decades(query):
+    assert query_decades(query) == []
+
+def test_route_narrows_to_mentioned_decades(router):
+    assert router.route("huracán de 1928") == ["1920s"]
+    assert router.route("Segunda Guerra Mundial") == ["1940s"]
+    assert router.route("cualquier cosa", decades=["1950s", "1910s"]) == ["1950s", "1910s"]
+
+def test_route_sends_ordinary_numbers_to_every_shard(router):
+    assert router.route("the 10 best beaches in San Juan") == DECADES
+    assert router.route("un pueblo de 2000 habitantes") == DECADES
+
+def test_route_falls_back_to_every_shard_for_unindexed_decades(router):
+    assert router.route("en 1965") == DECADES
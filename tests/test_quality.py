@@ -0,0 +1,18 @@
+"""Filtro de calidad del texto OCR de las noticias."""
+from data_processing.utils.quality import QualityFilter, score_segments
+
+GOOD = "El gobernador visitó hoy los pueblos del interior de la isla"
+NOISE = "~~ |;| .:. ,, ;; == ^^ || }{ ][ // \\\\ ** ## @@"
+
+def test_score_segments_without_segments_returns_empty_arrays():
+    scores = score_segments([])
+
+    assert set(scores) == {"alpha", "symbol", "repeated", "short"}
+    assert all(len(values) == 0 for values in scores.values())
+
+def test_filter_lines_drops_blank_and_noisy_lines():
+    quality = QualityFilter()
+
+    assert list(quality.filter_lines([" ", "", NOISE, GOOD])) == [GOOD]
+    stats = quality.take_stats()
+    assert stats["lines"] == 4 and stats["lines_dropped"] == 3
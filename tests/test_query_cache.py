@@ -0,0 +1,57 @@
+"""Caché en memoria de embeddings de consultas (LRU con caducidad)."""
+import numpy as np
+import pytest
+
+from backend.ai.embeddings import EmbeddingCache, MultilingualEmbedder, QueryEmbeddingCache
+from backend.ai.embeddings import query_cache
+from tests.conftest import FAKE_MODEL
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico controlado por el test."""
+    now = {"t": 1000.0}
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now["t"])
+    return now
+
+def vector(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+def test_lookups_ignore_case_and_spacing():
+    cache = QueryEmbeddingCache(max_entries=4, ttl_seconds=0)
+    cache.put("m", "  ¿Qué visitar en  San Juan? ", vector(1))
+
+    assert cache.get("m", "¿qué visitar en san juan?") is not None
+    assert cache.get("otro", "¿qué visitar en san juan?") is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=0)
+    cache.put("m", "a", vector(1))
+    cache.put("m", "b", vector(2))
+    cache.get("m", "a")
+    cache.put("m", "c", vector(3))
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None and cache.get("m", "c") is not None
+    assert cache.stats()["evicted"] == 1
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryEmbeddingCache(max_entries=4, ttl_seconds=60)
+    cache.put("m", "a", vector(1))
+
+    clock["t"] += 59
+    assert cache.get("m", "a") is not None
+    clock["t"] += 2
+    assert cache.get("m", "a") is None
+    assert cache.stats()["expired"] == 1 and len(cache) == 0
+
+def test_embed_queries_skips_the_disk_cache(tmp_path, fake_encoder):
+    disk_cache = EmbeddingCache(str(tmp_path / "cache"))
+    embedder = MultilingualEmbedder(FAKE_MODEL, cache=disk_cache, query_cache=QueryEmbeddingCache(8, 0))
+
+    first = embedder.embed_queries(["playas de Rincón", "Playas de  Rincón"])
+    second = embedder.embed_queries(["playas de rincón"])
+
+    assert fake_encoder.encoded == ["playas de Rincón"]
+    np.testing.assert_array_equal(first[0], second[0])
+    assert disk_cache.model_dim(FAKE_MODEL) is None
+    assert disk_cache.hits == disk_cache.misses == 0
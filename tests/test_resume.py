@@ -0,0 +1,108 @@
+"""Ingesta con puntos de control: diario del manifiesto y --resume."""
+import json
+import os
+
+import pytest
+
+from data_processing.processors.base_processor import BaseProcessor
+from data_processing.utils.manifest import IngestionManifest, finish_force_run, force_run_path
+
+FILES = {f"{name}.txt": f"noticia {name} sobre el puerto de san juan" for name in "abcdef"}
+
+class Crash(Exception):
+    pass
+
+@pytest.fixture
+def crash_after(monkeypatch):
+    """Hace fallar la escritura en ChromaDB después de n lotes."""
+    def install(batches: int, collection_name=None):
+        write_batch = BaseProcessor.write_batch
+        written = {"batches": 0}
+
+        def failing(self, collection, *args, **kwargs):
+            if collection_name in (None, collection.name):
+                if written["batches"] >= batches:
+                    raise Crash()
+                written["batches"] += 1
+            return write_batch(self, collection, *args, **kwargs)
+        monkeypatch.setattr(BaseProcessor, "write_batch", failing)
+        return lambda: monkeypatch.setattr(BaseProcessor, "write_batch", write_batch)
+    return install
+
+def test_manifest_replays_committed_batches(tmp_path, write_files):
+    data_dir = write_files({"a.txt": "uno", "b.txt": "dos"})
+    path = str(tmp_path / "manifests" / "docs.json")
+    manifest = IngestionManifest(path, "1", "m")
+    manifest.save(complete=False)
+    manifest.commit([(os.path.join(data_dir, "a.txt"), ["doc_a"])])
+    # Línea a medio escribir de un lote que no llegó a confirmarse
+    with open(manifest.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"name": "b.txt", "ha')
+
+    recovered = IngestionManifest(path, "1", "m")
+
+    assert recovered.interrupted and recovered.recovered == 1
+    assert recovered.files == {"a.txt": {"hash": manifest.files["a.txt"]["hash"], "ids": ["doc_a"]}}
+    recovered.save()
+    assert not os.path.exists(recovered.journal_path)
+    assert not IngestionManifest(path, "1", "m").interrupted
+
+def test_interrupted_sync_resumes_after_last_committed_batch(make_processor, write_files, crash_after, documents_of):
+    data_dir = write_files(FILES)
+    restore = crash_after(1)
+    with pytest.raises(Crash):
+        make_processor(batch_size=2).sync("docs", data_dir)
+    restore()
+
+    processor = make_processor(batch_size=2)
+    assert processor.sync("docs", data_dir) == 4
+    assert set(documents_of(processor, "docs")) == {f"doc_{name}" for name in "abcdef"}
+
+def test_force_resume_continues_interrupted_rebuild(make_processor, write_files, crash_after, documents_of):
+    data_dir = write_files(FILES)
+    make_processor(batch_size=2).sync("docs", data_dir)
+
+    restore = crash_after(2)
+    with pytest.raises(Crash):
+        make_processor(batch_size=2).sync("docs", data_dir, force_reprocess=True)
+    restore()
+
+    processor = make_processor(batch_size=2, resume=True)
+    assert processor.sync("docs", data_dir, force_reprocess=True) == 2
+    assert len(documents_of(processor, "docs")) == 6
+
+def test_force_resume_skips_collections_rebuilt_before_the_crash(make_processor, write_files, crash_after, tmp_path):
+    data_dir = write_files(FILES)
+    for name in ("first", "second"):
+        make_processor().sync(name, data_dir)
+
+    restore = crash_after(0, collection_name="second")
+    processor = make_processor()
+    assert processor.sync("first", data_dir, force_reprocess=True) == 6
+    with pytest.raises(Crash):
+        processor.sync("second", data_dir, force_reprocess=True)
+    restore()
+
+    processor = make_processor(resume=True)
+    deleted = []
+    delete_collection = processor.client.delete_collection
+    processor.client.delete_collection = lambda name: (deleted.append(name), delete_collection(name=name))
+    assert processor.sync("first", data_dir, force_reprocess=True) == 0
+    assert processor.sync("second", data_dir, force_reprocess=True) == 6
+    assert deleted == []
+
+    # Terminada la reconstrucción, --force --resume vuelve a empezar de cero
+    persist_directory = str(tmp_path / "db")
+    finish_force_run(persist_directory)
+    assert not os.path.exists(force_run_path(persist_directory))
+    assert make_processor(resume=True).sync("first", data_dir, force_reprocess=True) == 6
+
+def test_force_without_resume_rebuilds_everything(make_processor, write_files, tmp_path):
+    data_dir = write_files(FILES)
+    make_processor().sync("docs", data_dir)
+    first_run = make_processor().force_run_id()
+
+    processor = make_processor()
+    assert processor.sync("docs", data_dir, force_reprocess=True) == 6
+    with open(force_run_path(str(tmp_path / "db")), 'r', encoding='utf-8') as f:
+        assert json.load(f)["run_id"] == processor.force_run != first_run
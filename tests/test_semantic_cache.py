@@ -0,0 +1,58 @@
+"""Caché semántica de respuestas del RAG."""
+import numpy as np
+import pytest
+
+from backend.ai.rag import semantic_cache
+from backend.ai.rag.semantic_cache import SemanticResponseCache
+from backend.database.index_version import bump_index_version
+
+DOCS = ["landmark_morro", "landmark_cristobal"]
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj de la caché controlado por el test."""
+    now = {"t": 1000.0}
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now["t"])
+    return now
+
+def make_cache(tmp_path, **kwargs) -> SemanticResponseCache:
+    kwargs.setdefault("threshold", 0.95)
+    kwargs.setdefault("max_entries", 4)
+    kwargs.setdefault("ttl_seconds", 0)
+    return SemanticResponseCache(str(tmp_path / "db"), **kwargs)
+
+def test_paraphrase_with_same_context_reuses_the_response(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("¿Qué es El Morro?", np.array([1.0, 0.0, 0.0]), "landmark", DOCS, "Un fuerte")
+
+    # Similitud 0.99: misma respuesta, aunque los documentos lleguen en otro orden
+    paraphrase = np.array([0.99, 0.141, 0.0])
+    assert cache.lookup(paraphrase * 3, "landmark", reversed(DOCS)) == "Un fuerte"
+    assert cache.lookup(np.array([0.8, 0.6, 0.0]), "landmark", DOCS) is None
+    assert cache.lookup(paraphrase, "general", DOCS) is None
+    assert cache.lookup(paraphrase, "landmark", DOCS[:1]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+def test_index_version_bump_invalidates_responses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("El Morro", np.array([1.0, 0.0]), "landmark", DOCS, "Un fuerte")
+
+    bump_index_version(str(tmp_path / "db"), "landmarks")
+
+    assert cache.lookup(np.array([1.0, 0.0]), "landmark", DOCS) is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+def test_responses_expire_and_least_recently_used_is_replaced(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2, ttl_seconds=60)
+    cache.store("a", np.array([1.0, 0.0, 0.0]), "general", [], "A")
+    clock["t"] += 1
+    cache.store("b", np.array([0.0, 1.0, 0.0]), "general", [], "B")
+    clock["t"] += 1
+    cache.lookup(np.array([1.0, 0.0, 0.0]), "general", [])
+    cache.store("c", np.array([0.0, 0.0, 1.0]), "general", [], "C")
+
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), "general", []) is None
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), "general", []) == "A"
+    clock["t"] += 59
+    assert cache.lookup(np.array([0.0, 0.0, 1.0]), "general", []) == "C"
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), "general", []) is None
@@ -0,0 +1,50 @@
+"""Índice espacial de celdas frente a la búsqueda por fuerza bruta."""
+import numpy as np
+import pytest
+
+from backend.database.spatial import SpatialIndex
+from data_processing.utils.geo_utils import distances_to
+
+TARGETS = [(18.2208, -66.5901), (18.4655, -66.1057), (18.0, -67.2), (17.5, -65.0)]
+
+@pytest.fixture(scope="module")
+def places():
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(17.8, 18.6, 2000)
+    longitudes = rng.uniform(-67.4, -65.1, 2000)
+    # Lugares sin coordenadas: el índice los ignora
+    latitudes[::50] = np.nan
+    ids = [f"place_{i}" for i in range(len(latitudes))]
+    return ids, latitudes, longitudes
+
+def brute_force(places, target, k, max_distance_km=None):
+    """Ids y distancias de los k más cercanos ordenando todas las distancias."""
+    ids, latitudes, longitudes = places
+    valid = ~np.isnan(latitudes)
+    distances = distances_to(target, np.column_stack([latitudes[valid], longitudes[valid]]))
+    order = np.argsort(distances, kind="stable")
+    if max_distance_km is not None:
+        order = order[distances[order] <= max_distance_km]
+    valid_ids = [place_id for place_id, keep in zip(ids, valid) if keep]
+    return [valid_ids[i] for i in order[:k]], distances[order[:k]]
+
+@pytest.mark.parametrize("target", TARGETS)
+@pytest.mark.parametrize("k,max_distance_km", [(1, None), (10, None), (50, None), (10, 5.0), (500, 3.0), (5, 0.1)])
+def test_nearest_matches_brute_force(places, target, k, max_distance_km):
+    index = SpatialIndex(*places, cell_km=1.0)
+
+    positions, distances = index.nearest(*target, k, max_distance_km)
+
+    expected_ids, expected_distances = brute_force(places, target, k, max_distance_km)
+    assert [index.ids[i] for i in positions.tolist()] == expected_ids
+    np.testing.assert_allclose(distances, expected_distances)
+
+def test_k_beyond_points_within_radius_returns_only_those(places):
+    index = SpatialIndex(*places)
+    within_ids, _ = brute_force(places, TARGETS[0], len(index), max_distance_km=5.0)
+
+    positions, distances = index.nearest(*TARGETS[0], k=len(within_ids) + 20, max_distance_km=5.0)
+
+    assert within_ids and [index.ids[i] for i in positions.tolist()] == within_ids
+    assert (distances <= 5.0).all()
+    assert len(index.nearest(*TARGETS[0], k=len(index) + 10)[0]) == len(index)
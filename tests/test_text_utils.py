@@ -0,0 +1,59 @@
+"""Troceado de noticias por oraciones con límite de tokens y solapamiento."""
+import pytest
+
+from data_processing.utils import text_utils
+from data_processing.utils.text_utils import count_tokens, iter_chunks, iter_sentences
+
+def words(text: str) -> int:
+    return len(text.split())
+
+SENTENCES = [
+    "El huracán San Felipe azotó la isla en 1928.",
+    "Los daños en las cosechas de café fueron enormes.",
+    "La Legislatura aprobó fondos de emergencia.",
+    "Cientos de familias perdieron sus casas en Ponce.",
+    "El gobernador visitó los pueblos del interior.",
+    "La Cruz Roja repartió alimentos durante semanas."
+]
+
+@pytest.mark.parametrize("max_length,overlap", [(12, 0), (12, 5), (20, 10), (9, 9)])
+def test_chunks_respect_token_budget(max_length, overlap):
+    chunks = list(iter_chunks(SENTENCES, max_length, overlap, words))
+
+    assert chunks
+    assert all(words(chunk) <= max_length for chunk in chunks)
+
+@pytest.mark.parametrize("max_length,overlap", [(20, 10), (30, 18)])
+def test_consecutive_chunks_overlap_by_whole_sentences(max_length, overlap):
+    chunks = list(iter_chunks(SENTENCES, max_length, overlap, words))
+
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        shared = [s for s in SENTENCES if s in previous and s in current]
+        assert shared and sum(words(s) for s in shared) <= overlap
+        # El solapamiento es el final del chunk anterior y el inicio del siguiente
+        assert previous.endswith(shared[-1]) and current.startswith(shared[0])
+
+def test_chunks_cover_every_sentence_in_order():
+    chunks = list(iter_chunks(SENTENCES, 20, 8, words))
+    seen = [s for chunk in chunks for s in SENTENCES if s in chunk]
+
+    assert list(dict.fromkeys(seen)) == SENTENCES
+
+def test_long_sentence_is_split_by_words():
+    sentence = " ".join(f"palabra{i}" for i in range(25))
+    chunks = list(iter_chunks([sentence], 10, 0, words))
+
+    assert [words(chunk) for chunk in chunks] == [10, 10, 5]
+    assert " ".join(chunks) == sentence
+
+def test_iter_sentences_joins_pieces_across_lines():
+    pieces = ["El vapor llegó a San", "Juan ayer. Traía correo", "de Nueva York."]
+
+    assert list(iter_sentences(pieces)) == ["El vapor llegó a San Juan ayer.", "Traía correo de Nueva York."]
+
+def test_count_tokens_falls_back_to_regex(monkeypatch):
+    monkeypatch.setattr(text_utils, "tokenizer", False)
+
+    assert count_tokens("Hola, mundo.") == 4
+    assert text_utils.tokenizer_signature() == "regex"